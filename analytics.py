@@ -0,0 +1,174 @@
+# analytics.py
+import math
+
+# Nombre maximal de points des séries persistées : au-delà, un point sur deux est retiré et le pas double
+SERIES_MAX_POINTS = 500
+
+
+# Moyenne et variance en ligne (Welford) : O(1) par valeur, sans conserver l'historique
+class RunningStats:
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def state(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+
+# Série sous-échantillonnée à taille bornée : un point tous les `stride` trades, le dernier point toujours à jour
+class Series:
+    def __init__(self, max_points=SERIES_MAX_POINTS, points=None, stride=1, last=None):
+        self.max_points = max_points
+        self.points = points or []
+        self.stride = stride
+        self.last = last
+
+    def add(self, index, point):
+        self.last = point
+        if index % self.stride:
+            return
+        self.points.append(point)
+        if len(self.points) > self.max_points:
+            # Coût amorti O(1) : la décimation ne survient qu'à chaque doublement du pas
+            self.points = self.points[::2]
+            self.stride *= 2
+
+    def values(self):
+        if self.last is not None and (not self.points or self.points[-1] != self.last):
+            return self.points + [self.last]
+        return list(self.points)
+
+    def state(self):
+        return {"points": self.points, "stride": self.stride, "last": self.last}
+
+
+def new_breakdown():
+    return {
+        "Total_Trades": 0, "Wins": 0, "Total_PNL": 0.0, "Gross_Profit": 0.0, "Gross_Loss": 0.0,
+        "Peak": 0.0, "Max_Drawdown": 0.0,
+    }
+
+
+def update_breakdown(breakdown, pnl):
+    breakdown["Total_Trades"] += 1
+    breakdown["Total_PNL"] += pnl
+    if pnl > 0:
+        breakdown["Wins"] += 1
+        breakdown["Gross_Profit"] += pnl
+    else:
+        breakdown["Gross_Loss"] -= pnl
+    breakdown["Peak"] = max(breakdown["Peak"], breakdown["Total_PNL"])
+    breakdown["Max_Drawdown"] = max(breakdown["Max_Drawdown"], breakdown["Peak"] - breakdown["Total_PNL"])
+
+
+def profit_factor(gross_profit, gross_loss):
+    # Indéfini tant qu'aucun trade perdant n'a été fermé
+    return gross_profit / gross_loss if gross_loss > 0 else None
+
+
+# Performances de la stratégie mises à jour trade par trade : courbe d'equity (PNL cumulé), drawdown maximal,
+# Sharpe et Sortino par trade (non annualisés), profit factor et détail par symbole
+class Analytics:
+    def __init__(self, max_points=SERIES_MAX_POINTS):
+        self.pnl = RunningStats()
+        self.downside = 0.0
+        self.equity = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.per_symbol = {}
+        self.series = Series(max_points)
+
+    def update(self, pnl, symbol=None, time=None):
+        self.pnl.add(pnl)
+        if pnl > 0:
+            self.gross_profit += pnl
+        else:
+            self.gross_loss -= pnl
+            self.downside += pnl * pnl
+        self.equity += pnl
+        self.peak = max(self.peak, self.equity)
+        drawdown = self.peak - self.equity
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+        if symbol is not None:
+            update_breakdown(self.per_symbol.setdefault(symbol, new_breakdown()), pnl)
+        self.series.add(self.pnl.count, [self.pnl.count, time, self.equity, drawdown])
+
+    def sharpe(self):
+        std = self.pnl.std()
+        return self.pnl.mean / std if std > 0 else 0.0
+
+    def sortino(self):
+        # Écart-type des seules pertes (semi-déviation), rapporté à tous les trades
+        if not self.downside:
+            return 0.0
+        return self.pnl.mean / math.sqrt(self.downside / self.pnl.count)
+
+    def values(self):
+        # Colonnes de stats.csv calculées ici
+        return {
+            "Max_Drawdown": self.max_drawdown,
+            "Sharpe_Ratio": self.sharpe(),
+            "Sortino_Ratio": self.sortino(),
+            "Profit_Factor": profit_factor(self.gross_profit, self.gross_loss),
+        }
+
+    def breakdown(self):
+        return {
+            symbol: {
+                "Total_Trades": values["Total_Trades"],
+                "Wins": values["Wins"],
+                "Winrate": values["Wins"] / values["Total_Trades"],
+                "Total_PNL": values["Total_PNL"],
+                "Profit_Factor": profit_factor(values["Gross_Profit"], values["Gross_Loss"]),
+                "Max_Drawdown": values["Max_Drawdown"],
+            }
+            for symbol, values in self.per_symbol.items()
+        }
+
+    def snapshot(self):
+        # Photo compacte pour le cockpit : taille bornée quel que soit le nombre de trades
+        return {
+            "stats": self.values(),
+            "equity": self.series.values(),
+            "per_symbol": self.breakdown(),
+        }
+
+    def state(self):
+        # État complet (JSON) conservé dans le point de reprise du journal
+        return {
+            "pnl": self.pnl.state(),
+            "downside": self.downside,
+            "equity": self.equity,
+            "peak": self.peak,
+            "max_drawdown": self.max_drawdown,
+            "gross_profit": self.gross_profit,
+            "gross_loss": self.gross_loss,
+            "per_symbol": self.per_symbol,
+            "series": self.series.state(),
+        }
+
+    @classmethod
+    def from_state(cls, state, max_points=SERIES_MAX_POINTS):
+        analytics = cls(max_points)
+        analytics.pnl = RunningStats(**state["pnl"])
+        analytics.downside = state["downside"]
+        analytics.equity = state["equity"]
+        analytics.peak = state["peak"]
+        analytics.max_drawdown = state["max_drawdown"]
+        analytics.gross_profit = state["gross_profit"]
+        analytics.gross_loss = state["gross_loss"]
+        analytics.per_symbol = state["per_symbol"]
+        analytics.series = Series(max_points, **state["series"])
+        return analytics
@@ -4,7 +4,11 @@ import pandas as pd
 import plotly.express as px
 import time
 import os
-import ccxt
+from cockpit_data import CockpitData, LiveCockpit, analytics_tables, metrics_tables
+from events import EventClient
+from exchange_client import ExchangeClient, exchange_config
+from markets import LazyExchange
+from prices import PriceSnapshot
 
 # Configuration
 st.set_page_config(page_title="Equinox Bot Cockpit", layout="wide")
@@ -15,6 +19,13 @@ TRADES_FILE = "trades.csv"
 STATS_FILE = "stats.csv"
 LOG_FILE = "console_log.txt"
 MISSED_TRADES_FILE = "missed_trades.txt"
+METRICS_FILE = "metrics.json"
+ANALYTICS_FILE = "analytics.json"
+
+# Flux d'événements du bot (bot.py, EQUINOX_EVENTS_PORT) ; sans flux, les fichiers sont vérifiés chaque seconde
+EVENTS_URL = os.environ.get("EQUINOX_EVENTS_URL", "http://127.0.0.1:8765")
+REFRESH_INTERVAL = 1
+PRICE_REFRESH_INTERVAL = 5
 
 # Liste des cryptos
 SYMBOLS = [
@@ -28,152 +39,197 @@ SYMBOLS = [
 if "HYPE/USDT" in SYMBOLS:
     SYMBOLS.remove("HYPE/USDT")
 
-# Initialisation de l'exchange MEXC
-exchange = ccxt.mexc({"timeout": 120000, "enableRateLimit": True})
+# Exchange MEXC, mêmes délais, nouvelles tentatives et disjoncteurs que le bot
+# Une seule instance par processus Streamlit : connexions keep-alive et photo des prix partagées entre les sessions
+@st.cache_resource
+def load_price_snapshot():
+    exchange = LazyExchange("mexc", exchange_config())
+    return PriceSnapshot(exchange, SYMBOLS, call=ExchangeClient(exchange).call)
 
-# Fonction pour lire stats.csv
-def read_stats():
-    if os.path.exists(STATS_FILE):
-        stats_df = pd.read_csv(STATS_FILE)
-        required_columns = ["Total_Trades", "Wins", "Losses", "Winrate", "Total_PNL", "Max_Drawdown", "Sharpe_Ratio", "Update_Time"]
-        if all(col in stats_df.columns for col in required_columns):
-            return stats_df
-        else:
-            st.error("Colonnes manquantes dans stats.csv")
-            return pd.DataFrame()
-    return pd.DataFrame()
-
-# Fonction pour lire missed_trades.txt
-def read_missed_trades():
-    missed_trades = {}
-    if os.path.exists(MISSED_TRADES_FILE):
-        with open(MISSED_TRADES_FILE, "r") as f:
-            lines = f.readlines()
-            start_reading = False
-            for line in lines:
-                if line.strip() == "Trades manqués par raison:":
-                    start_reading = True
-                    continue
-                if start_reading and line.strip().startswith("- "):
-                    reason = line.strip()[2:].split(": ")
-                    missed_trades[reason[0]] = int(reason[1])
-    return missed_trades
-
-# Fonction pour récupérer les prix en temps réel
+price_snapshot = load_price_snapshot()
+
+# Fichiers du bot relus uniquement quand ils changent et abonnement au flux du bot, partagés entre les sessions
+@st.cache_resource
+def load_cockpit():
+    data = CockpitData(POSITIONS_FILE, TRADES_FILE, STATS_FILE, MISSED_TRADES_FILE, LOG_FILE, METRICS_FILE, ANALYTICS_FILE)
+    client = EventClient(EVENTS_URL) if EVENTS_URL else None
+    return LiveCockpit(data, client)
+
+# Fonction pour récupérer les prix en temps réel (un seul appel fetch_tickers pour tous les symboles)
 def fetch_prices():
-    prices = {}
-    for symbol in SYMBOLS:
-        try:
-            ticker = exchange.fetch_ticker(symbol)
-            prices[symbol] = ticker["last"]
-        except Exception:
-            prices[symbol] = "Erreur"
-    return prices
-
-# Boucle principale pour mise à jour
+    try:
+        timestamp, snapshot = price_snapshot.get()
+    except Exception:
+        return None, {symbol: "Erreur" for symbol in SYMBOLS}
+    prices = {symbol: snapshot.get(symbol, "Erreur") for symbol in SYMBOLS}
+    return timestamp, prices
+
+def render_prices(value):
+    timestamp, prices = value
+    st.header("Prix des cryptos en temps réel")
+    if timestamp is not None:
+        st.caption(f"Prix au {pd.Timestamp(timestamp, unit='s', tz='Europe/Paris'):%Y-%m-%d %H:%M:%S}")
+    price_df = pd.DataFrame({
+        "Symbole": SYMBOLS,
+        "Prix (USDT)": [prices.get(symbol, "Erreur") for symbol in SYMBOLS]
+    })
+    price_df["Couleur"] = price_df["Prix (USDT)"].apply(lambda x: "green" if isinstance(x, float) else "red")
+    st.dataframe(
+        price_df.style.apply(lambda x: [f"color: {x['Couleur']}"] * len(x), axis=1),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def render_positions(positions_df):
+    # Trades en cours
+    st.header("Trades en cours")
+    if positions_df is not None:
+        if not positions_df.empty:
+            display_columns = ["Symbole", "Type", "Prix_Entree", "TP", "SL", "Marge", "Levier", "Temps_Entree"]
+            available_columns = [col for col in display_columns if col in positions_df.columns]
+            st.dataframe(positions_df[available_columns], use_container_width=True)
+        else:
+            st.write("Aucune position ouverte.")
+    else:
+        st.write("Fichier positions.csv introuvable.")
+
+def render_trades(trades):
+    # Historique des trades
+    st.header("Historique des trades")
+    if trades.key is not None:
+        trades_df = trades.tail(10)
+        if not trades_df.empty:
+            display_columns = ["Symbole", "Type", "Prix_Entree", "Prix_Sortie", "PNL", "Raison_Sortie", "Temps_Sortie"]
+            available_columns = [col for col in display_columns if col in trades_df.columns]
+            st.dataframe(trades_df[available_columns], use_container_width=True)
+        else:
+            st.write("Aucun trade fermé.")
+    else:
+        st.write("Fichier trades.csv introuvable.")
+
+def render_stats(value):
+    # Stats globales
+    stats_df, missed_trades = value
+    st.header("Statistiques globales")
+    required_columns = ["Total_Trades", "Wins", "Losses", "Winrate", "Total_PNL", "Max_Drawdown", "Sharpe_Ratio", "Update_Time"]
+    if stats_df is not None and not all(col in stats_df.columns for col in required_columns):
+        st.error("Colonnes manquantes dans stats.csv")
+        stats_df = None
+    if stats_df is not None and not stats_df.empty:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total PNL", f"{stats_df['Total_PNL'].iloc[-1]:.2f} USDT")
+        with col2:
+            st.metric("Winrate", f"{stats_df['Winrate'].iloc[-1] * 100:.2f}%")
+        with col3:
+            st.metric("Total Trades", stats_df["Total_Trades"].iloc[-1])
+        col4, col5, col6, col7 = st.columns(4)
+        with col4:
+            st.metric("Max Drawdown", f"{stats_df['Max_Drawdown'].iloc[-1]:.2f} USDT")
+        with col5:
+            st.metric("Sharpe (par trade)", f"{stats_df['Sharpe_Ratio'].iloc[-1]:.3f}")
+        if "Sortino_Ratio" in stats_df.columns:
+            with col6:
+                st.metric("Sortino (par trade)", f"{stats_df['Sortino_Ratio'].iloc[-1]:.3f}")
+            with col7:
+                profit_factor = stats_df["Profit_Factor"].iloc[-1]
+                st.metric("Profit Factor", f"{profit_factor:.2f}" if pd.notna(profit_factor) else "-")
+        st.subheader("Trades manqués par raison")
+        missed_df = pd.DataFrame((missed_trades or {}).items(), columns=["Raison", "Nombre"])
+        st.dataframe(missed_df, use_container_width=True)
+    else:
+        st.write("Fichier stats.csv introuvable ou invalide.")
+
+def render_equity(snapshot):
+    # Courbe d'equity (PNL cumulé) et drawdown, sous-échantillonnées par le bot
+    st.header("Courbe d'equity")
+    if snapshot is None:
+        st.write("Fichier analytics.json introuvable.")
+        return
+    equity_df, _ = analytics_tables(snapshot)
+    if equity_df.empty:
+        st.write("Aucun trade fermé.")
+        return
+    st.plotly_chart(px.line(equity_df, x="Trade", y="Equity", title="PNL cumulé (USDT)"), use_container_width=True)
+    st.plotly_chart(px.area(equity_df, x="Trade", y="Drawdown", title="Drawdown (USDT)"), use_container_width=True)
+
+def render_performance(perf_df):
+    # Performances par crypto (détail tenu à jour par le bot, sinon agrégats incrémentaux de trades.csv)
+    st.header("Performances par crypto")
+    if perf_df is not None:
+        if not perf_df.empty:
+            st.dataframe(perf_df, use_container_width=True)
+            fig = px.bar(perf_df, x=perf_df.index, y="Total_PNL", title="PNL par crypto")
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.write("Données insuffisantes ou colonne 'PNL' manquante dans trades.csv.")
+    else:
+        st.write("Fichier trades.csv introuvable.")
+
+def render_logs(logs):
+    # Logs récents
+    st.header("Logs récents")
+    if logs is not None:
+        st.text_area("Derniers logs", "".join(logs), height=200)
+    else:
+        st.write("Fichier console_log.txt introuvable.")
+
+def render_metrics(snapshot):
+    # Instrumentation du bot (durées des appels, calculs et écritures ; compteurs)
+    st.header("Performances du bot")
+    if snapshot is None:
+        st.write("Fichier metrics.json introuvable.")
+        return
+    timings_df, counters_df = metrics_tables(snapshot)
+    st.caption(f"Mesures au {pd.Timestamp(snapshot['time'], unit='s', tz='Europe/Paris'):%Y-%m-%d %H:%M:%S}")
+    if not timings_df.empty:
+        st.dataframe(timings_df, use_container_width=True, hide_index=True)
+    if not counters_df.empty:
+        st.dataframe(counters_df, use_container_width=True, hide_index=True)
+
+# Boucle principale : chaque widget n'est redessiné que lorsque sa source change
 def main():
     st.title("⚡ Equinox Bot Cockpit ⚡")
-
-    # Placeholder pour le tableau des prix
-    price_placeholder = st.empty()
-
-    # Placeholder pour le reste du cockpit
-    main_placeholder = st.empty()
+    live = load_cockpit()
+    widgets = [
+        ("prices", st.empty(), render_prices),
+        ("positions", st.empty(), render_positions),
+        ("trades", st.empty(), render_trades),
+        ("stats", st.empty(), render_stats),
+        ("equity", st.empty(), render_equity),
+        ("performance", st.empty(), render_performance),
+        ("logs", st.empty(), render_logs),
+        ("metrics", st.empty(), render_metrics),
+    ]
+    rendered = {}
+    version = 0
+    fetched_prices, last_fetch = None, 0.0
 
     while True:
-        # Mise à jour des prix
-        with price_placeholder.container():
-            st.header("Prix des cryptos en temps réel")
-            prices = fetch_prices()
-            price_df = pd.DataFrame({
-                "Symbole": SYMBOLS,
-                "Prix (USDT)": [prices.get(symbol, "Erreur") for symbol in SYMBOLS]
-            })
-            price_df["Couleur"] = price_df["Prix (USDT)"].apply(lambda x: "green" if isinstance(x, float) else "red")
-            st.dataframe(
-                price_df.style.apply(lambda x: [f"color: {x['Couleur']}"] * len(x), axis=1),
-                use_container_width=True,
-                hide_index=True
-            )
-
-        # Mise à jour du reste du cockpit
-        with main_placeholder.container():
-            # Trades en cours
-            st.header("Trades en cours")
-            if os.path.exists(POSITIONS_FILE):
-                positions_df = pd.read_csv(POSITIONS_FILE)
-                if not positions_df.empty:
-                    display_columns = ["Symbole", "Type", "Prix_Entree", "TP", "SL", "Marge", "Levier", "Temps_Entree"]
-                    available_columns = [col for col in display_columns if col in positions_df.columns]
-                    st.dataframe(positions_df[available_columns], use_container_width=True)
-                else:
-                    st.write("Aucune position ouverte.")
-            else:
-                st.write("Fichier positions.csv introuvable.")
-
-            # Historique des trades
-            st.header("Historique des trades")
-            if os.path.exists(TRADES_FILE):
-                trades_df = pd.read_csv(TRADES_FILE)
-                if not trades_df.empty:
-                    display_columns = ["Symbole", "Type", "Prix_Entree", "Prix_Sortie", "PNL", "Raison_Sortie", "Temps_Sortie"]
-                    available_columns = [col for col in display_columns if col in trades_df.columns]
-                    st.dataframe(trades_df[available_columns].tail(10), use_container_width=True)
-                else:
-                    st.write("Aucun trade fermé.")
-            else:
-                st.write("Fichier trades.csv introuvable.")
-
-            # Stats globales
-            st.header("Statistiques globales")
-            stats_df = read_stats()
-            if not stats_df.empty:
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total PNL", f"{stats_df['Total_PNL'].iloc[-1]:.2f} USDT")
-                with col2:
-                    st.metric("Winrate", f"{stats_df['Winrate'].iloc[-1] * 100:.2f}%")
-                with col3:
-                    st.metric("Total Trades", stats_df["Total_Trades"].iloc[-1])
-                st.subheader("Trades manqués par raison")
-                missed_trades = read_missed_trades()
-                missed_df = pd.DataFrame(missed_trades.items(), columns=["Raison", "Nombre"])
-                st.dataframe(missed_df, use_container_width=True)
-            else:
-                st.write("Fichier stats.csv introuvable ou invalide.")
-
-            # Performances par crypto
-            st.header("Performances par crypto")
-            if os.path.exists(TRADES_FILE):
-                trades_df = pd.read_csv(TRADES_FILE)
-                if not trades_df.empty and "PNL" in trades_df.columns and "Symbole" in trades_df.columns:
-                    perf_df = trades_df.groupby("Symbole").agg({
-                        "PNL": "sum",
-                        "Type": "count",
-                        "PNL": lambda x: (x > 0).sum()
-                    }).rename(columns={"Type": "Total_Trades", "PNL": "Wins"})
-                    perf_df["Winrate"] = perf_df["Wins"] / perf_df["Total_Trades"]
-                    perf_df = perf_df.rename(columns={"PNL": "Total_PNL"})
-                    st.dataframe(perf_df[["Total_PNL", "Total_Trades", "Wins", "Winrate"]], use_container_width=True)
-                    fig = px.bar(perf_df, x=perf_df.index, y="Total_PNL", title="PNL par crypto")
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.write("Données insuffisantes ou colonne 'PNL' manquante dans trades.csv.")
-            else:
-                st.write("Fichier trades.csv introuvable.")
-
-            # Logs récents
-            st.header("Logs récents")
-            if os.path.exists(LOG_FILE):
-                with open(LOG_FILE, "r") as f:
-                    logs = f.readlines()
-                    st.text_area("Derniers logs", "".join(logs[-20:]), height=200)
-            else:
-                st.write("Fichier console_log.txt introuvable.")
-
-        # Rafraîchir toutes les 5 secondes
-        time.sleep(5)
-        st.experimental_rerun()
+        live.refresh()
+        sources = {
+            "prices": live.prices(),
+            "positions": live.positions(),
+            "trades": live.trades(),
+            "stats": live.stats(),
+            "equity": live.analytics() or (None, None),
+            "performance": live.performance(),
+            "logs": live.logs(),
+            "metrics": live.metrics(),
+        }
+        # Prix poussés par le bot s'ils sont récents, sinon photo fetch_tickers propre au cockpit
+        if sources["prices"] is None:
+            if time.monotonic() - last_fetch >= PRICE_REFRESH_INTERVAL:
+                fetched_prices, last_fetch = fetch_prices(), time.monotonic()
+            sources["prices"] = ("fetch", last_fetch), fetched_prices
+        for name, placeholder, render in widgets:
+            key, value = sources[name]
+            if rendered.get(name) != key:
+                with placeholder.container():
+                    render(value)
+                rendered[name] = key
+
+        version = live.wait(version, REFRESH_INTERVAL)
 
 if __name__ == "__main__":
     main()
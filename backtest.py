@@ -0,0 +1,300 @@
+# backtest.py
+import argparse
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+from numpy.lib.stride_tricks import sliding_window_view
+
+import signals
+from analytics import Analytics
+from candles import CandleCache, TIMEFRAME_MS
+from config import (
+    LEVERAGE, MARGIN, MAX_POSITIONS, MIN_ATR, SYMBOL_PARAMS, SYMBOLS, stats_columns, trades_columns,
+)
+from indicators import compute_series
+from storage import CandleArchive
+
+tz_paris = pytz.timezone('Europe/Paris')
+
+SIGNAL_WINDOW = 50
+LONG_REASONS = signals.LONG_STRUCTURE | signals.LONG_BREAKER | signals.LONG_BREAKER_DISTANCE | signals.LONG_FIBONACCI | signals.LONG_VOLUME
+SHORT_REASONS = signals.SHORT_STRUCTURE | signals.SHORT_BREAKER | signals.SHORT_BREAKER_DISTANCE | signals.SHORT_FIBONACCI | signals.SHORT_VOLUME
+# Nombre de bougies évaluées par bloc vectorisé (borne la mémoire des fenêtres glissantes)
+CHUNK_SIZE = 5000
+
+
+# Chargement des bougies locales : archive partitionnée {SYMBOLE}/{timeframe}/{AAAA-MM}.npy (storage.py),
+# {SYMBOLE}_{timeframe}.npy (format du cache du bot) ou .csv
+# CSV : colonnes timestamp, open, high, low, close, volume (timestamp en ms)
+def load_ohlcv(data_dir, symbol, timeframe, mmap=False, start=None, end=None):
+    archive = CandleArchive(data_dir)
+    if archive.has(symbol, timeframe):
+        # Seuls les mois de la période sont lus
+        return archive.read(symbol, timeframe, start, end, mmap=mmap)
+    base = os.path.join(data_dir, CandleCache.filename(symbol, timeframe)[:-len(".npy")])
+    if os.path.exists(base + ".npy"):
+        # mmap : les pages du fichier sont partagées par tous les processus qui le lisent
+        return np.asarray(np.load(base + ".npy", mmap_mode="r" if mmap else None))
+    if os.path.exists(base + ".csv"):
+        return pd.read_csv(base + ".csv").iloc[:, :6].to_numpy(dtype=np.float64)
+    return None
+
+
+def download_history(exchange, symbol, timeframe, since, data_dir, limit=1000):
+    # Téléchargement paginé de l'historique via fetch_ohlcv, enregistré au format .npy
+    rows = []
+    while True:
+        batch = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+        if not batch:
+            break
+        rows.extend(batch)
+        since = batch[-1][0] + TIMEFRAME_MS[timeframe]
+        if len(batch) < limit:
+            break
+    os.makedirs(data_dir, exist_ok=True)
+    ohlcv = np.asarray(rows, dtype=np.float64)
+    np.save(os.path.join(data_dir, CandleCache.filename(symbol, timeframe)), ohlcv)
+    return ohlcv
+
+
+def compute_signals(ohlcv_1h, ohlcv_15m, min_atr):
+    # Signaux de toutes les bougies 15m d'un symbole : l'axe "symboles" de signals.evaluate devient l'axe du temps
+    # À la bougie 15m t, seules les bougies 1h clôturées à la fin de t sont visibles (pas de biais de look-ahead)
+    close_times_15m = ohlcv_15m[:, 0] + TIMEFRAME_MS["15m"]
+    last_1h = np.searchsorted(ohlcv_1h[:, 0] + TIMEFRAME_MS["1h"], close_times_15m, side="right") - 1
+    windows_15m = sliding_window_view(ohlcv_15m, SIGNAL_WINDOW, axis=0).transpose(0, 2, 1)
+    windows_1h = sliding_window_view(ohlcv_1h, SIGNAL_WINDOW, axis=0).transpose(0, 2, 1)
+
+    count = len(ohlcv_15m)
+    result = {
+        "long": np.zeros(count, dtype=bool),
+        "short": np.zeros(count, dtype=bool),
+        "price": np.full(count, np.nan),
+        "atr": np.full(count, np.nan),
+        "fib_1618": np.full(count, np.nan),
+        "reasons": np.zeros(count, dtype=np.int64),
+    }
+    # Bougies évaluables : au moins SIGNAL_WINDOW bougies 15m et 1h d'historique
+    valid = np.nonzero((np.arange(count) >= SIGNAL_WINDOW - 1) & (last_1h >= SIGNAL_WINDOW - 1))[0]
+    for start in range(0, len(valid), CHUNK_SIZE):
+        indices = valid[start:start + CHUNK_SIZE]
+        chunk = signals.evaluate(
+            windows_1h[last_1h[indices] - (SIGNAL_WINDOW - 1)],
+            windows_15m[indices - (SIGNAL_WINDOW - 1)],
+            np.full(len(indices), min_atr),
+        )
+        for name in result:
+            result[name][indices] = chunk[name]
+    return result
+
+
+def apply_min_atr(result, min_atr):
+    # Recalcule les masques long/short pour un autre MIN_ATR sans réévaluer les bougies
+    # (signaux calculés une fois avec min_atr=0, le filtre ATR n'est alors jamais actif)
+    atr_ok = result["atr"] >= min_atr * 0.25
+    valid = ~np.isnan(result["price"])
+    return {
+        **result,
+        "long": valid & atr_ok & ((result["reasons"] & LONG_REASONS) == 0),
+        "short": valid & atr_ok & ((result["reasons"] & SHORT_REASONS) == 0),
+    }
+
+
+def find_exit(ohlcv_15m, entry_index, position_type, tp_price, sl_price, block=64):
+    # Première bougie après l'entrée dont le haut/bas touche TP ou SL ; si les deux, SL (hypothèse prudente)
+    # Recherche par blocs de taille croissante : coût proportionnel à la durée du trade, pas à l'historique restant
+    start = entry_index + 1
+    while start < len(ohlcv_15m):
+        highs = ohlcv_15m[start:start + block, 2]
+        lows = ohlcv_15m[start:start + block, 3]
+        if position_type == "Long":
+            tp_hit, sl_hit = highs >= tp_price, lows <= sl_price
+        else:
+            tp_hit, sl_hit = lows <= tp_price, highs >= sl_price
+        hits = np.flatnonzero(tp_hit | sl_hit)
+        if len(hits) > 0:
+            index = hits[0]
+            if sl_hit[index]:
+                return start + index, sl_price, "SL Hit"
+            return start + index, tp_price, "TP Hit"
+        start += block
+        block *= 2
+    return None, None, None
+
+
+def format_time(timestamp_ms):
+    return str(datetime.fromtimestamp(timestamp_ms / 1000, tz_paris))
+
+
+def run_backtest(data, symbol_params=None, min_atr=None, max_positions=MAX_POSITIONS, with_indicators=True):
+    # data : {symbole: (ohlcv_1h, ohlcv_15m)} ; renvoie la liste des trades au schéma de trades.csv
+    min_atr = min_atr or MIN_ATR
+    symbol_signals = {
+        symbol: compute_signals(ohlcv_1h, ohlcv_15m, min_atr.get(symbol, min_atr["default"]))
+        for symbol, (ohlcv_1h, ohlcv_15m) in data.items()
+    }
+    return simulate(data, symbol_signals, symbol_params, max_positions, with_indicators)
+
+
+def simulate(data, symbol_signals, symbol_params=None, max_positions=MAX_POSITIONS, with_indicators=True, records=True):
+    # records=False : seuls les PNL sont renvoyés (optimiseur), sans construire les lignes de trades.csv
+    symbol_params = symbol_params or SYMBOL_PARAMS
+
+    # 1. Candidats d'entrée de tous les symboles triés par temps (ordre de SYMBOLS à égalité)
+    candidates = []
+    for order, (symbol, result) in enumerate(symbol_signals.items()):
+        timestamps = data[symbol][1][:, 0]
+        for index in np.nonzero(result["long"] | result["short"])[0]:
+            candidates.append((timestamps[index], order, symbol, index))
+    candidates.sort()
+
+    # 2. Rejeu événementiel : MAX_POSITIONS global et une seule position par symbole, comme en live
+    trades = []
+    open_until = {}
+    indicators = {}
+    for timestamp, _, symbol, index in candidates:
+        open_until = {s: t for s, t in open_until.items() if t >= timestamp}
+        if symbol in open_until or len(open_until) >= max_positions:
+            continue
+        ohlcv_15m = data[symbol][1]
+        result = symbol_signals[symbol]
+        params = symbol_params.get(symbol, symbol_params["default"])
+        position_type = "Long" if result["long"][index] else "Short"
+        price, atr = result["price"][index], result["atr"][index]
+        if position_type == "Long":
+            sl_price = price - atr * params["sl_ratio"]
+            tp_price = price + atr * params["tp_ratio"]
+        else:
+            sl_price = price + atr * params["sl_ratio"]
+            tp_price = price - atr * params["tp_ratio"]
+
+        exit_index, exit_price, reason = find_exit(ohlcv_15m, index, position_type, tp_price, sl_price)
+        if exit_index is None:
+            # Position encore ouverte à la fin des données : elle bloque le symbole mais n'est pas comptée
+            open_until[symbol] = np.inf
+            continue
+        open_until[symbol] = ohlcv_15m[exit_index, 0]
+
+        quantity = MARGIN * LEVERAGE / price
+        pnl = (exit_price - price) * quantity if position_type == "Long" else (price - exit_price) * quantity
+        if not records:
+            trades.append((ohlcv_15m[exit_index, 0], pnl))
+            continue
+        if with_indicators and symbol not in indicators:
+            # RSI/EMA/ADX sur tout l'historique en une passe, lus uniquement aux bougies d'entrée
+            indicators[symbol] = compute_series(ohlcv_15m)
+        values = indicators.get(symbol)
+        entry_time = ohlcv_15m[index, 0] + TIMEFRAME_MS["15m"]
+        exit_time = ohlcv_15m[exit_index, 0] + TIMEFRAME_MS["15m"]
+        trades.append((exit_time, {
+            "Symbole": symbol,
+            "Type": position_type,
+            "Prix_Entree": price,
+            "Prix_Sortie": exit_price,
+            "Quantite": quantity,
+            "PNL": pnl,
+            "Raison_Sortie": reason,
+            "RSI_Sortie": values["rsi"][index] if values else np.nan,
+            "EMA_30_Sortie": values["ema"][index] if values else np.nan,
+            "ATR_Sortie": atr,
+            "Temps_Entree": format_time(entry_time),
+            "Temps_Sortie": format_time(exit_time),
+            "Position_ID": f"{symbol}_{entry_time / 1000}",
+            "Marge": MARGIN,
+            "Levier": LEVERAGE
+        }))
+    # Ordre de trades.csv : ordre de clôture, comme en live
+    trades.sort(key=lambda item: item[0])
+    return [trade for _, trade in trades]
+
+
+def compute_stats(trades):
+    pnls = np.array([trade["PNL"] for trade in trades], dtype=np.float64)
+    wins = int((pnls > 0).sum())
+    # Mêmes calculs que le bot, trade par trade dans l'ordre de clôture
+    analytics = Analytics()
+    for trade in trades:
+        analytics.update(trade["PNL"], trade["Symbole"], trade["Temps_Sortie"])
+    return {
+        "Total_Trades": len(pnls),
+        "Wins": wins,
+        "Losses": len(pnls) - wins,
+        "Winrate": wins / len(pnls) if len(pnls) > 0 else 0.0,
+        "Total_PNL": float(pnls.sum()),
+        **analytics.values(),
+        "Update_Time": str(datetime.now(tz_paris)),
+    }
+
+
+def time_slice(ohlcv, start, end):
+    # Bougies triées par timestamp : tranche contiguë (vue sans copie, compatible mmap)
+    first = np.searchsorted(ohlcv[:, 0], start) if start is not None else 0
+    last = np.searchsorted(ohlcv[:, 0], end) if end is not None else len(ohlcv)
+    return ohlcv[first:last]
+
+
+def load_data(data_dir, symbols, start=None, end=None, mmap=False):
+    data = {}
+    for symbol in symbols:
+        start_1h = start - SIGNAL_WINDOW * TIMEFRAME_MS["1h"] if start is not None else None
+        ohlcv_1h = load_ohlcv(data_dir, symbol, "1h", mmap, start_1h, end)
+        ohlcv_15m = load_ohlcv(data_dir, symbol, "15m", mmap, start, end)
+        if ohlcv_1h is None or ohlcv_15m is None:
+            print(f"{symbol} : données introuvables dans {data_dir}, ignoré")
+            continue
+        ohlcv_1h = time_slice(ohlcv_1h, start_1h, end)
+        ohlcv_15m = time_slice(ohlcv_15m, start, end)
+        if len(ohlcv_1h) < SIGNAL_WINDOW or len(ohlcv_15m) < SIGNAL_WINDOW:
+            print(f"{symbol} : données insuffisantes, ignoré")
+            continue
+        data[symbol] = (ohlcv_1h, ohlcv_15m)
+    return data
+
+
+def save_results(trades, stats, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    pd.DataFrame(trades, columns=trades_columns).to_csv(os.path.join(out_dir, "trades.csv"), index=False)
+    pd.DataFrame([stats], columns=stats_columns).to_csv(os.path.join(out_dir, "stats.csv"), index=False)
+
+
+def parse_date(value):
+    return int(pd.Timestamp(value, tz="UTC").timestamp() * 1000) if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest de la stratégie Equinox sur des bougies locales")
+    parser.add_argument("--data", default="data", help="dossier des bougies ({SYMBOLE}_{timeframe}.npy ou .csv)")
+    parser.add_argument("--out", default="backtest_results", help="dossier de sortie (trades.csv, stats.csv)")
+    parser.add_argument("--start", help="date de début (ex: 2024-01-01)")
+    parser.add_argument("--end", help="date de fin (exclue)")
+    parser.add_argument("--symbols", nargs="*", default=SYMBOLS)
+    parser.add_argument("--download", action="store_true", help="télécharge d'abord l'historique depuis MEXC")
+    args = parser.parse_args()
+
+    start, end = parse_date(args.start), parse_date(args.end)
+    if args.download:
+        import ccxt
+
+        exchange = ccxt.mexc({"enableRateLimit": True})
+        since = (start or parse_date("2024-01-01")) - SIGNAL_WINDOW * TIMEFRAME_MS["1h"]
+        for symbol in args.symbols:
+            for timeframe in ("1h", "15m"):
+                rows = download_history(exchange, symbol, timeframe, since, args.data)
+                print(f"{symbol} {timeframe} : {len(rows)} bougies téléchargées")
+
+    began = time.monotonic()
+    data = load_data(args.data, args.symbols, start, end)
+    trades = run_backtest(data)
+    stats = compute_stats(trades)
+    save_results(trades, stats, args.out)
+    bars = sum(len(ohlcv_15m) for _, ohlcv_15m in data.values())
+    print(f"{len(data)} symboles, {bars} bougies 15m rejouées en {time.monotonic() - began:.2f}s")
+    print(f"{stats['Total_Trades']} trades, winrate {stats['Winrate'] * 100:.2f}%, PNL {stats['Total_PNL']:.2f} USDT -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# bench.py
+import argparse
+import csv
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import SYMBOLS, trades_columns
+from exchange_client import ExchangeClient
+from fake_exchange import FakeExchange, generate_fixtures, load_fixtures, record_fixtures, save_fixtures
+
+# Écart au-delà duquel --compare signale une régression ou une accélération
+COMPARE_THRESHOLD = 0.10
+
+
+def measure(fn, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def result(value, unit, better="lower", **details):
+    return {"value": value, "unit": unit, "better": better, **details}
+
+
+def load_bot(exchange):
+    # bot.py crée ses fichiers dans le répertoire courant : l'appelant se place dans un répertoire temporaire
+    import bot
+    from candles import CandleCache
+    from prices import PriceSnapshot
+
+    bot.exchange = exchange
+    bot.exchange_client = ExchangeClient(exchange, metrics=bot.metrics, seed=0)
+    bot.candle_cache = CandleCache(bot.fetch_ohlcv_rest, capacity=200)
+    bot.price_snapshot = PriceSnapshot(exchange, SYMBOLS, max_age=0, call=bot.api_call)
+    return bot
+
+
+def reset_bot(bot):
+    with bot.positions_lock:
+        bot.positions.clear()
+        bot.trades.clear()
+        bot.exit_engine.reset([])
+
+
+def bench_cycle(bot, exchange, repeat):
+    # Cycle complet de main() : bougies des 25 symboles via le cache puis évaluation vectorisée
+    results = {}
+    with ThreadPoolExecutor(max_workers=bot.SCAN_WORKERS, thread_name_prefix="scan") as executor:
+        reset_bot(bot)
+        calls = dict(exchange.calls)
+        results["cycle_cold_seconds"] = result(measure(lambda: bot.scan_cycle(executor), 1)[0], "s")
+        durations = []
+        for _ in range(repeat):
+            reset_bot(bot)
+            durations.extend(measure(lambda: bot.scan_cycle(executor), 1))
+        results["cycle_warm_seconds"] = result(statistics.median(durations), "s", min=min(durations), max=max(durations))
+        results["cycle_exchange_calls"] = result(
+            (exchange.calls.get("fetch_ohlcv", 0) - calls.get("fetch_ohlcv", 0)) / (repeat + 1), "appels/cycle"
+        )
+    reset_bot(bot)
+    return results
+
+
+def bench_indicators(fixtures, repeat):
+    from indicators import IndicatorEngine, IndicatorState, compute_series
+
+    candles = np.asarray(next(iter(fixtures["ohlcv"].values()))["15m"], dtype=np.float64)
+    bars = np.tile(candles, (max(1, 20000 // len(candles)), 1))
+    bars[:, 0] = np.arange(len(bars)) * 900000
+
+    def incremental():
+        state = IndicatorState()
+        for row in bars:
+            state.update(row[2], row[3], row[4])
+
+    incremental_time = min(measure(incremental, repeat))
+    series_time = min(measure(lambda: compute_series(bars), repeat))
+
+    # Régime permanent du bot : une bougie clôturée de plus sur une fenêtre de 200 à chaque appel
+    engine = IndicatorEngine()
+    engine.sync("BENCH", "15m", bars[:200])
+    steps = 1000
+
+    def sync():
+        for i in range(201, 201 + steps):
+            engine.sync("BENCH", "15m", bars[i - 200:i])
+
+    sync_time = min(measure(sync, 1))
+    return {
+        "indicator_incremental_bars_per_second": result(len(bars) / incremental_time, "bougies/s", "higher"),
+        "indicator_vectorized_bars_per_second": result(len(bars) / series_time, "bougies/s", "higher"),
+        "indicator_sync_seconds": result(sync_time / steps, "s"),
+    }
+
+
+def bench_signals(fixtures, repeat, sizes=(25, 250, 2500)):
+    import signals
+
+    series = list(fixtures["ohlcv"].values())
+    results = {}
+    for size in sizes:
+        ohlcv_1h = np.stack([np.asarray(series[i % len(series)]["1h"][-50:]) for i in range(size)])
+        ohlcv_15m = np.stack([np.asarray(series[i % len(series)]["15m"][-50:]) for i in range(size)])
+        min_atr = np.full(size, 0.0001)
+        duration = min(measure(lambda: signals.evaluate(ohlcv_1h, ohlcv_15m, min_atr), repeat))
+        results[f"signals_{size}_symbols_per_second"] = result(size / duration, "symboles/s", "higher")
+    return results
+
+
+def open_bench_positions(bot, exchange, count, tag):
+    positions = []
+    for index, symbol in enumerate(SYMBOLS[:count]):
+        price = exchange.prices[symbol]
+        position = {
+            "Symbole": symbol, "Type": "Long", "Prix_Entree": price, "Quantite": 1000.0 / price,
+            "TP": price * 1.01, "SL": price * 0.99, "RSI": 50.0, "EMA_30": price, "ATR": price * 0.01,
+            "ADX": 20.0, "Fib_1618": price * 1.1, "Temps_Entree": "bench",
+            "Position_ID": f"{symbol}_{tag}_{index}", "Marge": 100.0, "Levier": 10.0,
+        }
+        bot.open_position(position)
+        positions.append(position)
+    return positions
+
+
+def bench_exits(bot, exchange, repeat):
+    # Du franchissement du TP à la fermeture de toutes les positions, sans compter l'attente de MONITOR_INTERVAL
+    durations, idle = [], []
+    for attempt in range(repeat):
+        reset_bot(bot)
+        positions = open_bench_positions(bot, exchange, bot.MAX_POSITIONS, f"exit{attempt}")
+        idle.extend(measure(bot.check_positions, 1))
+        prices = {pos["Symbole"]: exchange.prices[pos["Symbole"]] for pos in positions}
+        for pos in positions:
+            exchange.set_price(pos["Symbole"], pos["TP"] * 1.001)
+        durations.extend(measure(bot.check_positions, 1))
+        for symbol, price in prices.items():
+            exchange.set_price(symbol, price)
+    reset_bot(bot)
+    return {
+        "exit_check_idle_seconds": result(statistics.median(idle), "s"),
+        "exit_detection_seconds": result(statistics.median(durations), "s", positions=bot.MAX_POSITIONS),
+    }
+
+
+def bench_resilience(bot, fixtures, latency, repeat, failure_rate, hang_rate, timeout=500):
+    # Bougies de tous les symboles sans cache, avec erreurs réseau et requêtes bloquées injectées,
+    # puis exchange coupé : les disjoncteurs doivent borner la durée du cycle
+    from candles import CandleCache
+
+    exchange = FakeExchange(fixtures, latency=latency, failure_rate=failure_rate, hang_rate=hang_rate, timeout=timeout)
+    saved = bot.exchange, bot.exchange_client, bot.candle_cache
+    bot.exchange = exchange
+    bot.exchange_client = ExchangeClient(exchange, metrics=bot.metrics, seed=0)
+
+    def fetch_all(executor):
+        bot.candle_cache = CandleCache(bot.fetch_ohlcv_rest, capacity=200)
+        return sum(item is not None for item in executor.map(bot.fetch_symbol_data, SYMBOLS))
+
+    durations, fetched = [], []
+    try:
+        with ThreadPoolExecutor(max_workers=bot.SCAN_WORKERS, thread_name_prefix="scan") as executor:
+            reset_bot(bot)
+            for _ in range(repeat):
+                durations.extend(measure(lambda: fetched.append(fetch_all(executor)), 1))
+            exchange.outage = True
+            outage = measure(lambda: fetch_all(executor), 1)[0]
+    finally:
+        bot.exchange, bot.exchange_client, bot.candle_cache = saved
+    return {
+        "faulty_fetch_seconds": result(statistics.median(durations), "s", max=max(durations),
+                                       failure_rate=failure_rate, hang_rate=hang_rate),
+        "faulty_fetch_symbols": result(min(fetched) / len(SYMBOLS), "fraction", "higher"),
+        "outage_fetch_seconds": result(outage, "s"),
+    }
+
+
+def write_trade_history(path, count):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(trades_columns)
+        for index in range(count):
+            pnl = 5.0 if index % 3 else -5.0
+            writer.writerow([
+                SYMBOLS[index % len(SYMBOLS)], "Long", 100.0, 100.5, 10.0, pnl, "TP Hit", 50.0, 100.0, 1.0,
+                "bench", "bench", f"history_{index}", 100.0, 10.0,
+            ])
+
+
+def bench_persistence(bot, exchange, sizes, trades_per_size=50):
+    # Coût d'une ouverture + fermeture (journal, CSV, stats) et du redémarrage selon la taille de l'historique
+    results = {}
+    for size in sizes:
+        reset_bot(bot)
+        write_trade_history(bot.trades_file, size)
+        bot.init_files()
+        if os.path.exists(bot.journal_file):
+            os.remove(bot.journal_file)
+        start = time.perf_counter()
+        bot.restore_state()
+        results[f"restore_{size}_trades_seconds"] = result(time.perf_counter() - start, "s")
+        durations = []
+        for index in range(trades_per_size):
+            start = time.perf_counter()
+            position = open_bench_positions(bot, exchange, 1, f"persist{size}_{index}")[0]
+            bot.close_position(position, position["TP"], "TP Hit")
+            durations.append(time.perf_counter() - start)
+        results[f"persist_trade_{size}_history_seconds"] = result(statistics.median(durations), "s")
+        # Redémarrage suivant : point de reprise du journal, sans relire l'historique
+        reset_bot(bot)
+        start = time.perf_counter()
+        bot.restore_state()
+        results[f"restart_{size}_trades_seconds"] = result(time.perf_counter() - start, "s")
+    reset_bot(bot)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(previous, current):
+    print(f"{'Mesure':45} {'Avant':>14} {'Après':>14} {'Ratio':>8}")
+    for name, new in current["results"].items():
+        old = previous["results"].get(name)
+        if old is None or not old["value"]:
+            print(f"{name:45} {'-':>14} {new['value']:>14.6g}")
+            continue
+        ratio = new["value"] / old["value"]
+        # Ratio > 1 : plus lent (unités de durée) ou plus rapide (débits)
+        gain = 1 / ratio if new["better"] == "lower" else ratio
+        status = "accélération" if gain > 1 + COMPARE_THRESHOLD else "régression" if gain < 1 - COMPARE_THRESHOLD else ""
+        print(f"{name:45} {old['value']:>14.6g} {new['value']:>14.6g} {ratio:>8.2f} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du bot sur un exchange simulé déterministe")
+    parser.add_argument("--fixtures", help="bougies et prix enregistrés (JSON) ; générés si absent")
+    parser.add_argument("--record", help="enregistre des fixtures depuis MEXC dans ce fichier puis quitte")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence simulée par appel (s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--history", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="part des appels en erreur réseau (résilience)")
+    parser.add_argument("--hang-rate", type=float, default=0.02, help="part des appels bloqués jusqu'au délai (résilience)")
+    parser.add_argument("--only", nargs="*", choices=["cycle", "indicators", "signals", "exits", "persistence", "resilience"])
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="résultats précédents (JSON) à comparer")
+    args = parser.parse_args()
+
+    if args.record:
+        import ccxt
+
+        save_fixtures(record_fixtures(ccxt.mexc({"timeout": 30000, "enableRateLimit": True}), SYMBOLS), args.record)
+        print(f"Fixtures enregistrées dans {args.record}")
+        return
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else generate_fixtures(SYMBOLS)
+    exchange = FakeExchange(fixtures, latency=args.latency)
+    selected = set(args.only or ["cycle", "indicators", "signals", "exits", "persistence", "resilience"])
+    out = os.path.abspath(args.out)
+    previous = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            previous = json.load(f)
+
+    results = {}
+    cwd = os.getcwd()
+    os.environ.setdefault("EQUINOX_LOG_LEVEL", "WARNING")
+    with tempfile.TemporaryDirectory(prefix="equinox_bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            bot = load_bot(exchange)
+            if "cycle" in selected:
+                results.update(bench_cycle(bot, exchange, args.repeat))
+            if "indicators" in selected:
+                results.update(bench_indicators(fixtures, args.repeat))
+            if "signals" in selected:
+                results.update(bench_signals(fixtures, args.repeat))
+            if "exits" in selected:
+                results.update(bench_exits(bot, exchange, args.repeat))
+            if "resilience" in selected:
+                results.update(bench_resilience(bot, fixtures, args.latency, args.repeat, args.failure_rate, args.hang_rate))
+            if "persistence" in selected:
+                results.update(bench_persistence(bot, exchange, args.history))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "time": time.time(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "symbols": len(SYMBOLS),
+            "fixtures": args.fixtures or "synthétiques",
+        },
+        "results": results,
+    }
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, value in results.items():
+        print(f"{name:45} {value['value']:>14.6g} {value['unit']}")
+    print(f"Résultats -> {out}")
+    if previous is not None:
+        compare(previous, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,86 +1,126 @@
 # bot.py
-import ccxt
 import numpy as np
-import pandas as pd
 import time
 from datetime import datetime
-import ta
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import os
 import pytz
+from config import (
+    LEVERAGE, MARGIN, MAX_POSITIONS, MIN_ATR, SYMBOL_PARAMS, SYMBOLS, positions_columns, stats_columns,
+    trades_columns,
+)
+from analytics import Analytics
+from candles import CandleCache
+from events import EventBus, EventServer
+from exchange_client import CircuitOpenError, ExchangeClient, exchange_config
+from exits import SL_SLIPPAGE, TP_SLIPPAGE, ExitEngine
+from indicators import IndicatorEngine
+from journal import (
+    Journal, append_csv, fsync_path, read_csv, rebuild as rebuild_journal, truncate_partial_line, write_csv_atomic,
+    write_json_atomic,
+)
+from logs import LogWriter
+from markets import LazyExchange
+from metrics import Registry
+from prices import PriceSnapshot
+from records import PositionBook, TradeHistory
+from scheduler import ScanScheduler
+from shard import CoordinatorClient
+from storage import TradeStore
+import signals
+from stream import ExchangeStream, MarketState, ReplayFeed
 
 # Configuration
-SYMBOLS = [
-    "TIA/USDT", "ATOM/USDT", "SOL/USDT", "ENA/USDT", "POPCAT/USDT", "BTC/USDT", "AAVE/USDT", "LINK/USDT",
-    "NEAR/USDT", "SUI/USDT", "PEPE/USDT", "SHIB/USDT", "ETH/USDT", "XRP/USDT", "TAO/USDT", "SEI/USDT",
-    "INJ/USDT", "FET/USDT", "DOGE/USDT", "ADA/USDT", "CRV/USDT", "PYTH/USDT", "BNB/USDT",
-    "GALA/USDT", "ONDO/USDT"
-]
-MAX_POSITIONS = 5
-SYMBOL_PARAMS = {
-    "default": {"risk_per_trade": 0.01, "leverage": 10, "tp_ratio": 2.0, "sl_ratio": 1.0},
-}
-for symbol in SYMBOLS:
-    SYMBOL_PARAMS[symbol] = SYMBOL_PARAMS["default"]
-MIN_ATR = {
-    "default": 0.0001, "TIA/USDT": 0.01, "ATOM/USDT": 0.01, "SOL/USDT": 0.1, "ENA/USDT": 0.001,
-    "POPCAT/USDT": 0.001, "BTC/USDT": 50.0, "AAVE/USDT": 0.1, "LINK/USDT": 0.01, "NEAR/USDT": 0.01,
-    "SUI/USDT": 0.01, "PEPE/USDT": 0.00000001, "SHIB/USDT": 0.00000001, "ETH/USDT": 10.0,
-    "XRP/USDT": 0.001, "TAO/USDT": 0.1, "SEI/USDT": 0.001, "INJ/USDT": 0.01, "FET/USDT": 0.01,
-    "DOGE/USDT": 0.0001, "ADA/USDT": 0.001, "CRV/USDT": 0.001, "PYTH/USDT": 0.001,
-    "BNB/USDT": 1.0, "GALA/USDT": 0.0001, "ONDO/USDT": 0.001,
-}
+SCAN_WORKERS = 8
+MONITOR_INTERVAL = 1
+# Bougies 1m des symboles ouverts relues toutes les EXIT_CANDLE_INTERVAL secondes hors streaming
+EXIT_CANDLE_INTERVAL = 15
+EXIT_CANDLE_LIMIT = 5
+# Mode streaming : bougies et prix reçus par WebSocket (ou rejoués depuis STREAM_REPLAY_FILE)
+STREAMING_MODE = os.environ.get("EQUINOX_STREAMING", "0") == "1"
+STREAM_REPLAY_FILE = os.environ.get("EQUINOX_REPLAY_FILE")
+# Prix du flux plus vieux que STREAM_PRICE_MAX_AGE secondes (WebSocket figé) : repli sur la photo REST
+# Sans limite en rejeu, où le flux s'arrête normalement à la fin du fichier
+STREAM_PRICE_MAX_AGE = None if STREAM_REPLAY_FILE else float(os.environ.get("EQUINOX_STREAM_MAX_AGE", 10 * MONITOR_INTERVAL))
+CANDLE_CACHE_DIR = "candle_cache"
+CANDLE_CACHE_SAVE_CYCLES = 10
+SIGNAL_WINDOW = 50
+# Flux d'événements local pour le cockpit (http://127.0.0.1:PORT/events), 0 pour désactiver
+EVENTS_PORT = int(os.environ.get("EQUINOX_EVENTS_PORT", "8765"))
+
+# Shard lancé par shard.py : sous-ensemble de symboles, exchange et coordinateur des positions
+SYMBOLS = os.environ["EQUINOX_SYMBOLS"].split(",") if os.environ.get("EQUINOX_SYMBOLS") else SYMBOLS
+EXCHANGE_ID = os.environ.get("EQUINOX_EXCHANGE", "mexc")
+WORKER_ID = os.environ.get("EQUINOX_WORKER", "main")
+COORDINATOR_URL = os.environ.get("EQUINOX_COORDINATOR")
+coordinator = CoordinatorClient(COORDINATOR_URL, WORKER_ID) if COORDINATOR_URL else None
 
 # Initialisation de l'exchange
-exchange = ccxt.mexc({"timeout": 120000, "enableRateLimit": True})
+# ccxt n'est importé qu'au premier appel, avec les marchés relus depuis MARKETS_FILE (24h)
+# Requêtes limitées à 10 s, connexions keep-alive partagées par tous les threads
+MARKETS_FILE = "markets.json"
+exchange = LazyExchange(EXCHANGE_ID, exchange_config(), markets_file=MARKETS_FILE)
 
 # Fuseau horaire France (CEST)
 tz_paris = pytz.timezone('Europe/Paris')
 
+# Métriques de performance : texte Prometheus sur /metrics du flux d'événements et photo dans metrics.json
+METRICS_FILE = "metrics.json"
+METRICS_INTERVAL = 10
+metrics = Registry()
+ohlcv_seconds = metrics.histogram("equinox_fetch_ohlcv_seconds", "Durée d'obtention des bougies d'un symbole (cache ou flux compris)")
+signal_seconds = metrics.histogram("equinox_signal_evaluation_seconds", "Durée de l'évaluation vectorisée des conditions d'entrée")
+indicator_seconds = metrics.histogram("equinox_indicator_seconds", "Durée de mise à jour des indicateurs d'un symbole")
+persistence_seconds = metrics.histogram("equinox_persistence_seconds", "Durée des écritures de fichiers")
+cycle_seconds = metrics.histogram("equinox_cycle_seconds", "Durée d'un cycle de scan complet")
+cycles_total = metrics.counter("equinox_cycles_total", "Cycles de scan terminés")
+symbols_total = metrics.counter("equinox_symbols_evaluated_total", "Symboles évalués")
+signals_total = metrics.counter("equinox_signals_total", "Signaux d'entrée détectés")
+rejections_total = metrics.counter("equinox_rejections_total", "Conditions d'entrée non remplies")
+exits_total = metrics.counter("equinox_exits_total", "Positions fermées")
+open_positions = metrics.gauge("equinox_open_positions", "Positions ouvertes")
+scan_skipped_total = metrics.counter("equinox_scan_skipped_total", "Symboles non réévalués (loin d'une entrée ou entrées inchangées)")
+close_to_signal_seconds = metrics.histogram("equinox_close_to_signal_seconds", "Délai entre la clôture d'une bougie et l'évaluation des signaux")
+
+# Logs : écriture par lots en arrière-plan, niveau DEBUG pour le détail par symbole, rotation par taille ou durée
+LOG_FILE = "console_log.txt"
+LOG_LEVEL = os.environ.get("EQUINOX_LOG_LEVEL", "INFO")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_INTERVAL = 24 * 3600
+logger = LogWriter(LOG_FILE, level=LOG_LEVEL, tz=tz_paris, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                   rotate_interval=LOG_ROTATE_INTERVAL, metrics=metrics)
+
 # Gestion des fichiers
 positions_file = "positions.csv"
 trades_file = "trades.csv"
 stats_file = "stats.csv"
 missed_trades_file = "missed_trades.txt"
-positions_backup_file = "positions_backup.csv"
-trades_backup_file = "trades_backup.csv"
-stats_backup_file = "stats_backup.csv"
-
-positions_columns = [
-    "Symbole", "Type", "Prix_Entree", "Quantite", "TP", "SL", "RSI", "EMA_30", "ATR", "ADX",
-    "Fib_1618", "Temps_Entree", "Position_ID", "Marge", "Levier"
-]
-trades_columns = [
-    "Symbole", "Type", "Prix_Entree", "Prix_Sortie", "Quantite", "PNL", "Raison_Sortie",
-    "RSI_Sortie", "EMA_30_Sortie", "ATR_Sortie", "Temps_Entree", "Temps_Sortie", "Position_ID",
-    "Marge", "Levier"
+journal_file = "journal.jsonl"
+# Courbe d'equity, ratios et détail par symbole pour le cockpit (taille bornée)
+analytics_file = "analytics.json"
+# Copie optionnelle de l'historique en colonnes typées, partitionnée par symbole et par jour (storage.py)
+TRADE_STORE_DIR = os.environ.get("EQUINOX_TRADE_STORE")
+trade_store = TradeStore(TRADE_STORE_DIR) if TRADE_STORE_DIR else None
+
+# Journal append-only (source de vérité des positions et trades) : politique fsync et compaction
+JOURNAL_FSYNC = os.environ.get("EQUINOX_JOURNAL_FSYNC", "interval")
+JOURNAL_COMPACT_EVENTS = 1000
+
+# Colonnes numériques relues depuis les CSV
+position_numeric_columns = ["Prix_Entree", "Quantite", "TP", "SL", "RSI", "EMA_30", "ATR", "ADX", "Fib_1618", "Marge", "Levier"]
+trade_numeric_columns = [
+    "Prix_Entree", "Prix_Sortie", "Quantite", "PNL", "RSI_Sortie", "EMA_30_Sortie", "ATR_Sortie", "Marge", "Levier"
 ]
-stats_columns = [
-    "Total_Trades", "Wins", "Losses", "Winrate", "Total_PNL", "Max_Drawdown", "Sharpe_Ratio",
-    "Update_Time"
-]
-
-# Initialisation des fichiers CSV
-for file, columns in [
-    (positions_file, positions_columns),
-    (trades_file, trades_columns),
-    (stats_file, stats_columns),
-    (positions_backup_file, positions_columns),
-    (trades_backup_file, trades_columns),
-    (stats_backup_file, stats_columns),
-]:
-    if not os.path.exists(file):
-        pd.DataFrame(columns=columns).to_csv(file, index=False)
-
-# Initialisation missed_trades.txt
-if not os.path.exists(missed_trades_file):
-    with open(missed_trades_file, "w") as f:
-        f.write("Trades manqués par raison:\n")
 
 # Variables globales
-positions = []
-positions_lock = threading.Lock()
-trades = []
+# Positions indexées par Position_ID et par symbole ; trades fermés de la session en tableau typé indexé par Position_ID
+positions = PositionBook()
+positions_lock = threading.RLock()
+# Position_ID en cours de réservation auprès du coordinateur (mode réparti)
+pending_slots = set()
+trades = TradeHistory()
 stats = {
     "Total_Trades": 0,
     "Wins": 0,
@@ -89,308 +129,549 @@ stats = {
     "Total_PNL": 0.0,
     "Max_Drawdown": 0.0,
     "Sharpe_Ratio": 0.0,
+    "Sortino_Ratio": 0.0,
+    "Profit_Factor": None,
 }
+analytics = Analytics()
 missed_trades_reasons = {}
-
-# Fonctions utilitaires
-def calculate_atr(highs, lows, closes, period=14):
-    tr = np.maximum(highs[1:] - lows[1:], np.abs(highs[1:] - closes[:-1]), np.abs(closes[:-1] - lows[1:]))
-    atr = np.mean(tr[-period:])
-    return atr
-
-def detect_market_structure(ohlcv):
-    highs = ohlcv[:, 2]
-    lows = ohlcv[:, 3]
-    if highs[-1] > highs[-2] and lows[-1] > lows[-2]:
-        return "Bullish"
-    elif highs[-1] < highs[-2] and lows[-1] < lows[-2]:
-        return "Bearish"
-    return "Neutral"
-
-def detect_breaker_block(ohlcv):
-    highs = ohlcv[:, 2]
-    lows = ohlcv[:, 3]
-    closes = ohlcv[:, 4]
-    for i in range(-3, -1):
-        if closes[i] < lows[i-1] and closes[i-1] > highs[i-2]:
-            return lows[i-1], "Bullish"
-        if closes[i] > highs[i-1] and closes[i-1] < lows[i-2]:
-            return highs[i-1], "Bearish"
-    return None, None
-
-def calculate_fibonacci(price, high, low):
-    diff = high - low
-    fib_0_5 = high - 0.5 * diff
-    fib_0_618 = high - 0.618 * diff
-    fib_0_705 = high - 0.705 * diff
-    fib_0_79 = high - 0.79 * diff
-    fib_0_9 = high - 0.9 * diff
-    fib_1618 = high + 0.618 * diff
-    return fib_0_5, fib_0_618, fib_0_705, fib_0_79, fib_0_9, fib_1618
+journal = Journal(journal_file, fsync=JOURNAL_FSYNC)
+events = EventBus()
+indicator_engine = IndicatorEngine()
+# Sorties TP/SL sur le plus haut / plus bas de tous les prix reçus (ticks et bougies du flux, photos REST, bougies 1m)
+exit_engine = ExitEngine(
+    tp_slippage=float(os.environ.get("EQUINOX_TP_SLIPPAGE", TP_SLIPPAGE)),
+    sl_slippage=float(os.environ.get("EQUINOX_SL_SLIPPAGE", SL_SLIPPAGE)),
+)
+market_state = MarketState(
+    on_price=lambda symbol, price: exit_engine.observe(symbol, price, price),
+    on_candle=exit_engine.observe_candle,
+    max_price_age=STREAM_PRICE_MAX_AGE,
+)
+cycle_metrics = {"Cycles": 0, "Symboles": 0, "Derniere_Duree": 0.0, "Duree_Max": 0.0}
+scheduler = ScanScheduler(SYMBOLS)
+last_exit_candles = 0.0
 
 def save_positions():
-    with positions_lock:
-        pd.DataFrame(positions).to_csv(positions_file, index=False)
-        pd.DataFrame(positions).to_csv(positions_backup_file, index=False)
-        print(f"[{datetime.now(tz_paris)}] Écriture réussie dans positions.csv")
-        with open("console_log.txt", "a") as f:
-            f.write(f"[{datetime.now(tz_paris)}] Écriture réussie dans positions.csv\n")
-
-def save_trades():
-    pd.DataFrame(trades).to_csv(trades_file, index=False)
-    pd.DataFrame(trades).to_csv(trades_backup_file, index=False)
-    print(f"[{datetime.now(tz_paris)}] Écriture réussie dans trades.csv")
-    with open("console_log.txt", "a") as f:
-        f.write(f"[{datetime.now(tz_paris)}] Écriture réussie dans trades.csv\n")
+    # Au plus MAX_POSITIONS lignes : réécriture atomique à coût constant
+    with positions_lock, persistence_seconds.time(file="positions"):
+        write_csv_atomic(positions_file, positions_columns, positions)
+        open_positions.set(len(positions))
+        events.publish("positions", positions.list())
+        logger.debug("Écriture réussie dans positions.csv")
+
+def save_trade(trade, row=None):
+    # Ajout du seul trade fermé en fin de trades.csv ; row : ligne typée déjà construite par TradeHistory
+    with persistence_seconds.time(file="trades"):
+        append_csv(trades_file, trades_columns, trade)
+    if trade_store is not None:
+        with persistence_seconds.time(file="trade_store"):
+            trade_store.append(row if row is not None else [trade])
+    events.publish("trade", trade)
+    logger.debug("Écriture réussie dans trades.csv")
 
 def save_stats():
     stats["Update_Time"] = str(datetime.now(tz_paris))
-    stats_df = pd.DataFrame([stats], columns=stats_columns)
-    stats_df.to_csv(stats_file, index=False)
-    stats_df.to_csv(stats_backup_file, index=False)
-    with open(missed_trades_file, "w") as f:
-        f.write("Trades manqués par raison:\n")
-        for reason, count in missed_trades_reasons.items():
-            f.write(f"- {reason}: {count}\n")
-    print(f"[{datetime.now(tz_paris)}] Écriture réussie dans stats.csv et missed_trades.txt")
-    with open("console_log.txt", "a") as f:
-        f.write(f"[{datetime.now(tz_paris)}] Écriture réussie dans stats.csv et missed_trades.txt\n")
+    with persistence_seconds.time(file="stats"):
+        write_csv_atomic(stats_file, stats_columns, [stats])
+        with open(missed_trades_file, "w") as f:
+            f.write("Trades manqués par raison:\n")
+            for reason, count in missed_trades_reasons.items():
+                f.write(f"- {reason}: {count}\n")
+        snapshot = analytics.snapshot()
+        write_json_atomic(analytics_file, snapshot)
+    events.publish("stats", dict(stats))
+    events.publish("missed_trades", dict(missed_trades_reasons))
+    events.publish("analytics", snapshot)
+    logger.debug("Écriture réussie dans stats.csv, missed_trades.txt et analytics.json")
+
+def update_stats(trade):
+    # O(1) par trade fermé : compteurs, puis drawdown et ratios tenus à jour par analytics
+    pnl = trade["PNL"]
+    stats["Total_Trades"] += 1
+    if pnl > 0:
+        stats["Wins"] += 1
+    else:
+        stats["Losses"] += 1
+    stats["Winrate"] = stats["Wins"] / stats["Total_Trades"] if stats["Total_Trades"] > 0 else 0.0
+    stats["Total_PNL"] += pnl
+    analytics.update(pnl, trade["Symbole"], trade["Temps_Sortie"])
+    stats.update(analytics.values())
+
+def init_files():
+    # Fichiers lus par le cockpit, créés vides au premier démarrage
+    for file, columns in [
+        (positions_file, positions_columns),
+        (trades_file, trades_columns),
+        (stats_file, stats_columns),
+    ]:
+        if not os.path.exists(file):
+            write_csv_atomic(file, columns, [])
+    if not os.path.exists(missed_trades_file):
+        with open(missed_trades_file, "w") as f:
+            f.write("Trades manqués par raison:\n")
+
+def compact_journal():
+    # Tous les trades fermés sont dans trades.csv : le journal est remplacé par les positions ouvertes et les stats,
+    # avec la taille de trades.csv à cet instant pour ne relire que la suite au redémarrage
+    with positions_lock:
+        fsync_path(trades_file)
+        journal.compact(positions=positions.list(), stats=stats, analytics=analytics.state(), trades_size=os.path.getsize(trades_file))
+
+def restore_state():
+    global analytics
+    # Reconstruction au démarrage depuis le dernier point de reprise du journal (positions, stats) et les événements suivants :
+    # le coût ne dépend pas de la taille de l'historique, qui reste sur disque (trades.csv, stockage en colonnes)
+    truncate_partial_line(trades_file)
+    checkpoint, restored_positions, journal_trades = rebuild_journal(journal.records())
+    if not os.path.exists(journal_file) and os.path.exists(positions_file):
+        # Premier démarrage avec journal : reprise des positions de positions.csv
+        restored_positions = read_csv(positions_file, position_numeric_columns)
+    if checkpoint is not None and "stats" in checkpoint and "analytics" in checkpoint:
+        offset, base_stats = checkpoint["trades_size"], checkpoint["stats"]
+    else:
+        # Pas de stats dans le journal : recalcul unique sur tout trades.csv
+        offset, base_stats = 0, None
+    saved_trades = read_csv(trades_file, trade_numeric_columns, offset=offset) if os.path.exists(trades_file) else []
+    known_ids = {trade["Position_ID"] for trade in saved_trades}
+    for trade in journal_trades:
+        if trade["Position_ID"] not in known_ids:
+            # Trade journalisé mais absent de trades.csv (arrêt entre les deux écritures)
+            save_trade(trade)
+            saved_trades.append(trade)
+    if os.path.exists(missed_trades_file):
+        with open(missed_trades_file, "r") as f:
+            for line in f:
+                if line.startswith("- "):
+                    reason, count = line[2:].rstrip("\n").rsplit(": ", 1)
+                    missed_trades_reasons[reason] = int(count)
+
+    with positions_lock:
+        positions.reset(restored_positions)
+        exit_engine.reset(positions)
+        if base_stats is not None:
+            stats.update(base_stats)
+            analytics = Analytics.from_state(checkpoint["analytics"])
+            # Trades fermés depuis le point de reprise : ceux du journal font foi
+            for trade in journal_trades:
+                update_stats(trade)
+        else:
+            for key in ("Total_Trades", "Wins", "Losses"):
+                stats[key] = 0
+            stats["Winrate"] = 0.0
+            stats["Total_PNL"] = 0.0
+            analytics = Analytics()
+            for trade in saved_trades:
+                update_stats(trade)
+        compact_journal()
+        save_positions()
+        save_stats()
+    logger.info(f"État restauré: {len(positions)} positions, {stats['Total_Trades']} trades, Total_PNL={stats['Total_PNL']:.2f} USDT",
+                positions=len(positions), trades=stats["Total_Trades"], total_pnl=stats["Total_PNL"])
 
 def keep_alive():
     while True:
-        print(f"[{datetime.now(tz_paris)}] Keep alive...")
-        with open("console_log.txt", "a") as f:
-            f.write(f"[{datetime.now(tz_paris)}] Keep alive...\n")
+        logger.debug("Keep alive...")
         time.sleep(60)
 
-def main():
-    print(f"[{datetime.now(tz_paris)}] Tous les imports réussis")
-    with open("console_log.txt", "a") as f:
-        f.write(f"[{datetime.now(tz_paris)}] Tous les imports réussis\n")
-    threading.Thread(target=keep_alive, daemon=True).start()
+def save_metrics():
+    snapshot = metrics.snapshot()
+    write_json_atomic(METRICS_FILE, snapshot)
+    events.publish("metrics", snapshot)
 
+def publish_metrics():
+    # Photo périodique des métriques pour le cockpit (metrics.json et flux d'événements)
     while True:
-        print(f"[{datetime.now(tz_paris)}] Début de la boucle principale")
-        with open("console_log.txt", "a") as f:
-            f.write(f"[{datetime.now(tz_paris)}] Début de la boucle principale\n")
-
-        for symbol in SYMBOLS:
-            print(f"[{datetime.now(tz_paris)}] Analyse de {symbol}")
-            with open("console_log.txt", "a") as f:
-                f.write(f"[{datetime.now(tz_paris)}] Analyse de {symbol}\n")
-            try:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            save_metrics()
+        except Exception as e:
+            logger.error(f"Erreur métriques: {e}")
+        try:
+            sync_slots()
+        except (OSError, ValueError) as e:
+            logger.error(f"Coordinateur injoignable: {e}")
+
+# Appels REST : rate limit partagé entre tous les workers de scan, nouvelles tentatives avec backoff aléatoire,
+# disjoncteur par méthode et regroupement des appels identiques simultanés
+exchange_client = ExchangeClient(exchange, metrics=metrics)
+
+def api_call(method, *args, **kwargs):
+    return exchange_client.call(method, *args, **kwargs)
+
+def fetch_ohlcv_rest(symbol, timeframe, since=None, limit=None):
+    return api_call(exchange.fetch_ohlcv, symbol, timeframe, since=since, limit=limit)
+
+# Bougies 1h/15m conservées entre les cycles (rechargées depuis CANDLE_CACHE_DIR au démarrage)
+candle_cache = CandleCache(fetch_ohlcv_rest, capacity=200, cache_dir=CANDLE_CACHE_DIR)
+
+# Prix de tous les symboles en un seul appel, partagés par la surveillance des positions
+price_snapshot = PriceSnapshot(exchange, SYMBOLS, max_age=MONITOR_INTERVAL, call=api_call)
+
+def can_open_position(symbol):
+    with positions_lock:
+        if len(positions) >= MAX_POSITIONS:
+            logger.debug(f"{symbol} : Max positions atteint ({MAX_POSITIONS})", symbol=symbol)
+            return False
+        if positions.has_symbol(symbol):
+            logger.debug(f"{symbol} : Doublon détecté, skip", symbol=symbol)
+            return False
+    return True
+
+def acquire_slot(position):
+    # Plafond global des positions entre shards ; coordinateur injoignable : pas d'ouverture
+    if coordinator is None:
+        return True
+    try:
+        granted = coordinator.acquire(position)
+    except (OSError, ValueError) as e:
+        logger.error(f"Coordinateur injoignable: {e}")
+        return False
+    if not granted:
+        logger.debug(f"{position['Symbole']} : refusé par le coordinateur", symbol=position["Symbole"])
+    return granted
+
+def release_slot(position_id):
+    if coordinator is None:
+        return
+    try:
+        coordinator.release(position_id)
+    except (OSError, ValueError) as e:
+        # Rattrapé par la synchronisation périodique (publish_metrics)
+        logger.error(f"Coordinateur injoignable: {e}")
+
+def sync_slots():
+    # Appel HTTP hors du verrou des positions : un coordinateur lent ne bloque pas la surveillance des sorties.
+    # La séquence est prise avec la photo : le coordinateur ignore la photo si une réservation ou libération
+    # plus récente l'a devancée ; les réservations en cours sont déclarées pour ne pas être perdues
+    if coordinator is None:
+        return
+    with positions_lock:
+        snapshot, pending = positions.list(), list(pending_slots)
+        sequence = coordinator.next_sequence()
+    if not coordinator.sync(snapshot, pending, sequence):
+        logger.debug("Synchronisation du coordinateur ignorée (photo périmée)")
+
+def open_position(position):
+    # Réservation auprès du coordinateur hors du verrou, puis re-vérification sous verrou :
+    # un autre worker a pu ouvrir une position pendant l'analyse ou la réservation
+    position_id = position["Position_ID"]
+    if not can_open_position(position["Symbole"]):
+        return False
+    with positions_lock:
+        pending_slots.add(position_id)
+    try:
+        acquired = acquire_slot(position)
+    except Exception:
+        with positions_lock:
+            pending_slots.discard(position_id)
+        raise
+    with positions_lock:
+        pending_slots.discard(position_id)
+        opened = acquired and can_open_position(position["Symbole"])
+        if opened:
+            positions.add(position)
+            exit_engine.add(position)
+            journal.append("open", position=position)
+            save_positions()
+    if acquired and not opened:
+        release_slot(position_id)
+    return opened
+
+def close_position(pos, current_price, reason):
+    symbol = pos["Symbole"]
+    # Indicateurs de sortie : ceux des bougies vues à l'entrée, comme auparavant (sans recalcul)
+    rsi_exit, ema_exit, atr_15m = pos["RSI"], pos["EMA_30"], pos["ATR"]
+
+    # Calcul du PNL
+    pnl = (current_price - pos["Prix_Entree"]) * pos["Quantite"] if pos["Type"] == "Long" else (pos["Prix_Entree"] - current_price) * pos["Quantite"]
+    trade = {
+        "Symbole": symbol,
+        "Type": pos["Type"],
+        "Prix_Entree": pos["Prix_Entree"],
+        "Prix_Sortie": current_price,
+        "Quantite": pos["Quantite"],
+        "PNL": pnl,
+        "Raison_Sortie": reason,
+        "RSI_Sortie": rsi_exit,
+        "EMA_30_Sortie": ema_exit,
+        "ATR_Sortie": atr_15m,
+        "Temps_Entree": pos["Temps_Entree"],
+        "Temps_Sortie": str(datetime.now(tz_paris)),
+        "Position_ID": pos["Position_ID"],
+        "Marge": pos["Marge"],
+        "Levier": pos["Levier"]
+    }
+
+    with positions_lock:
+        positions.remove(pos["Position_ID"])
+        exit_engine.remove(pos["Position_ID"])
+        row = trades.append(trade)
+        journal.append("close", trade=trade)
+        save_trade(trade, row)
+        save_positions()
+        update_stats(trade)
+        save_stats()
+        if journal.events >= JOURNAL_COMPACT_EVENTS:
+            compact_journal()
+    release_slot(pos["Position_ID"])
+
+    logger.info(f"{symbol} {pos['Type']} sorti: Price={current_price}, PNL={pnl:.2f} USDT, Total_PNL={stats['Total_PNL']:.2f} USDT, Reason={reason}",
+                event="exit", symbol=symbol, type=pos["Type"], price=current_price, pnl=pnl, reason=reason, position_id=pos["Position_ID"])
+
+def observe_exit_candles():
+    # Hors streaming : bougies 1m récentes des symboles ouverts, pour les mèches entre deux photos des prix
+    global last_exit_candles
+    if STREAMING_MODE or time.monotonic() - last_exit_candles < EXIT_CANDLE_INTERVAL:
+        return
+    last_exit_candles = time.monotonic()
+    with positions_lock:
+        symbols = positions.symbols()
+    for symbol in symbols:
+        for candle in api_call(exchange.fetch_ohlcv, symbol, "1m", limit=EXIT_CANDLE_LIMIT):
+            exit_engine.observe_candle(symbol, "1m", candle)
+
+def check_positions():
+    # Prix reçus depuis la vérification précédente (photo des prix en un seul appel, ticks et bougies du flux),
+    # puis sorties des seules positions dont le TP ou le SL a été touché
+    with positions_lock:
+        open_positions = positions.list()
+    if not open_positions:
+        return 0
+    try:
+        timestamp, prices = time.time(), market_state.get_prices() if STREAMING_MODE else {}
+        # Repli REST si le flux n'a pas encore de prix, ou plus de prix récent, pour un des symboles ouverts
+        if any(pos["Symbole"] not in prices for pos in open_positions):
+            timestamp, prices = price_snapshot.get()
+            for symbol, price in prices.items():
+                exit_engine.observe(symbol, price, price)
+    except Exception as e:
+        logger.error(f"Erreur prix: {e}")
+        return 0
+    try:
+        observe_exit_candles()
+    except Exception as e:
+        logger.error(f"Erreur bougies 1m: {e}")
+    events.publish("prices", {"timestamp": timestamp, "prices": prices})
+    closed = 0
+    for pos, fill_price, reason in exit_engine.collect():
+        close_position(pos, fill_price, reason)
+        exits_total.inc(reason=reason)
+        closed += 1
+    return closed
+
+def monitor_positions():
+    # Thread de surveillance des sorties, indépendant du scan des entrées
+    version = 0
+    while True:
+        try:
+            check_positions()
+        except Exception as e:
+            logger.error(f"Erreur surveillance positions: {e}")
+        if STREAMING_MODE:
+            # En streaming, on réagit au tick suivant au lieu d'attendre MONITOR_INTERVAL
+            version = market_state.wait_for_update(version, timeout=MONITOR_INTERVAL)
+        else:
+            time.sleep(MONITOR_INTERVAL)
+
+def fetch_ohlcv(symbol, timeframe):
+    with ohlcv_seconds.time(timeframe=timeframe):
+        return load_ohlcv(symbol, timeframe)
+
+def load_ohlcv(symbol, timeframe):
+    # En streaming, les bougies viennent de l'état en mémoire ; sinon le cache ne télécharge que les bougies manquantes
+    if STREAMING_MODE:
+        ohlcv = market_state.get_ohlcv(symbol, timeframe)
+        if len(ohlcv) >= 50:
+            return ohlcv
+    ohlcv = candle_cache.get(symbol, timeframe)
+    if STREAMING_MODE:
+        market_state.seed(symbol, timeframe, ohlcv.tolist())
+    return ohlcv
+
+def stream_error(symbol, error):
+    logger.error(f"Erreur flux {symbol}: {error}", symbol=symbol)
+
+def start_events():
+    try:
+        server = EventServer(events, port=EVENTS_PORT, metrics=metrics).start()
+    except OSError as e:
+        logger.error(f"Flux d'événements indisponible sur le port {EVENTS_PORT}: {e}")
+        return None
+    logger.info(f"Flux d'événements: http://127.0.0.1:{server.port}/events")
+    return server
+
+def start_stream():
+    if STREAM_REPLAY_FILE:
+        feed = ReplayFeed.from_file(STREAM_REPLAY_FILE, market_state)
+    else:
+        feed = ExchangeStream(EXCHANGE_ID, SYMBOLS, ["1h", "15m"], market_state, on_error=stream_error)
+    feed.start()
+    logger.info(f"Mode streaming actif ({'rejeu ' + STREAM_REPLAY_FILE if STREAM_REPLAY_FILE else 'WebSocket'})")
+    return feed
+
+def fetch_symbol_data(symbol):
+    logger.debug(f"Analyse de {symbol}", symbol=symbol)
+    try:
+        if not can_open_position(symbol):
+            return None
+
+        ohlcv_1h = fetch_ohlcv(symbol, "1h")
+        ohlcv_15m = fetch_ohlcv(symbol, "15m")
+        if len(ohlcv_1h) < 50 or len(ohlcv_15m) < 50:
+            logger.warning(f"{symbol} : Données insuffisantes", symbol=symbol)
+            return None
+        return symbol, np.asarray(ohlcv_1h, dtype=np.float64), np.asarray(ohlcv_15m, dtype=np.float64)
+
+    except CircuitOpenError as e:
+        # Exchange en panne : le symbole est ignoré sans attendre, il sera repris au prochain passage
+        logger.warning(f"{symbol} ignoré: {e}", symbol=symbol)
+        return None
+    except Exception as e:
+        # Les erreurs réseau ont déjà été retentées par exchange_client : pas d'attente supplémentaire
+        logger.error(f"Erreur {symbol}: {e}", symbol=symbol)
+        return None
+
+def evaluate_symbols(data):
+    # Une seule passe vectorisée sur tous les symboles ; seules les 50 dernières bougies servent aux conditions
+    symbols = [symbol for symbol, _, _ in data]
+    with signal_seconds.time():
+        result = signals.evaluate(
+            np.stack([ohlcv_1h[-SIGNAL_WINDOW:] for _, ohlcv_1h, _ in data]),
+            np.stack([ohlcv_15m[-SIGNAL_WINDOW:] for _, _, ohlcv_15m in data]),
+            [MIN_ATR.get(symbol, MIN_ATR["default"]) for symbol in symbols],
+        )
+    symbols_total.inc(len(symbols))
+    for flag, name in signals.REASON_NAMES.items():
+        rejected = int(np.count_nonzero(result["reasons"] & flag))
+        if rejected:
+            rejections_total.inc(rejected, reason=name)
+    for index, (symbol, _, ohlcv_15m) in enumerate(data):
+        try:
+            if not result["long"][index] and not result["short"][index]:
+                reasons = signals.reason_labels(result, index)
                 with positions_lock:
-                    if len(positions) >= MAX_POSITIONS:
-                        print(f"[{datetime.now(tz_paris)}] {symbol} : Max positions atteint ({MAX_POSITIONS})")
-                        with open("console_log.txt", "a") as f:
-                            f.write(f"[{datetime.now(tz_paris)}] {symbol} : Max positions atteint ({MAX_POSITIONS})\n")
-                        continue
-                    if sum(1 for p in positions if p["Symbole"] == symbol) > 0:
-                        print(f"[{datetime.now(tz_paris)}] {symbol} : Doublon détecté, skip")
-                        with open("console_log.txt", "a") as f:
-                            f.write(f"[{datetime.now(tz_paris)}] {symbol} : Doublon détecté, skip\n")
-                        continue
-
-                params = SYMBOL_PARAMS.get(symbol, SYMBOL_PARAMS["default"])
-                min_atr = MIN_ATR.get(symbol, MIN_ATR["default"])
-
-                ohlcv_1h = exchange.fetch_ohlcv(symbol, "1h", limit=200)
-                ohlcv_15m = exchange.fetch_ohlcv(symbol, "15m", limit=200)
-                if len(ohlcv_1h) < 50 or len(ohlcv_15m) < 50:
-                    print(f"[{datetime.now(tz_paris)}] {symbol} : Données insuffisantes")
-                    with open("console_log.txt", "a") as f:
-                        f.write(f"[{datetime.now(tz_paris)}] {symbol} : Données insuffisantes\n")
-                    continue
-
-                ohlcv_1h = np.array(ohlcv_1h)
-                ohlcv_15m = np.array(ohlcv_15m)
-                closes_1h, highs_1h, lows_1h = ohlcv_1h[:, 4], ohlcv_1h[:, 2], ohlcv_1h[:, 3]
-                closes_15m, highs_15m, lows_15m, volumes_15m = ohlcv_15m[:, 4], ohlcv_15m[:, 2], ohlcv_15m[:, 3], ohlcv_15m[:, 5]
-
-                price = round(closes_15m[-1], 8)
-                atr_15m = calculate_atr(highs_15m, lows_15m, closes_15m)
-                mean_volume = np.mean(volumes_15m[-20:])
-
-                market_structure = detect_market_structure(ohlcv_1h)
-                bb_price, bb_type = detect_breaker_block(ohlcv_15m)
-                fib_0_5, fib_0_618, fib_0_705, fib_0_79, fib_0_9, fib_1618 = calculate_fibonacci(price, max(highs_1h[-50:]), min(lows_1h[-50:]))
-                rsi = ta.momentum.RSIIndicator(pd.Series(closes_15m)).rsi().iloc[-1]
-                ema_30 = ta.trend.EMAIndicator(pd.Series(closes_15m), window=30).ema_indicator().iloc[-1]
-                adx = ta.trend.ADXIndicator(pd.Series(highs_15m), pd.Series(lows_15m), pd.Series(closes_15m)).adx().iloc[-1]
-
-                reasons = []
-                long_condition = True
-                if market_structure != "Bullish":
-                    reasons.append("Market Structure pas Bullish")
-                    long_condition = False
-                if bb_price is None or bb_type != "Bullish":
-                    reasons.append("Pas de Breaker Block Bullish")
-                    long_condition = False
-                if bb_price is not None and abs(price - bb_price) / price >= 0.07:
-                    reasons.append("Prix trop éloigné du Breaker Block")
-                    long_condition = False
-                if not (fib_0_5 <= price <= fib_0_9):
-                    reasons.append("Prix hors de la zone Fibonacci [0.5-0.9]")
-                    long_condition = False
-                if atr_15m < min_atr * 0.25:
-                    reasons.append(f"ATR trop faible ({atr_15m:.8f} < {min_atr * 0.25:.8f})")
-                    long_condition = False
-                if volumes_15m[-1] <= mean_volume * 0.5:
-                    reasons.append(f"Volume trop faible ({volumes_15m[-1]:.2f} < {mean_volume * 0.5:.2f})")
-                    long_condition = False
-
-                short_condition = True
-                if market_structure != "Bearish":
-                    reasons.append("Market Structure pas Bearish")
-                    short_condition = False
-                if bb_price is None or bb_type != "Bearish":
-                    reasons.append("Pas de Breaker Block Bearish")
-                    short_condition = False
-                if bb_price is not None and abs(price - bb_price) / price >= 0.07:
-                    reasons.append("Prix trop éloigné du Breaker Block")
-                    short_condition = False
-                if not (fib_0_5 <= price <= fib_0_9):
-                    reasons.append("Prix hors de la zone Fibonacci [0.5-0.9]")
-                    short_condition = False
-                if atr_15m < min_atr * 0.25:
-                    reasons.append(f"ATR trop faible ({atr_15m:.8f} < {min_atr * 0.25:.8f})")
-                    short_condition = False
-                if volumes_15m[-1] <= mean_volume * 0.5:
-                    reasons.append(f"Volume trop faible ({volumes_15m[-1]:.2f} < {mean_volume * 0.5:.2f})")
-                    short_condition = False
-
-                if not long_condition and not short_condition:
                     for reason in reasons:
                         missed_trades_reasons[reason] = missed_trades_reasons.get(reason, 0) + 1
-                    print(f"[{datetime.now(tz_paris)}] {symbol} : Aucune condition d'entrée remplie")
-                    print(f"  Raison(s) : {', '.join(reasons)}")
-                    with open("console_log.txt", "a") as f:
-                        f.write(f"[{datetime.now(tz_paris)}] {symbol} : Aucune condition d'entrée remplie\n")
-                        f.write(f"  Raison(s) : {', '.join(reasons)}\n")
-                    continue
-
-                if long_condition:
-                    position_type = "Long"
-                    sl_price = price - atr_15m * params["sl_ratio"]
-                    tp_price = price + atr_15m * params["tp_ratio"]
-                elif short_condition:
-                    position_type = "Short"
-                    sl_price = price + atr_15m * params["sl_ratio"]
-                    tp_price = price - atr_15m * params["tp_ratio"]
-
-                margin = 100.0
-                leverage = 10.0
-                position_size = margin * leverage
-                quantity = position_size / price
-
-                position = {
-                    "Symbole": symbol,
-                    "Type": position_type,
-                    "Prix_Entree": price,
-                    "Quantite": quantity,
-                    "TP": tp_price,
-                    "SL": sl_price,
-                    "RSI": rsi,
-                    "EMA_30": ema_30,
-                    "ATR": atr_15m,
-                    "ADX": adx,
-                    "Fib_1618": fib_1618,
-                    "Temps_Entree": str(datetime.now(tz_paris)),
-                    "Position_ID": f"{symbol}_{datetime.now().timestamp()}",
-                    "Marge": margin,
-                    "Levier": leverage
-                }
+                logger.debug(f"{symbol} : Aucune condition d'entrée remplie", symbol=symbol, reasons=reasons)
+                continue
+            position_type = "Long" if result["long"][index] else "Short"
+            signals_total.inc(side=position_type)
+            enter_position(symbol, position_type, ohlcv_15m, result, index)
+        except Exception as e:
+            logger.error(f"Erreur {symbol}: {e}", symbol=symbol)
+    return result
+
+def enter_position(symbol, position_type, ohlcv_15m, result, index):
+    params = SYMBOL_PARAMS.get(symbol, SYMBOL_PARAMS["default"])
+    price = result["price"][index]
+    atr_15m = result["atr"][index]
+    # RSI/EMA/ADX mis à jour en O(1) par bougie clôturée, calculés uniquement pour les entrées
+    with indicator_seconds.time():
+        indicators = indicator_engine.sync(symbol, "15m", ohlcv_15m)
+
+    if position_type == "Long":
+        sl_price = price - atr_15m * params["sl_ratio"]
+        tp_price = price + atr_15m * params["tp_ratio"]
+    else:
+        sl_price = price + atr_15m * params["sl_ratio"]
+        tp_price = price - atr_15m * params["tp_ratio"]
+
+    margin = MARGIN
+    leverage = LEVERAGE
+    position_size = margin * leverage
+    quantity = position_size / price
+
+    position = {
+        "Symbole": symbol,
+        "Type": position_type,
+        "Prix_Entree": price,
+        "Quantite": quantity,
+        "TP": tp_price,
+        "SL": sl_price,
+        "RSI": indicators["rsi"],
+        "EMA_30": indicators["ema"],
+        "ATR": atr_15m,
+        "ADX": indicators["adx"],
+        "Fib_1618": result["fib_1618"][index],
+        "Temps_Entree": str(datetime.now(tz_paris)),
+        "Position_ID": f"{symbol}_{datetime.now().timestamp()}",
+        "Marge": margin,
+        "Levier": leverage
+    }
+
+    if not open_position(position):
+        return None
+
+    logger.info(f"{symbol} {position_type} entré: Price={price}, Marge={margin} USDT, Levier={leverage}x",
+                event="entry", symbol=symbol, type=position_type, price=price, tp=tp_price, sl=sl_price, position_id=position["Position_ID"])
+    return position
+
+def scan_cycle(executor, symbols=None, closed_at=None):
+    # Un cycle = bougies des symboles récupérées en parallèle, puis une évaluation vectorisée
+    # des seuls symboles dont les entrées ont changé ; la durée mesurée permet de suivre la mise à l'échelle
+    symbols = SYMBOLS if symbols is None else symbols
+    start = time.monotonic()
+    fetched = [item for item in executor.map(fetch_symbol_data, symbols) if item is not None]
+    data = [item for item in fetched if scheduler.changed(*item)]
+    if len(data) < len(fetched):
+        scan_skipped_total.inc(len(fetched) - len(data), reason="unchanged")
+    if data:
+        result = evaluate_symbols(data)
+        scheduler.update([symbol for symbol, _, _ in data], result)
+        if closed_at is not None:
+            close_to_signal_seconds.observe(time.time() - closed_at)
+    duration = time.monotonic() - start
+    cycle_seconds.observe(duration)
+    cycles_total.inc()
+    cycle_metrics["Cycles"] += 1
+    cycle_metrics["Symboles"] = len(symbols)
+    cycle_metrics["Derniere_Duree"] = duration
+    cycle_metrics["Duree_Max"] = max(cycle_metrics["Duree_Max"], duration)
+    if cycle_metrics["Cycles"] % CANDLE_CACHE_SAVE_CYCLES == 0:
+        candle_cache.save()
+    logger.info(f"Cycle terminé: {len(symbols)} symboles ({len(data)} évalués) en {duration:.2f}s ({SCAN_WORKERS} workers)",
+                event="cycle", symbols=len(symbols), evaluated=len(data), duration=round(duration, 3))
+    return duration
 
-                with positions_lock:
-                    positions.append(position)
-                    save_positions()
-
-                print(f"[{datetime.now(tz_paris)}] {symbol} {position_type} entré: Price={price}, Marge={margin} USDT, Levier={leverage}x")
-                with open("console_log.txt", "a") as f:
-                    f.write(f"[{datetime.now(tz_paris)}] {symbol} {position_type} entré: Price={price}, Marge={margin} USDT, Levier={leverage}x\n")
-
-                # Gestion des sorties (SL/TP)
-                while True:
-                    current_price = exchange.fetch_ticker(symbol)["last"]
-                    with positions_lock:
-                        for pos in positions:
-                            if pos["Symbole"] == symbol and pos["Position_ID"] == position["Position_ID"]:
-                                if pos["Type"] == "Long":
-                                    if current_price >= pos["TP"]:
-                                        reason = "TP Hit"
-                                        break
-                                    if current_price <= pos["SL"]:
-                                        reason = "SL Hit"
-                                        break
-                                else:
-                                    if current_price <= pos["TP"]:
-                                        reason = "TP Hit"
-                                        break
-                                    if current_price >= pos["SL"]:
-                                        reason = "SL Hit"
-                                        break
-                        else:
-                            continue
-                        break
-
-                # Calcul du PNL
-                pnl = (current_price - pos["Prix_Entree"]) * pos["Quantite"] if pos["Type"] == "Long" else (pos["Prix_Entree"] - current_price) * pos["Quantite"]
-                trade = {
-                    "Symbole": symbol,
-                    "Type": pos["Type"],
-                    "Prix_Entree": pos["Prix_Entree"],
-                    "Prix_Sortie": current_price,
-                    "Quantite": pos["Quantite"],
-                    "PNL": pnl,
-                    "Raison_Sortie": reason,
-                    "RSI_Sortie": ta.momentum.RSIIndicator(pd.Series(closes_15m)).rsi().iloc[-1],
-                    "EMA_30_Sortie": ta.trend.EMAIndicator(pd.Series(closes_15m), window=30).ema_indicator().iloc[-1],
-                    "ATR_Sortie": atr_15m,
-                    "Temps_Entree": pos["Temps_Entree"],
-                    "Temps_Sortie": str(datetime.now(tz_paris)),
-                    "Position_ID": pos["Position_ID"],
-                    "Marge": margin,
-                    "Levier": leverage
-                }
-
-                with positions_lock:
-                    positions.remove(pos)
-                    trades.append(trade)
-                    save_positions()
-                    save_trades()
-
-                stats["Total_Trades"] += 1
-                if pnl > 0:
-                    stats["Wins"] += 1
-                else:
-                    stats["Losses"] += 1
-                stats["Winrate"] = stats["Wins"] / stats["Total_Trades"] if stats["Total_Trades"] > 0 else 0.0
-                stats["Total_PNL"] += pnl
-                stats["Update_Time"] = str(datetime.now(tz_paris))
-                save_stats()
-
-                print(f"[{datetime.now(tz_paris)}] {symbol} {pos['Type']} sorti: Price={current_price}, PNL={pnl:.2f} USDT, Total_PNL={stats['Total_PNL']:.2f} USDT, Reason={reason}")
-                with open("console_log.txt", "a") as f:
-                    f.write(f"[{datetime.now(tz_paris)}] {symbol} {pos['Type']} sorti: Price={current_price}, PNL={pnl:.2f} USDT, Total_PNL={stats['Total_PNL']:.2f} USDT, Reason={reason}\n")
-
-            except Exception as e:
-                print(f"[{datetime.now(tz_paris)}] Erreur {symbol}: {e}")
-                with open("console_log.txt", "a") as f:
-                    f.write(f"[{datetime.now(tz_paris)}] Erreur {symbol}: {e}\n")
-                time.sleep(5)
-
-        time.sleep(30)
+def main():
+    logger.info("Tous les imports réussis")
+    threading.Thread(target=keep_alive, daemon=True).start()
+    threading.Thread(target=publish_metrics, daemon=True).start()
+    if EVENTS_PORT:
+        start_events()
+    # Surveillance des positions reprise dès l'état restauré, avant le rechargement des bougies
+    init_files()
+    restore_state()
+    try:
+        sync_slots()
+    except (OSError, ValueError) as e:
+        logger.error(f"Coordinateur injoignable: {e}")
+    threading.Thread(target=monitor_positions, daemon=True).start()
+    loaded = candle_cache.load()
+    logger.info(f"Cache bougies: {loaded} séries rechargées")
+    if STREAMING_MODE:
+        start_stream()
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="scan") as executor:
+        while True:
+            # Attente de la prochaine clôture de bougie (tous les symboles, les plus proches d'une entrée d'abord)
+            # ou du prochain passage sur les seuls symboles proches d'une entrée
+            closed_at, batches = scheduler.next_batch()
+            logger.debug("Début de la boucle principale", closed=closed_at is not None)
+            skipped = len(SYMBOLS) - sum(len(batch) for batch in batches)
+            if skipped:
+                scan_skipped_total.inc(skipped, reason="cold")
+            for batch in batches:
+                scan_cycle(executor, batch, closed_at)
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        print(f"[{datetime.now(tz_paris)}] ===== ARRÊT DU BOT =====")
-        with open("console_log.txt", "a") as f:
-            f.write(f"[{datetime.now(tz_paris)}] ===== ARRÊT DU BOT =====\n")
-        print(f"[{datetime.now(tz_paris)}] Sauvegarde des données...")
-        with open("console_log.txt", "a") as f:
-            f.write(f"[{datetime.now(tz_paris)}] Sauvegarde des données...\n")
+        logger.info("===== ARRÊT DU BOT =====")
+        logger.info("Sauvegarde des données...")
         save_positions()
-        save_trades()
         save_stats()
+        journal.close()
+        candle_cache.save()
+        logger.close()
@@ -0,0 +1,132 @@
+# candles.py
+import os
+import threading
+import time
+
+import numpy as np
+
+TIMEFRAME_MS = {"1m": 60000, "5m": 300000, "15m": 900000, "30m": 1800000, "1h": 3600000, "4h": 14400000, "1d": 86400000}
+
+
+# Tampon circulaire préalloué de bougies OHLCV (timestamp, open, high, low, close, volume)
+# Chaque bougie est écrite deux fois (i et i + capacité) pour que view() renvoie une vue contiguë sans copie
+class CandleStore:
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.buffer = np.zeros((2 * capacity, 6), dtype=np.float64)
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return int(self.view()[-1, 0])
+
+    def view(self):
+        return self.buffer[self.start:self.start + self.count]
+
+    def write(self, index, candle):
+        self.buffer[index] = candle
+        self.buffer[(index + self.capacity) % (2 * self.capacity)] = candle
+
+    def append(self, candle):
+        if self.count < self.capacity:
+            self.write(self.start + self.count, candle)
+            self.count += 1
+        else:
+            # La plus ancienne bougie est écrasée, la fenêtre avance d'une case
+            self.write(self.start, candle)
+            self.start = (self.start + 1) % self.capacity
+
+    def merge(self, ohlcv):
+        # Met à jour la dernière bougie (encore ouverte) et ajoute les suivantes ; renvoie le nombre de nouvelles bougies
+        added = 0
+        for candle in ohlcv:
+            last = self.last_timestamp()
+            if last is not None and candle[0] == last:
+                self.write(self.start + self.count - 1, candle)
+            elif last is None or candle[0] > last:
+                self.append(candle)
+                added += 1
+        return added
+
+    def reset(self, ohlcv):
+        self.start = 0
+        self.count = 0
+        self.merge(ohlcv[-self.capacity:])
+
+
+# Cache des bougies par (symbole, timeframe) : amorçage complet une fois, puis uniquement les bougies manquantes via since=
+class CandleCache:
+    def __init__(self, fetch, capacity=200, cache_dir=None):
+        # fetch(symbol, timeframe, since=None, limit=None) -> liste OHLCV
+        self.fetch = fetch
+        self.capacity = capacity
+        self.cache_dir = cache_dir
+        self.stores = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+    def store(self, symbol, timeframe):
+        with self.lock:
+            key = (symbol, timeframe)
+            if key not in self.stores:
+                self.stores[key] = CandleStore(self.capacity)
+                self.key_locks[key] = threading.Lock()
+            return self.stores[key], self.key_locks[key]
+
+    def get(self, symbol, timeframe):
+        store, key_lock = self.store(symbol, timeframe)
+        with key_lock:
+            last = store.last_timestamp()
+            step = TIMEFRAME_MS.get(timeframe)
+            stale = last is None or step is None or time.time() * 1000 - last > (self.capacity - 1) * step
+            if stale:
+                store.reset(self.fetch(symbol, timeframe, limit=self.capacity))
+            else:
+                # since=last : la dernière bougie connue (peut-être encore ouverte) est relue et mise à jour
+                store.merge(self.fetch(symbol, timeframe, since=last, limit=self.capacity))
+            return store.view().copy()
+
+    def save(self):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self.lock:
+            items = [(key, store, self.key_locks[key]) for key, store in self.stores.items()]
+        for (symbol, timeframe), store, key_lock in items:
+            # Copie sous le verrou du symbole : un merge() concurrent ne laisse pas de bougie à moitié écrite
+            with key_lock:
+                candles = store.view().copy()
+            path = os.path.join(self.cache_dir, self.filename(symbol, timeframe))
+            # Écriture atomique : fichier temporaire puis renommage
+            tmp_path = path + ".tmp.npy"
+            np.save(tmp_path, candles)
+            os.replace(tmp_path, path)
+
+    def load(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        loaded = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy") or name.endswith(".tmp.npy"):
+                continue
+            symbol, timeframe = self.parse_filename(name)
+            store, key_lock = self.store(symbol, timeframe)
+            with key_lock:
+                store.reset(np.load(os.path.join(self.cache_dir, name)))
+            loaded += 1
+        return loaded
+
+    @staticmethod
+    def filename(symbol, timeframe):
+        return f"{symbol.replace('/', '-')}_{timeframe}.npy"
+
+    @staticmethod
+    def parse_filename(name):
+        base = name[:-len(".npy")]
+        symbol, timeframe = base.rsplit("_", 1)
+        return symbol.replace("-", "/"), timeframe
@@ -0,0 +1,269 @@
+# cockpit_data.py
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+
+def file_key(path):
+    # Identité du contenu d'un fichier : inode (remplacement atomique), date de modification et taille
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def parse_missed_trades(path):
+    missed_trades = {}
+    with open(path, "r") as f:
+        start_reading = False
+        for line in f:
+            if line.strip() == "Trades manqués par raison:":
+                start_reading = True
+                continue
+            if start_reading and line.strip().startswith("- "):
+                reason, count = line.strip()[2:].rsplit(": ", 1)
+                missed_trades[reason] = int(count)
+    return missed_trades
+
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def tail_lines(path, count=20, block=8192):
+    # Dernières lignes lues depuis la fin du fichier, sans parcourir tout le fichier
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return [line.decode("utf-8", errors="replace") + "\n" for line in data.splitlines()[-count:]]
+
+
+# Fichier relu et re-parsé uniquement quand sa clé (inode, mtime, taille) change
+class CachedFile:
+    def __init__(self, path, parse):
+        self.path = path
+        self.parse = parse
+        self.key = None
+        self.value = None
+
+    def refresh(self):
+        key = file_key(self.path)
+        if key == self.key:
+            return False
+        self.value = self.parse(self.path) if key is not None else None
+        self.key = key
+        return True
+
+
+# trades.csv est en ajout seul : seules les lignes ajoutées depuis la lecture précédente sont lues,
+# et les agrégats par symbole sont mis à jour à partir de ces seules lignes
+class TradesLog:
+    def __init__(self, path, recent=100):
+        self.path = path
+        self.recent = deque(maxlen=recent)
+        self.reset()
+
+    def reset(self):
+        self.key = None
+        self.offset = 0
+        self.header = None
+        self.count = 0
+        self.recent.clear()
+        self.per_symbol = {}
+
+    def refresh(self):
+        key = file_key(self.path)
+        if key == self.key:
+            return False
+        # Fichier supprimé, remplacé ou tronqué : relecture complète
+        if key is None or self.key is None or key[0] != self.key[0] or key[2] < self.offset:
+            self.reset()
+        if key is None:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        # Une ligne en cours d'écriture (sans fin de ligne) sera lue au prochain appel
+        end = data.rfind(b"\n") + 1
+        data = data[:end]
+        self.offset += end
+        if self.header is None and data:
+            header_end = data.index(b"\n") + 1
+            self.header, data = data[:header_end], data[header_end:]
+        if data:
+            self.add(pd.read_csv(io.BytesIO(self.header + data)))
+        self.key = key
+        return True
+
+    def add(self, frame):
+        self.count += len(frame)
+        self.recent.extend(frame.to_dict("records"))
+        if "PNL" not in frame.columns or "Symbole" not in frame.columns:
+            return
+        grouped = frame.groupby("Symbole")["PNL"].agg(["sum", "count", lambda pnl: (pnl > 0).sum()])
+        for symbol, (total_pnl, total_trades, wins) in zip(grouped.index, grouped.to_numpy()):
+            aggregate = self.per_symbol.setdefault(symbol, {"Total_PNL": 0.0, "Total_Trades": 0, "Wins": 0})
+            aggregate["Total_PNL"] += float(total_pnl)
+            aggregate["Total_Trades"] += int(total_trades)
+            aggregate["Wins"] += int(wins)
+
+    def tail(self, count=10):
+        return pd.DataFrame(list(self.recent)[-count:])
+
+    def performance(self):
+        perf_df = pd.DataFrame.from_dict(self.per_symbol, orient="index", columns=["Total_PNL", "Total_Trades", "Wins"])
+        perf_df.index.name = "Symbole"
+        perf_df["Winrate"] = perf_df["Wins"] / perf_df["Total_Trades"]
+        return perf_df
+
+
+# Données du cockpit : version incrémentée à chaque changement d'un des fichiers du bot
+class CockpitData:
+    def __init__(self, positions_file, trades_file, stats_file, missed_trades_file, log_file, metrics_file=None,
+                 analytics_file=None):
+        self.positions = CachedFile(positions_file, pd.read_csv)
+        self.stats = CachedFile(stats_file, pd.read_csv)
+        self.missed_trades = CachedFile(missed_trades_file, parse_missed_trades)
+        self.logs = CachedFile(log_file, tail_lines)
+        self.trades = TradesLog(trades_file)
+        self.metrics = CachedFile(metrics_file, read_json) if metrics_file else None
+        self.analytics = CachedFile(analytics_file, read_json) if analytics_file else None
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            changed = False
+            for source in (self.positions, self.stats, self.missed_trades, self.logs, self.trades, self.metrics, self.analytics):
+                if source is not None:
+                    changed = source.refresh() or changed
+            if changed:
+                self.version += 1
+            return self.version
+
+
+# Source de chaque widget du cockpit : dernier état poussé par le bot si le flux est connecté, sinon les fichiers
+# Chaque source renvoie (clé, valeur) ; un widget n'est redessiné que si sa clé change
+class LiveCockpit:
+    def __init__(self, data, client=None, price_max_age=5):
+        self.data = data
+        self.client = client
+        self.price_max_age = price_max_age
+
+    def pushed(self, topic):
+        client = self.client
+        if client is None:
+            return None
+        with client.condition:
+            if not client.connected or topic not in client.state:
+                return None
+            return ("push", client.versions[topic]), client.state[topic]
+
+    def wait(self, version, timeout):
+        # Réveil dès qu'un événement arrive ; sans flux, simple attente avant la prochaine vérification des fichiers
+        if self.client is None:
+            time.sleep(timeout)
+            return version
+        return self.client.wait_for_update(version, timeout=timeout)
+
+    def refresh(self):
+        return self.data.refresh()
+
+    def prices(self):
+        pushed = self.pushed("prices")
+        if pushed is None or time.time() - pushed[1]["timestamp"] > self.price_max_age:
+            return None
+        key, payload = pushed
+        return key, (payload["timestamp"], payload["prices"])
+
+    def positions(self):
+        pushed = self.pushed("positions")
+        if pushed is not None:
+            return pushed[0], pd.DataFrame(pushed[1])
+        return ("file", self.data.positions.key), self.data.positions.value
+
+    def stats(self):
+        stats, missed_trades = self.pushed("stats"), self.pushed("missed_trades")
+        if stats is not None:
+            stats = stats[0], pd.DataFrame([stats[1]])
+        else:
+            stats = ("file", self.data.stats.key), self.data.stats.value
+        if missed_trades is None:
+            missed_trades = ("file", self.data.missed_trades.key), self.data.missed_trades.value
+        return (stats[0], missed_trades[0]), (stats[1], missed_trades[1])
+
+    def trades(self):
+        # L'historique reste lu dans trades.csv (ajout seul) : l'événement trade ne sert qu'à réveiller le cockpit
+        return self.data.trades.key, self.data.trades
+
+    def logs(self):
+        return self.data.logs.key, self.data.logs.value
+
+    def analytics(self):
+        # Courbe d'equity et détail par symbole calculés par le bot : aucune relecture de trades.csv
+        pushed = self.pushed("analytics")
+        if pushed is not None:
+            return pushed
+        if self.data.analytics is None or self.data.analytics.value is None:
+            return None
+        return ("file", self.data.analytics.key), self.data.analytics.value
+
+    def performance(self):
+        # Détail par symbole du bot s'il est disponible, sinon agrégats incrémentaux de trades.csv
+        analytics = self.analytics()
+        if analytics is not None:
+            key, snapshot = analytics
+            return key, analytics_tables(snapshot)[1]
+        trades = self.data.trades
+        if trades.key is None:
+            return None, None
+        return trades.key, trades.performance() if trades.per_symbol else pd.DataFrame()
+
+    def metrics(self):
+        pushed = self.pushed("metrics")
+        if pushed is not None:
+            return pushed
+        if self.data.metrics is None:
+            return None, None
+        return ("file", self.data.metrics.key), self.data.metrics.value
+
+
+def metrics_tables(snapshot):
+    # Photo de metrics.Registry -> (tableau des durées, tableau des compteurs) pour le cockpit
+    timings, counters = [], []
+    for name, metric in (snapshot or {}).get("metrics", {}).items():
+        for value in metric["values"]:
+            labels = ", ".join(f"{key}={label}" for key, label in value["labels"].items())
+            if metric["type"] == "histogram":
+                timings.append({
+                    "Métrique": name, "Labels": labels, "Nombre": value["count"], "Moyenne (ms)": value["mean"] * 1000,
+                    "p95 (ms)": value["p95"] * 1000 if value["p95"] is not None else None,
+                    "Total (s)": value["sum"],
+                })
+            else:
+                counters.append({"Métrique": name, "Labels": labels, "Valeur": value["value"]})
+    return pd.DataFrame(timings), pd.DataFrame(counters)
+
+
+def analytics_tables(snapshot):
+    # Photo de analytics.Analytics -> (courbe d'equity, tableau par symbole) pour le cockpit
+    equity_df = pd.DataFrame(snapshot.get("equity", []), columns=["Trade", "Temps_Sortie", "Equity", "Drawdown"])
+    perf_df = pd.DataFrame.from_dict(
+        snapshot.get("per_symbol", {}), orient="index",
+        columns=["Total_PNL", "Total_Trades", "Wins", "Winrate", "Profit_Factor", "Max_Drawdown"],
+    )
+    perf_df.index.name = "Symbole"
+    return equity_df, perf_df
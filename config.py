@@ -0,0 +1,51 @@
+# config.py
+# Paramètres de la stratégie partagés par le bot, le backtest et l'optimiseur
+import json
+import os
+
+SYMBOLS = [
+    "TIA/USDT", "ATOM/USDT", "SOL/USDT", "ENA/USDT", "POPCAT/USDT", "BTC/USDT", "AAVE/USDT", "LINK/USDT",
+    "NEAR/USDT", "SUI/USDT", "PEPE/USDT", "SHIB/USDT", "ETH/USDT", "XRP/USDT", "TAO/USDT", "SEI/USDT",
+    "INJ/USDT", "FET/USDT", "DOGE/USDT", "ADA/USDT", "CRV/USDT", "PYTH/USDT", "BNB/USDT",
+    "GALA/USDT", "ONDO/USDT"
+]
+MAX_POSITIONS = 5
+MARGIN = 100.0
+LEVERAGE = 10.0
+SYMBOL_PARAMS = {
+    "default": {"risk_per_trade": 0.01, "leverage": 10, "tp_ratio": 2.0, "sl_ratio": 1.0},
+}
+for symbol in SYMBOLS:
+    SYMBOL_PARAMS[symbol] = SYMBOL_PARAMS["default"]
+MIN_ATR = {
+    "default": 0.0001, "TIA/USDT": 0.01, "ATOM/USDT": 0.01, "SOL/USDT": 0.1, "ENA/USDT": 0.001,
+    "POPCAT/USDT": 0.001, "BTC/USDT": 50.0, "AAVE/USDT": 0.1, "LINK/USDT": 0.01, "NEAR/USDT": 0.01,
+    "SUI/USDT": 0.01, "PEPE/USDT": 0.00000001, "SHIB/USDT": 0.00000001, "ETH/USDT": 10.0,
+    "XRP/USDT": 0.001, "TAO/USDT": 0.1, "SEI/USDT": 0.001, "INJ/USDT": 0.01, "FET/USDT": 0.01,
+    "DOGE/USDT": 0.0001, "ADA/USDT": 0.001, "CRV/USDT": 0.001, "PYTH/USDT": 0.001,
+    "BNB/USDT": 1.0, "GALA/USDT": 0.0001, "ONDO/USDT": 0.001,
+}
+
+# Paramètres par symbole produits par optimize.py (prioritaires sur les valeurs ci-dessus)
+OPTIMIZED_PARAMS_FILE = os.environ.get("EQUINOX_OPTIMIZED_PARAMS", "optimized_params.json")
+if os.path.exists(OPTIMIZED_PARAMS_FILE):
+    with open(OPTIMIZED_PARAMS_FILE, "r") as f:
+        optimized = json.load(f)
+    for symbol, params in optimized.get("SYMBOL_PARAMS", {}).items():
+        SYMBOL_PARAMS[symbol] = {**SYMBOL_PARAMS["default"], **params}
+    MIN_ATR.update(optimized.get("MIN_ATR", {}))
+
+# Schéma des fichiers CSV
+positions_columns = [
+    "Symbole", "Type", "Prix_Entree", "Quantite", "TP", "SL", "RSI", "EMA_30", "ATR", "ADX",
+    "Fib_1618", "Temps_Entree", "Position_ID", "Marge", "Levier"
+]
+trades_columns = [
+    "Symbole", "Type", "Prix_Entree", "Prix_Sortie", "Quantite", "PNL", "Raison_Sortie",
+    "RSI_Sortie", "EMA_30_Sortie", "ATR_Sortie", "Temps_Entree", "Temps_Sortie", "Position_ID",
+    "Marge", "Levier"
+]
+stats_columns = [
+    "Total_Trades", "Wins", "Losses", "Winrate", "Total_PNL", "Max_Drawdown", "Sharpe_Ratio",
+    "Sortino_Ratio", "Profit_Factor", "Update_Time"
+]
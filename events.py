@@ -0,0 +1,160 @@
+# events.py
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from journal import to_json
+
+# Intervalle des commentaires keep-alive SSE : le client considère la connexion perdue après CLIENT_TIMEOUT
+PING_INTERVAL = 15
+CLIENT_TIMEOUT = 30
+
+
+# Dernier état publié par sujet (positions, trade, stats, missed_trades, prices)
+# Un abonné en retard ne reçoit que la dernière valeur de chaque sujet modifié
+class EventBus:
+    def __init__(self):
+        self.topics = {}
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def publish(self, topic, payload):
+        with self.condition:
+            self.version += 1
+            self.topics[topic] = (self.version, payload)
+            self.condition.notify_all()
+
+    def changes(self, since):
+        with self.condition:
+            return self.version, [(topic, payload) for topic, (version, payload) in self.topics.items() if version > since]
+
+    def wait_for_update(self, version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+
+def encode_event(topic, payload):
+    return f"event: {topic}\ndata: {json.dumps(payload, default=to_json, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class EventHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        bus = self.server.bus
+        if self.path == "/metrics" and self.server.metrics is not None:
+            body = self.server.metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/snapshot":
+            _, changes = bus.changes(0)
+            body = json.dumps(dict(changes), default=to_json, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path != "/events":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        # Premier envoi : état complet, puis uniquement les sujets modifiés
+        version = 0
+        try:
+            while True:
+                version, changes = bus.changes(version)
+                if changes:
+                    self.wfile.write(b"".join(encode_event(topic, payload) for topic, payload in changes))
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+                bus.wait_for_update(version, timeout=PING_INTERVAL)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serveur HTTP local (Server-Sent Events) : GET /events pour le flux, GET /snapshot pour l'état courant,
+# GET /metrics pour les métriques au format texte Prometheus
+class EventServer:
+    def __init__(self, bus, host="127.0.0.1", port=8765, metrics=None):
+        self.server = ThreadingHTTPServer((host, port), EventHandler)
+        self.server.daemon_threads = True
+        self.server.bus = bus
+        self.server.metrics = metrics
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="events", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Abonné au flux /events : tient à jour le dernier état de chaque sujet, se reconnecte en cas de coupure
+class EventClient:
+    def __init__(self, url, retry_interval=2.0):
+        self.url = url.rstrip("/") + "/events"
+        self.retry_interval = retry_interval
+        self.state = {}
+        self.versions = {}
+        self.version = 0
+        self.connected = False
+        self.condition = threading.Condition()
+        threading.Thread(target=self.run, name="events-client", daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                with urllib.request.urlopen(self.url, timeout=CLIENT_TIMEOUT) as response:
+                    self.set_connected(True)
+                    self.read(response)
+            except (OSError, ValueError):
+                pass
+            self.set_connected(False)
+            time.sleep(self.retry_interval)
+
+    def read(self, response):
+        topic, data = None, []
+        for raw_line in response:
+            line = raw_line.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                topic = line[len("event: "):]
+            elif line.startswith("data: "):
+                data.append(line[len("data: "):])
+            elif not line:
+                if topic is not None and data:
+                    self.apply(topic, json.loads("\n".join(data)))
+                topic, data = None, []
+
+    def apply(self, topic, payload):
+        with self.condition:
+            self.state[topic] = payload
+            self.version += 1
+            self.versions[topic] = self.version
+            self.condition.notify_all()
+
+    def set_connected(self, connected):
+        with self.condition:
+            if self.connected != connected:
+                self.connected = connected
+                self.version += 1
+                self.condition.notify_all()
+
+    def wait_for_update(self, version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
@@ -0,0 +1,203 @@
+# exchange_client.py
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+# Délai maximal d'une requête HTTP (ms, option timeout de ccxt) et budget total d'un appel, nouvelles tentatives comprises
+REQUEST_TIMEOUT_MS = 10000
+CALL_DEADLINE = 20.0
+# Nouvelles tentatives sur erreur réseau : attente aléatoire entre 0 et min(BACKOFF_MAX, BACKOFF_BASE * 2^tentative)
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+# Disjoncteur par méthode : ouvert après BREAKER_THRESHOLD échecs consécutifs, un essai après BREAKER_RESET secondes
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+# Connexions HTTP keep-alive conservées par hôte
+POOL_SIZE = 16
+
+# Erreurs ccxt passagères (reconnues par nom de classe, sans importer ccxt) : l'appel est retenté
+RETRYABLE_ERRORS = {"NetworkError", "RequestTimeout", "ExchangeNotAvailable", "DDoSProtection", "RateLimitExceeded", "OnMaintenance"}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX, rng=random):
+    # « Full jitter » : les workers en échec ne retentent pas tous au même instant
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def pooled_session(pool_size=POOL_SIZE):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def exchange_config(timeout=REQUEST_TIMEOUT_MS, pool_size=POOL_SIZE, **config):
+    # Configuration ccxt : délai court et session HTTP partagée par tous les threads du processus
+    # Le rate limit est appliqué par ExchangeClient, pas par ccxt
+    return {"timeout": timeout, "enableRateLimit": False, "session": pooled_session(pool_size), **config}
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        # Ouvert : refus immédiat ; après reset_timeout, un seul appel d'essai à la fois
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_timeout or self.trial:
+                return False
+            self.trial = True
+            return True
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self.trial = False
+
+
+# Accès à l'exchange partagé par tous les threads : rate limit commun, nouvelles tentatives avec backoff,
+# disjoncteur par méthode, et appels identiques simultanés regroupés en une seule requête
+class ExchangeClient:
+    def __init__(self, exchange, retries=MAX_RETRIES, deadline=CALL_DEADLINE, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, breaker_threshold=BREAKER_THRESHOLD, breaker_reset=BREAKER_RESET,
+                 metrics=None, clock=time.monotonic, sleep=time.sleep, seed=None):
+        self.exchange = exchange
+        self.retries = retries
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self.breakers = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.rate_limit_lock = threading.Lock()
+        self.next_request_time = 0.0
+        self.request_seconds = self.errors = self.retried = self.coalesced = self.rejected = None
+        if metrics is not None:
+            self.request_seconds = metrics.histogram("equinox_exchange_request_seconds", "Durée des appels REST à l'exchange")
+            self.errors = metrics.counter("equinox_exchange_errors_total", "Appels REST à l'exchange en erreur")
+            self.retried = metrics.counter("equinox_exchange_retries_total", "Nouvelles tentatives après une erreur réseau")
+            self.coalesced = metrics.counter("equinox_exchange_coalesced_total", "Appels servis par une requête identique en cours")
+            self.rejected = metrics.counter("equinox_exchange_circuit_open_total", "Appels refusés par un disjoncteur ouvert")
+
+    def breaker(self, name):
+        with self.lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(self.breaker_threshold, self.breaker_reset, self.clock)
+            return self.breakers[name]
+
+    def states(self):
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {name: breaker.state for name, breaker in breakers.items()}
+
+    def throttle(self):
+        # Espace le départ des requêtes de exchange.rateLimit ms quel que soit le thread
+        with self.rate_limit_lock:
+            now = self.clock()
+            wait = self.next_request_time - now
+            self.next_request_time = max(now, self.next_request_time) + self.exchange.rateLimit / 1000
+        if wait > 0:
+            self.sleep(wait)
+
+    def call(self, method, *args, **kwargs):
+        name = getattr(method, "__name__", "appel")
+        key = (name, repr(args), repr(sorted(kwargs.items())))
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            if self.coalesced is not None:
+                self.coalesced.inc(method=name)
+            return future.result()
+        try:
+            result = self.execute(name, method, args, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.inflight[key]
+
+    def execute(self, name, method, args, kwargs):
+        breaker = self.breaker(name)
+        deadline = self.clock() + self.deadline
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                if self.rejected is not None:
+                    self.rejected.inc(method=name)
+                raise CircuitOpenError(f"{name} : disjoncteur ouvert après {breaker.failures} échecs")
+            self.throttle()
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                if self.errors is not None:
+                    self.errors.inc(method=name)
+                if not is_retryable(e):
+                    # Erreur de la requête elle-même (symbole inconnu...) : ni nouvelle tentative ni disjoncteur
+                    breaker.success()
+                    raise
+                breaker.failure()
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, self.rng)
+                if attempt >= self.retries or self.clock() + delay >= deadline:
+                    raise
+                attempt += 1
+                if self.retried is not None:
+                    self.retried.inc(method=name)
+                self.sleep(delay)
+                continue
+            finally:
+                if self.request_seconds is not None:
+                    self.request_seconds.observe(time.perf_counter() - start, method=name)
+            breaker.success()
+            return result
@@ -0,0 +1,185 @@
+# exits.py
+import bisect
+import threading
+import time
+
+from candles import TIMEFRAME_MS
+from storage import NO_TIME, parse_time
+
+# Glissement défavorable appliqué au prix de déclenchement (fraction du prix) : TP = ordre limite, SL = ordre stop au marché
+TP_SLIPPAGE = 0.0
+SL_SLIPPAGE = 0.0005
+
+
+# Niveaux de déclenchement des positions d'un symbole, triés : les positions touchées par un plus haut (ou un plus bas)
+# sont un préfixe (ou un suffixe) de la liste, trouvé par dichotomie
+class LevelIndex:
+    def __init__(self):
+        self.levels = []
+        self.ids = []
+
+    def add(self, level, position_id):
+        index = bisect.bisect_right(self.levels, level)
+        self.levels.insert(index, level)
+        self.ids.insert(index, position_id)
+
+    def remove(self, level, position_id):
+        index = bisect.bisect_left(self.levels, level)
+        while self.ids[index] != position_id:
+            index += 1
+        del self.levels[index]
+        del self.ids[index]
+
+    def at_or_below(self, price):
+        return self.ids[:bisect.bisect_right(self.levels, price)]
+
+    def at_or_above(self, price):
+        return self.ids[bisect.bisect_left(self.levels, price):]
+
+    def __len__(self):
+        return len(self.levels)
+
+
+def entry_time(position):
+    # Heure d'entrée en ms epoch ; illisible (positions de test, anciens formats) : heure d'ajout au moteur
+    timestamp = parse_time(position.get("Temps_Entree"))
+    return timestamp if timestamp != NO_TIME else int(time.time() * 1000)
+
+
+def exit_levels(position):
+    # (niveau touché par un plus haut, niveau touché par un plus bas) et la raison de chacun
+    if position["Type"] == "Long":
+        return (position["TP"], "TP Hit"), (position["SL"], "SL Hit")
+    return (position["SL"], "SL Hit"), (position["TP"], "TP Hit")
+
+
+# Sorties TP/SL évaluées sur le plus haut et le plus bas de tous les prix reçus depuis la vérification précédente
+# (ticks, bougies en cours, bougies 1m) : une mèche entre deux vérifications n'est plus manquée.
+# Le prix de sortie est le niveau de déclenchement, avec glissement, ou le premier prix reçu s'il l'a déjà dépassé (gap)
+class ExitEngine:
+    def __init__(self, tp_slippage=TP_SLIPPAGE, sl_slippage=SL_SLIPPAGE):
+        self.tp_slippage = tp_slippage
+        self.sl_slippage = sl_slippage
+        self.positions = {}
+        self.upper = {}
+        self.lower = {}
+        # Plus haut, plus bas et premier prix par symbole depuis collect()
+        self.ranges = {}
+        self.candles = {}
+        # Heure d'entrée (ms) par position et, par symbole, la plus récente : les prix antérieurs ne comptent pas
+        self.entries = {}
+        self.since = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, position):
+        (upper, _), (lower, _) = exit_levels(position)
+        symbol, position_id = position["Symbole"], position["Position_ID"]
+        with self.lock:
+            self.positions[position_id] = position
+            self.entries[position_id] = entry_time(position)
+            self.since[symbol] = max(self.since.get(symbol, 0), self.entries[position_id])
+            self.upper.setdefault(symbol, LevelIndex()).add(upper, position_id)
+            self.lower.setdefault(symbol, LevelIndex()).add(lower, position_id)
+            # Les prix antérieurs à l'entrée ne comptent pas
+            self.ranges.pop(symbol, None)
+            self.candles = {key: candle for key, candle in self.candles.items() if key[0] != symbol}
+
+    def remove(self, position_id):
+        with self.lock:
+            position = self.positions.pop(position_id, None)
+            if position is None:
+                return
+            del self.entries[position_id]
+            (upper, _), (lower, _) = exit_levels(position)
+            symbol = position["Symbole"]
+            self.upper[symbol].remove(upper, position_id)
+            self.lower[symbol].remove(lower, position_id)
+            if not self.upper[symbol]:
+                del self.upper[symbol], self.lower[symbol], self.since[symbol]
+                self.ranges.pop(symbol, None)
+
+    def reset(self, positions):
+        with self.lock:
+            self.positions, self.upper, self.lower, self.ranges, self.candles = {}, {}, {}, {}, {}
+            self.entries, self.since = {}, {}
+        for position in positions:
+            self.add(position)
+
+    def observe(self, symbol, high, low, first=None):
+        # O(1) : seuls les symboles avec une position ouverte sont suivis
+        with self.lock:
+            if symbol not in self.upper:
+                return
+            self.extend(symbol, high, low, first)
+
+    def extend(self, symbol, high, low, first):
+        current = self.ranges.get(symbol)
+        if current is None:
+            self.ranges[symbol] = [high, low, first if first is not None else (high if high == low else None)]
+        else:
+            current[0] = max(current[0], high)
+            current[1] = min(current[1], low)
+
+    def observe_candle(self, symbol, timeframe, candle):
+        # Bougie en cours : seule la part de plus haut / plus bas nouvelle depuis la mise à jour précédente est comptée.
+        # Les bougies ouvertes avant la bougie d'entrée sont ignorées ; la bougie d'entrée sert de référence
+        # (sa mèche peut précéder l'entrée), une bougie postérieure compte entièrement
+        timestamp, open_, high, low = candle[0], candle[1], candle[2], candle[3]
+        with self.lock:
+            if symbol not in self.upper:
+                return
+            since = self.since[symbol]
+            step = TIMEFRAME_MS.get(timeframe, 0)
+            if timestamp + step <= since:
+                return
+            key = (symbol, timeframe)
+            previous = self.candles.get(key)
+            if previous is not None and timestamp < previous[0]:
+                # Bougie plus ancienne que la référence (déjà comptée) : la référence est conservée
+                return
+            self.candles[key] = (timestamp, high, low)
+            if previous is None:
+                if timestamp >= since:
+                    self.extend(symbol, high, low, open_)
+                return
+            if timestamp > previous[0]:
+                self.extend(symbol, high, low, open_)
+            elif high > previous[1] or low < previous[2]:
+                self.extend(symbol, high if high > previous[1] else low, low if low < previous[2] else high, None)
+
+    def fill_price(self, position, level, reason, first):
+        slippage = self.sl_slippage if reason == "SL Hit" else self.tp_slippage
+        price = level
+        # Gap au-delà du niveau : exécution au premier prix disponible
+        if first is not None:
+            if position["Type"] == "Long" and reason == "SL Hit" and first < level:
+                price = first
+            elif position["Type"] == "Short" and reason == "SL Hit" and first > level:
+                price = first
+        return price * (1 - slippage) if position["Type"] == "Long" else price * (1 + slippage)
+
+    def collect(self):
+        # Positions touchées depuis l'appel précédent -> [(position, prix de sortie, raison)]
+        # Coût : O(log n) par symbole ayant reçu des prix, plus les positions touchées
+        with self.lock:
+            ranges, self.ranges = self.ranges, {}
+            triggered = {}
+            for symbol, (high, low, first) in ranges.items():
+                if symbol not in self.upper:
+                    continue
+                for position_id in self.upper[symbol].at_or_below(high):
+                    triggered.setdefault(position_id, []).append(("upper", first))
+                for position_id in self.lower[symbol].at_or_above(low):
+                    triggered.setdefault(position_id, []).append(("lower", first))
+            exits = []
+            for position_id, sides in triggered.items():
+                position = self.positions[position_id]
+                (upper, upper_reason), (lower, lower_reason) = exit_levels(position)
+                hits = {side: (upper, upper_reason) if side == "upper" else (lower, lower_reason) for side, _ in sides}
+                # TP et SL dans la même plage : ordre inconnu, le SL est retenu par prudence
+                level, reason = next((hit for hit in hits.values() if hit[1] == "SL Hit"), next(iter(hits.values())))
+                exits.append((position, self.fill_price(position, level, reason, sides[0][1]), reason))
+            return exits
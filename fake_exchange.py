@@ -0,0 +1,134 @@
+# fake_exchange.py
+import json
+import threading
+import time
+
+import numpy as np
+
+from candles import TIMEFRAME_MS
+
+
+def generate_fixtures(symbols, timeframes=("1h", "15m"), bars=500, seed=42):
+    # Bougies synthétiques déterministes (marche aléatoire par symbole), horodatées à partir de 0
+    rng = np.random.default_rng(seed)
+    fixtures = {"ohlcv": {}, "tickers": {}}
+    for symbol in symbols:
+        start = float(rng.uniform(0.5, 500))
+        fixtures["ohlcv"][symbol] = {}
+        for timeframe in timeframes:
+            step = TIMEFRAME_MS[timeframe]
+            closes = start * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+            opens = np.concatenate([[start], closes[:-1]])
+            highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.01, bars))
+            lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.01, bars))
+            volumes = rng.uniform(50, 150, bars)
+            fixtures["ohlcv"][symbol][timeframe] = np.column_stack(
+                [np.arange(bars) * step, opens, highs, lows, closes, volumes]
+            ).tolist()
+        fixtures["tickers"][symbol] = fixtures["ohlcv"][symbol][timeframes[-1]][-1][4]
+    return fixtures
+
+
+def record_fixtures(exchange, symbols, timeframes=("1h", "15m"), limit=500):
+    # Enregistre de vraies bougies et prix (ccxt) pour rejouer un marché réel hors ligne
+    fixtures = {"ohlcv": {}, "tickers": {}}
+    tickers = exchange.fetch_tickers(symbols)
+    for symbol in symbols:
+        fixtures["ohlcv"][symbol] = {timeframe: exchange.fetch_ohlcv(symbol, timeframe, limit=limit) for timeframe in timeframes}
+        fixtures["tickers"][symbol] = tickers[symbol]["last"]
+    return fixtures
+
+
+def save_fixtures(fixtures, path):
+    with open(path, "w") as f:
+        json.dump(fixtures, f)
+
+
+def load_fixtures(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+# Mêmes noms que les erreurs réseau de ccxt : traitées comme passagères par exchange_client
+class NetworkError(Exception):
+    pass
+
+
+class RequestTimeout(NetworkError):
+    pass
+
+
+# Exchange simulé, même interface que ccxt pour les appels du bot (fetch_ohlcv, fetch_ticker(s))
+# Les bougies enregistrées sont décalées pour que la dernière soit la bougie en cours : le cache les voit comme récentes
+# Pannes injectables : erreurs réseau (failure_rate), requêtes bloquées jusqu'au délai timeout en ms (hang_rate), coupure totale (outage)
+class FakeExchange:
+    def __init__(self, fixtures, latency=0.0, rate_limit=0, failure_rate=0.0, hang_rate=0.0, timeout=10000, seed=0):
+        self.latency = latency
+        self.rateLimit = rate_limit
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.timeout = timeout
+        self.outage = False
+        self.rng = np.random.default_rng(seed)
+        self.ohlcv = {
+            (symbol, timeframe): np.asarray(candles, dtype=np.float64)
+            for symbol, series in fixtures["ohlcv"].items()
+            for timeframe, candles in series.items()
+        }
+        self.prices = dict(fixtures["tickers"])
+        self.calls = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def call(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            draw = self.rng.random()
+        if self.outage or draw < self.failure_rate:
+            self.fail(name)
+            raise NetworkError(f"{name} : erreur réseau simulée")
+        if draw < self.failure_rate + self.hang_rate:
+            self.fail(name)
+            time.sleep(self.timeout / 1000)
+            raise RequestTimeout(f"{name} : délai de {self.timeout} ms dépassé")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def fail(self, name):
+        with self.lock:
+            self.failures[name] = self.failures.get(name, 0) + 1
+
+    def shifted(self, symbol, timeframe):
+        candles = self.ohlcv[(symbol, timeframe)]
+        step = TIMEFRAME_MS[timeframe]
+        current = int(time.time() * 1000) // step * step
+        shifted = candles.copy()
+        shifted[:, 0] += current - candles[-1, 0]
+        return shifted
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params=None):
+        self.call("fetch_ohlcv")
+        candles = self.shifted(symbol, timeframe)
+        if since is not None:
+            candles = candles[candles[:, 0] >= since]
+            if limit is not None:
+                candles = candles[:limit]
+        elif limit is not None:
+            candles = candles[-limit:]
+        return candles.tolist()
+
+    def fetch_ticker(self, symbol, params=None):
+        self.call("fetch_ticker")
+        return {"symbol": symbol, "last": self.prices[symbol], "timestamp": int(time.time() * 1000)}
+
+    def fetch_tickers(self, symbols=None, params=None):
+        self.call("fetch_tickers")
+        timestamp = int(time.time() * 1000)
+        return {
+            symbol: {"symbol": symbol, "last": price, "timestamp": timestamp}
+            for symbol, price in self.prices.items()
+            if symbols is None or symbol in symbols
+        }
+
+    def set_price(self, symbol, price):
+        self.prices[symbol] = price
@@ -0,0 +1,245 @@
+# indicators.py
+import copy
+import threading
+from collections import deque
+
+
+# État incrémental des indicateurs d'un symbole : chaque nouvelle bougie coûte O(1)
+# Les formules reproduisent celles de la librairie ta (RSI, EMA, ADX) et de signals.calculate_atr (ATR)
+class IndicatorState:
+    def __init__(self, rsi_window=14, ema_window=30, adx_window=14, atr_window=14):
+        self.rsi_window = rsi_window
+        self.ema_window = ema_window
+        self.adx_window = adx_window
+        self.atr_window = atr_window
+        self.count = 0
+        self.prev_high = None
+        self.prev_low = None
+        self.prev_close = None
+        # RSI de Wilder (ewm alpha=1/n, adjust=False, amorcé à 0 comme ta)
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+        # EMA (ewm span=n, adjust=False, amorcée sur la première clôture)
+        self.ema = None
+        # ADX/DI : sommes lissées de Wilder, amorcées par la somme des n premières valeurs
+        self.tr_sum = 0.0
+        self.dm_pos_sum = 0.0
+        self.dm_neg_sum = 0.0
+        self.dx_seed = []
+        self.adx = None
+        self.di_pos = None
+        self.di_neg = None
+        # ATR : moyenne glissante des n derniers true ranges
+        self.atr_ranges = deque(maxlen=atr_window)
+        self.atr_sum = 0.0
+
+    def update(self, high, low, close):
+        if self.count == 0:
+            self.ema = close
+        else:
+            self.update_rsi(close)
+            self.update_adx(high, low)
+            self.update_atr(high, low)
+            alpha = 2.0 / (self.ema_window + 1)
+            self.ema = (1 - alpha) * self.ema + alpha * close
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        self.count += 1
+
+    def update_rsi(self, close):
+        diff = close - self.prev_close
+        alpha = 1.0 / self.rsi_window
+        self.avg_up = (1 - alpha) * self.avg_up + alpha * max(diff, 0.0)
+        self.avg_down = (1 - alpha) * self.avg_down + alpha * max(-diff, 0.0)
+
+    def update_adx(self, high, low):
+        n = self.adx_window
+        tr = max(high, self.prev_close) - min(low, self.prev_close)
+        up = high - self.prev_high
+        down = self.prev_low - low
+        dm_pos = up if up > down and up > 0 else 0.0
+        dm_neg = down if down > up and down > 0 else 0.0
+        if self.count <= n:
+            # Bougies 1..n : amorçage des sommes
+            self.tr_sum += tr
+            self.dm_pos_sum += dm_pos
+            self.dm_neg_sum += dm_neg
+            if self.count < n:
+                return
+        else:
+            self.tr_sum = self.tr_sum - self.tr_sum / n + tr
+            self.dm_pos_sum = self.dm_pos_sum - self.dm_pos_sum / n + dm_pos
+            self.dm_neg_sum = self.dm_neg_sum - self.dm_neg_sum / n + dm_neg
+        self.di_pos = 100 * self.dm_pos_sum / self.tr_sum if self.tr_sum != 0 else 0.0
+        self.di_neg = 100 * self.dm_neg_sum / self.tr_sum if self.tr_sum != 0 else 0.0
+        di_total = self.di_pos + self.di_neg
+        dx = 100 * abs(self.di_pos - self.di_neg) / di_total if di_total != 0 else 0.0
+        if self.adx is None:
+            self.dx_seed.append(dx)
+            if len(self.dx_seed) == n:
+                self.adx = sum(self.dx_seed) / n
+                self.dx_seed = []
+        else:
+            self.adx = (self.adx * (n - 1) + dx) / n
+
+    def update_atr(self, high, low):
+        # Même true range que signals.calculate_atr
+        tr = max(high - low, abs(high - self.prev_close))
+        if len(self.atr_ranges) == self.atr_window:
+            self.atr_sum -= self.atr_ranges[0]
+        self.atr_ranges.append(tr)
+        self.atr_sum += tr
+
+    def values(self):
+        if self.count >= self.rsi_window:
+            rsi = 100.0 if self.avg_down == 0 else 100 - 100 / (1 + self.avg_up / self.avg_down)
+        else:
+            rsi = None
+        return {
+            "rsi": rsi,
+            "ema": self.ema if self.count >= self.ema_window else None,
+            "adx": self.adx,
+            "adx_pos": self.di_pos,
+            "adx_neg": self.di_neg,
+            "atr": self.atr_sum / len(self.atr_ranges) if self.atr_ranges else None,
+        }
+
+    def peek(self, high, low, close):
+        # Valeurs si la bougie en cours était clôturée, sans modifier l'état
+        state = copy.copy(self)
+        state.atr_ranges = deque(self.atr_ranges, maxlen=self.atr_window)
+        state.dx_seed = list(self.dx_seed)
+        state.update(high, low, close)
+        return state.values()
+
+
+# Moteur par (symbole, timeframe) : seules les bougies clôturées depuis le dernier appel sont intégrées
+class IndicatorEngine:
+    def __init__(self, **windows):
+        self.windows = windows
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def sync(self, symbol, timeframe, ohlcv):
+        # ohlcv : tableau (bougies x [timestamp, open, high, low, close, volume]) ; la dernière bougie est en cours
+        key = (symbol, timeframe)
+        with self.lock:
+            state, last_timestamp = self.states.get(key, (None, None))
+        first_timestamp, current_timestamp = ohlcv[0][0], ohlcv[-1][0]
+        # Trou dans l'historique ou données antérieures : on repart de zéro sur la fenêtre fournie
+        if state is None or first_timestamp > last_timestamp or current_timestamp < last_timestamp:
+            state, last_timestamp = IndicatorState(**self.windows), None
+        for row in ohlcv[:-1]:
+            if last_timestamp is None or row[0] > last_timestamp:
+                state.update(float(row[2]), float(row[3]), float(row[4]))
+                last_timestamp = row[0]
+        with self.lock:
+            self.states[key] = (state, last_timestamp)
+        current = ohlcv[-1]
+        return state.peek(float(current[2]), float(current[3]), float(current[4]))
+
+
+def wilder_sum(values, window):
+    # Somme lissée de Wilder (S_t = S_t-1 - S_t-1/n + x_t) amorcée par la somme des n premières valeurs, via ewm
+    import pandas as pd
+
+    alpha = 1.0 / window
+    seeded = values[window - 1:].copy()
+    seeded[0] = values[:window].sum() * alpha
+    smoothed = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy() / alpha
+    return smoothed
+
+
+def compute_series(ohlcv, rsi_window=14, ema_window=30, adx_window=14, atr_window=14):
+    # Mêmes indicateurs qu'IndicatorState, sur tout un historique en une passe vectorisée (backtest)
+    import numpy as np
+    import pandas as pd
+
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    highs, lows, closes = ohlcv[:, 2], ohlcv[:, 3], ohlcv[:, 4]
+    count = len(closes)
+    n = adx_window
+
+    diff = np.diff(closes, prepend=np.nan)
+    up = pd.Series(np.where(diff > 0, diff, 0.0)).ewm(alpha=1 / rsi_window, adjust=False).mean().to_numpy()
+    down = pd.Series(np.where(diff < 0, -diff, 0.0)).ewm(alpha=1 / rsi_window, adjust=False).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(down == 0, 100.0, 100 - 100 / (1 + up / down))
+    rsi[:rsi_window - 1] = np.nan
+
+    ema = pd.Series(closes).ewm(span=ema_window, adjust=False).mean().to_numpy(copy=True)
+    ema[:ema_window - 1] = np.nan
+
+    adx = np.full(count, np.nan)
+    if count >= 2 * n:
+        tr = np.maximum(highs[1:], closes[:-1]) - np.minimum(lows[1:], closes[:-1])
+        move_up = highs[1:] - highs[:-1]
+        move_down = lows[:-1] - lows[1:]
+        dm_pos = np.where((move_up > move_down) & (move_up > 0), move_up, 0.0)
+        dm_neg = np.where((move_down > move_up) & (move_down > 0), move_down, 0.0)
+        # Sommes lissées à partir de la bougie n (indices 1..n pour l'amorçage)
+        tr_sum, pos_sum, neg_sum = wilder_sum(tr, n), wilder_sum(dm_pos, n), wilder_sum(dm_neg, n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            di_pos = np.where(tr_sum != 0, 100 * pos_sum / tr_sum, 0.0)
+            di_neg = np.where(tr_sum != 0, 100 * neg_sum / tr_sum, 0.0)
+            dx = np.where(di_pos + di_neg != 0, 100 * np.abs(di_pos - di_neg) / (di_pos + di_neg), 0.0)
+        # ADX amorcé par la moyenne des n premiers DX, puis lissage de Wilder
+        seeded = dx[n - 1:].copy()
+        seeded[0] = dx[:n].mean()
+        adx[2 * n - 1:] = pd.Series(seeded).ewm(alpha=1 / n, adjust=False).mean().to_numpy()
+
+    atr = np.full(count, np.nan)
+    if count > atr_window:
+        ranges = np.maximum(highs[1:] - lows[1:], np.abs(highs[1:] - closes[:-1]))
+        atr[atr_window:] = np.convolve(ranges, np.ones(atr_window) / atr_window, mode="valid")
+
+    return {"rsi": rsi, "ema": ema, "adx": adx, "atr": atr}
+
+
+def compare_with_ta(ohlcv):
+    # Écart maximal entre le moteur incrémental et ta / signals.calculate_atr, bougie par bougie
+    import numpy as np
+    import pandas as pd
+    import ta
+
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    highs, lows, closes = pd.Series(ohlcv[:, 2]), pd.Series(ohlcv[:, 3]), pd.Series(ohlcv[:, 4])
+    reference = {
+        "rsi": ta.momentum.RSIIndicator(closes).rsi().to_numpy(),
+        "ema": ta.trend.EMAIndicator(closes, window=30).ema_indicator().to_numpy(),
+        "adx": ta.trend.ADXIndicator(highs, lows, closes).adx().to_numpy(),
+    }
+    state = IndicatorState()
+    errors = {name: 0.0 for name in list(reference) + ["atr"]}
+    for i in range(len(ohlcv)):
+        state.update(ohlcv[i, 2], ohlcv[i, 3], ohlcv[i, 4])
+        values = state.values()
+        for name, series in reference.items():
+            # ta met l'ADX à 0 pendant son amorçage, là où le moteur renvoie None
+            if values[name] is not None and not np.isnan(series[i]) and (name != "adx" or i >= 2 * state.adx_window - 1):
+                errors[name] = max(errors[name], abs(values[name] - series[i]))
+        if i >= state.atr_window:
+            tr = np.maximum(ohlcv[1:i + 1, 2] - ohlcv[1:i + 1, 3], np.abs(ohlcv[1:i + 1, 2] - ohlcv[:i, 4]))
+            errors["atr"] = max(errors["atr"], abs(values["atr"] - np.mean(tr[-state.atr_window:])))
+    series = compute_series(ohlcv)
+    reference["atr"] = np.array([np.nan] * state.atr_window + [
+        np.mean(np.maximum(ohlcv[i - state.atr_window + 1:i + 1, 2] - ohlcv[i - state.atr_window + 1:i + 1, 3],
+                           np.abs(ohlcv[i - state.atr_window + 1:i + 1, 2] - ohlcv[i - state.atr_window:i, 4])))
+        for i in range(state.atr_window, len(ohlcv))
+    ])
+    for name, reference_series in reference.items():
+        start = 2 * state.adx_window - 1 if name == "adx" else 0
+        valid = ~np.isnan(series[name][start:]) & ~np.isnan(reference_series[start:])
+        errors[name + "_vectorise"] = float(np.max(np.abs(series[name][start:][valid] - reference_series[start:][valid])))
+    return errors
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 500))
+    highs = closes + rng.uniform(0, 2, 500)
+    lows = closes - rng.uniform(0, 2, 500)
+    candles = np.column_stack([np.arange(500) * 900000, closes, highs, lows, closes, rng.uniform(50, 150, 500)])
+    for name, error in compare_with_ta(candles).items():
+        print(f"{name}: écart max {error:.2e}")
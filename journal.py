@@ -0,0 +1,198 @@
+# journal.py
+import csv
+import io
+import json
+import os
+import threading
+import time
+
+# always : fsync à chaque événement ; interval : au plus un fsync par fsync_interval secondes ; never : laissé à l'OS
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def to_json(value):
+    # Scalaires numpy (np.int64, np.bool_...) non sérialisables tels quels
+    return value.item()
+
+
+def truncate_partial_line(path):
+    # Une coupure pendant une écriture peut laisser une dernière ligne incomplète : elle est tronquée
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        # Seule la fin du fichier est lue, jusqu'au dernier saut de ligne
+        position = size
+        while position > 0:
+            step = min(8192, position)
+            f.seek(position - step)
+            block = f.read(step)
+            if position == size and block.endswith(b"\n"):
+                return
+            index = block.rfind(b"\n")
+            if index >= 0:
+                f.truncate(position - step + index + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dir(path):
+    # Rend le renommage durable (sans effet sur les systèmes qui ne l'autorisent pas)
+    try:
+        fsync_path(os.path.dirname(os.path.abspath(path)))
+    except OSError:
+        pass
+
+
+# Journal append-only des événements de trading : une ligne JSON par événement, écrite en une fois en fin de fichier
+# Le coût d'un événement ne dépend pas de la taille de l'historique ; compact() remplace le journal par un point de reprise
+class Journal:
+    def __init__(self, path, fsync="interval", fsync_interval=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Politique fsync inconnue: {fsync} (attendu: {', '.join(FSYNC_POLICIES)})")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.last_sync = 0.0
+        self.events = 0
+
+    def open(self):
+        self.repair()
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def repair(self):
+        truncate_partial_line(self.path)
+
+    def append(self, event, **fields):
+        line = json.dumps({"event": event, "time": time.time(), **fields}, default=to_json, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.open()
+            self.file.write(line)
+            self.file.flush()
+            self.sync()
+            self.events += 1
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if force or self.fsync == "always" or (self.fsync == "interval" and now - self.last_sync >= self.fsync_interval):
+            os.fsync(self.file.fileno())
+            self.last_sync = now
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par une coupure : ignorée
+                    break
+        return records
+
+    def compact(self, **checkpoint):
+        # Réécriture atomique : le point de reprise est écrit dans un fichier temporaire, synchronisé puis renommé
+        tmp_path = self.path + ".tmp"
+        line = json.dumps({"event": "checkpoint", "time": time.time(), **checkpoint}, default=to_json, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if self.file is not None:
+                self.file.close()
+            os.replace(tmp_path, self.path)
+            fsync_dir(self.path)
+            self.file = open(self.path, "a", encoding="utf-8")
+            self.last_sync = time.monotonic()
+            self.events = 0
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+                self.sync(force=True)
+                self.file.close()
+                self.file = None
+
+
+def rebuild(records):
+    # Dernier point de reprise, positions ouvertes et trades fermés depuis ce point de reprise
+    checkpoint = None
+    positions = {}
+    trades = []
+    for record in records:
+        if record["event"] == "checkpoint":
+            checkpoint = record
+            positions = {position["Position_ID"]: position for position in record["positions"]}
+            trades = []
+        elif record["event"] == "open":
+            positions[record["position"]["Position_ID"]] = record["position"]
+        elif record["event"] == "close":
+            positions.pop(record["trade"]["Position_ID"], None)
+            trades.append(record["trade"])
+    return checkpoint, list(positions.values()), trades
+
+
+def read_csv(path, numeric=(), offset=0):
+    # Lignes d'un CSV en dictionnaires, à partir de l'octet offset (en-tête toujours lu en début de fichier)
+    with open(path, "rb") as f:
+        first_line = f.readline()
+        if not first_line:
+            return []
+        header = next(csv.reader([first_line.decode("utf-8")]))
+        if offset > f.tell():
+            f.seek(offset)
+        rows = list(csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""), fieldnames=header))
+    for row in rows:
+        for column in numeric:
+            if column in row:
+                row[column] = float(row[column]) if row[column] not in ("", None) else None
+    return rows
+
+
+def append_csv(path, columns, row):
+    # Ajout d'une ligne en fin de fichier (en-tête écrit si le fichier est vide)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        if f.tell() == 0:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def write_csv_atomic(path, columns, rows):
+    # Fichier temporaire puis renommage : un lecteur voit toujours l'ancienne ou la nouvelle version complète
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+        # Données sur disque avant le renommage : après une coupure, le fichier renommé n'est jamais vide ou tronqué
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+def write_json_atomic(path, value):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f, default=to_json, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
@@ -0,0 +1,158 @@
+# logs.py
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+# Délai avant une nouvelle tentative de rotation après un échec (fichier verrouillé, disque en lecture seule...)
+ROTATE_RETRY_SECONDS = 60
+
+# Ligne de log : [date] NIVEAU message {"champ": valeur, ...} (champs JSON optionnels)
+LINE_PATTERN = re.compile(r"^\[(?P<time>[^\]]+)\] (?P<level>[A-Z]+) (?P<message>.*?)(?: (?P<fields>\{.*\}))?$")
+
+
+def parse_line(line):
+    match = LINE_PATTERN.match(line.rstrip("\n"))
+    if match is None:
+        return None
+    record = match.groupdict()
+    record["fields"] = json.loads(record["fields"]) if record["fields"] else {}
+    return record
+
+
+# Journal de logs asynchrone : les appels ne font que mettre l'enregistrement en file,
+# un thread unique formate et écrit les lignes par lots sur un seul descripteur ouvert
+class LogWriter:
+    def __init__(self, path, level="INFO", tz=None, max_bytes=10 * 1024 * 1024, backup_count=5,
+                 rotate_interval=None, console=True, flush_interval=0.5, metrics=None):
+        if level not in LEVELS:
+            raise ValueError(f"Niveau de log inconnu: {level} (attendu: {', '.join(LEVELS)})")
+        self.path = path
+        self.level = LEVELS[level]
+        self.tz = tz
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.console = console
+        self.flush_interval = flush_interval
+        # Registre optionnel (metrics.Registry) : durée des écritures par lot et nombre de lignes
+        self.write_seconds = metrics.histogram("equinox_log_write_seconds", "Durée d'écriture d'un lot de logs") if metrics else None
+        self.lines_total = metrics.counter("equinox_log_lines_total", "Lignes de log écrites") if metrics else None
+        self.queue = queue.SimpleQueue()
+        self.file = None
+        self.opened_at = None
+        self.rotate_retry_at = 0.0
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def log(self, level, message, **fields):
+        if LEVELS[level] >= self.level:
+            self.queue.put((time.time(), level, message, fields))
+
+    def debug(self, message, **fields):
+        self.log("DEBUG", message, **fields)
+
+    def info(self, message, **fields):
+        self.log("INFO", message, **fields)
+
+    def warning(self, message, **fields):
+        self.log("WARNING", message, **fields)
+
+    def error(self, message, **fields):
+        self.log("ERROR", message, **fields)
+
+    def format(self, record):
+        timestamp, level, message, fields = record
+        line = f"[{datetime.fromtimestamp(timestamp, self.tz)}] {level} {message}"
+        if fields:
+            line += " " + json.dumps(fields, default=str, ensure_ascii=False)
+        return line + "\n"
+
+    def run(self):
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Tout ce qui est déjà en file part dans la même écriture
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+            start = time.perf_counter()
+            self.write("".join(self.format(record) for record in batch))
+            if self.write_seconds is not None:
+                self.write_seconds.observe(time.perf_counter() - start)
+                self.lines_total.inc(len(batch))
+
+    def write(self, text):
+        if not text:
+            return
+        try:
+            if self.file is None:
+                self.open()
+            if self.should_rotate():
+                try:
+                    self.rotate()
+                except OSError as e:
+                    # Rotation impossible : le lot est écrit dans le fichier courant, nouvel essai plus tard
+                    sys.stderr.write(f"Rotation impossible de {self.path}: {e}\n")
+                    self.rotate_retry_at = time.time() + ROTATE_RETRY_SECONDS
+                    if self.file is None:
+                        self.open()
+            self.file.write(text)
+            self.file.flush()
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Erreur écriture {self.path}: {e}\n")
+        if self.console:
+            try:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                # Sortie standard fermée : les logs continuent d'aller dans le fichier
+                self.console = False
+
+    def open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_at = time.time()
+
+    def should_rotate(self):
+        if time.time() < self.rotate_retry_at:
+            return False
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self.opened_at >= self.rotate_interval
+
+    def rotate(self):
+        # console_log.txt -> console_log.txt.1 -> ... -> console_log.txt.{backup_count} (le plus ancien est supprimé)
+        self.file.close()
+        # Échec du renommage : le prochain lot rouvre le fichier au lieu d'écrire dans un fichier fermé
+        self.file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.open()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,53 @@
+# markets.py
+import json
+import os
+import threading
+import time
+
+# Les marchés changent rarement : le cache disque est réutilisé pendant 24h
+MARKETS_MAX_AGE = 24 * 3600
+
+
+def load_markets(exchange, path=None, max_age=MARKETS_MAX_AGE):
+    # Marchés relus depuis le disque s'ils sont assez récents, sinon téléchargés une fois puis sauvegardés
+    if path and os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age:
+        try:
+            with open(path, "r") as f:
+                cached = json.load(f)
+            exchange.set_markets(cached["markets"], cached.get("currencies"))
+            return "cache"
+        except (OSError, ValueError, KeyError):
+            pass
+    exchange.load_markets()
+    if path:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"markets": list(exchange.markets.values()), "currencies": exchange.currencies}, f, default=str)
+        os.replace(tmp_path, path)
+    return "exchange"
+
+
+# Client ccxt créé au premier usage : l'import de ccxt et le chargement des marchés sont différés après le démarrage
+class LazyExchange:
+    def __init__(self, exchange_id, config=None, markets_file=None, max_age=MARKETS_MAX_AGE):
+        self._client = None
+        self.exchange_id = exchange_id
+        self.config = config or {}
+        self.markets_file = markets_file
+        self.max_age = max_age
+        self.markets_source = None
+        self.lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self.lock:
+                if self._client is None:
+                    import ccxt
+
+                    client = getattr(ccxt, self.exchange_id)(self.config)
+                    self.markets_source = load_markets(client, self.markets_file, self.max_age)
+                    self._client = client
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.client(), name)
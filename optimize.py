@@ -0,0 +1,134 @@
+# optimize.py
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import backtest
+from config import MIN_ATR, OPTIMIZED_PARAMS_FILE, SYMBOL_PARAMS, SYMBOLS
+
+SIGNAL_FIELDS = ["price", "atr", "fib_1618", "reasons"]
+
+# Grille par défaut : ratios TP/SL en multiples d'ATR et multiplicateurs du MIN_ATR actuel
+TP_RATIOS = [1.0, 1.5, 2.0, 2.5, 3.0, 4.0]
+SL_RATIOS = [0.5, 0.75, 1.0, 1.5, 2.0]
+MIN_ATR_FACTORS = [0.0, 0.5, 1.0, 2.0, 4.0]
+
+# État de chaque worker : bougies et signaux ouverts en mmap (aucune copie entre processus)
+worker_data = {}
+worker_signals = {}
+
+
+def precompute_signals(data, signals_dir):
+    # Signaux calculés une seule fois (min_atr=0) dans le processus parent, puis partagés en .npy mmap
+    for symbol, (ohlcv_1h, ohlcv_15m) in data.items():
+        result = backtest.compute_signals(ohlcv_1h, ohlcv_15m, 0.0)
+        for field in SIGNAL_FIELDS:
+            np.save(signal_path(signals_dir, symbol, field), result[field])
+
+
+def signal_path(signals_dir, symbol, field):
+    return os.path.join(signals_dir, f"{symbol.replace('/', '-')}_{field}.npy")
+
+
+def init_worker(data_dir, signals_dir, symbols, start, end):
+    worker_data.update(backtest.load_data(data_dir, symbols, start, end, mmap=True))
+    for symbol in worker_data:
+        # np.asarray : vue ndarray sur le mmap, sans copie ni surcoût d'indexation de np.memmap
+        worker_signals[symbol] = {
+            field: np.asarray(np.load(signal_path(signals_dir, symbol, field), mmap_mode="r")) for field in SIGNAL_FIELDS
+        }
+
+
+def run_combination(task):
+    symbol, tp_ratio, sl_ratio, min_atr = task
+    result = backtest.apply_min_atr(worker_signals[symbol], min_atr)
+    params = {"default": {**SYMBOL_PARAMS["default"], "tp_ratio": tp_ratio, "sl_ratio": sl_ratio}}
+    # Un symbole à la fois : MAX_POSITIONS n'intervient pas, seule la règle d'une position par symbole s'applique
+    pnls = np.array(backtest.simulate({symbol: worker_data[symbol]}, {symbol: result}, params, records=False), dtype=np.float64)
+    return {
+        "Symbole": symbol,
+        "tp_ratio": tp_ratio,
+        "sl_ratio": sl_ratio,
+        "min_atr": min_atr,
+        "Total_Trades": len(pnls),
+        "Wins": int((pnls > 0).sum()),
+        "Total_PNL": float(pnls.sum()),
+    }
+
+
+def build_tasks(symbols, samples=None, seed=0):
+    tasks = []
+    for symbol in symbols:
+        base_atr = MIN_ATR.get(symbol, MIN_ATR["default"])
+        grid = list(itertools.product(TP_RATIOS, SL_RATIOS, [base_atr * factor for factor in MIN_ATR_FACTORS]))
+        if samples is not None and samples < len(grid):
+            grid = random.Random(seed).sample(grid, samples)
+        tasks.extend((symbol, tp, sl, atr) for tp, sl, atr in grid)
+    return tasks
+
+
+def best_parameters(results, min_trades):
+    # Meilleure combinaison par symbole (PNL total), parmi celles avec assez de trades
+    table = pd.DataFrame(results)
+    if table.empty:
+        return {}, {}
+    table = table[table["Total_Trades"] >= min_trades]
+    if table.empty:
+        return {}, {}
+    best = table.loc[table.groupby("Symbole")["Total_PNL"].idxmax()]
+    symbol_params = {
+        row.Symbole: {**SYMBOL_PARAMS["default"], "tp_ratio": float(row.tp_ratio), "sl_ratio": float(row.sl_ratio)}
+        for row in best.itertuples()
+    }
+    min_atr = {row.Symbole: float(row.min_atr) for row in best.itertuples()}
+    return symbol_params, min_atr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimisation parallèle de SYMBOL_PARAMS et MIN_ATR par backtest")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--symbols", nargs="*", default=SYMBOLS)
+    parser.add_argument("--samples", type=int, help="recherche aléatoire : nombre de combinaisons par symbole")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--min-trades", type=int, default=10)
+    parser.add_argument("--out", default=OPTIMIZED_PARAMS_FILE)
+    parser.add_argument("--results", default="optimization_results.csv")
+    args = parser.parse_args()
+
+    start, end = backtest.parse_date(args.start), backtest.parse_date(args.end)
+    began = time.monotonic()
+    data = backtest.load_data(args.data, args.symbols, start, end, mmap=True)
+    tasks = build_tasks(list(data), args.samples)
+    with tempfile.TemporaryDirectory(prefix="equinox_signals_") as signals_dir:
+        precompute_signals(data, signals_dir)
+        print(f"Signaux précalculés pour {len(data)} symboles en {time.monotonic() - began:.2f}s")
+        with Pool(args.workers, initializer=init_worker, initargs=(args.data, signals_dir, list(data), start, end)) as pool:
+            chunksize = max(1, len(tasks) // (args.workers * 8))
+            results = list(pool.imap_unordered(run_combination, tasks, chunksize=chunksize))
+
+    # Aucun résultat exploitable : optimized_params.json n'est pas écrasé par des paramètres vides
+    if not results:
+        sys.exit(f"Aucune combinaison évaluée (aucune donnée exploitable dans {args.data}) : {args.out} inchangé")
+    pd.DataFrame(results).sort_values(["Symbole", "Total_PNL"], ascending=[True, False]).to_csv(args.results, index=False)
+    symbol_params, min_atr = best_parameters(results, args.min_trades)
+    if not symbol_params:
+        sys.exit(f"Aucune combinaison avec au moins {args.min_trades} trades (détail : {args.results}) : {args.out} inchangé")
+    with open(args.out, "w") as f:
+        json.dump({"SYMBOL_PARAMS": symbol_params, "MIN_ATR": min_atr}, f, indent=2)
+    print(f"{len(tasks)} combinaisons évaluées en {time.monotonic() - began:.2f}s sur {args.workers} processus")
+    print(f"Paramètres optimaux pour {len(symbol_params)} symboles -> {args.out} (détail : {args.results})")
+
+
+if __name__ == "__main__":
+    main()
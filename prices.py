@@ -0,0 +1,41 @@
+# prices.py
+import threading
+import time
+
+
+# Photo des derniers prix de tous les symboles suivis, obtenue en un seul appel fetch_tickers
+class PriceSnapshot:
+    def __init__(self, exchange, symbols, max_age=1.0, call=None):
+        self.exchange = exchange
+        self.symbols = list(symbols)
+        self.max_age = max_age
+        # call permet de passer par le limiteur de débit du bot (api_call)
+        self.call = call or (lambda method, *args, **kwargs: method(*args, **kwargs))
+        self.prices = {}
+        self.timestamp = 0.0
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    def refresh(self):
+        tickers = self.call(self.exchange.fetch_tickers, self.symbols)
+        prices = {}
+        for symbol in self.symbols:
+            ticker = tickers.get(symbol)
+            if ticker is not None and ticker.get("last") is not None:
+                prices[symbol] = ticker["last"]
+        with self.lock:
+            self.prices = prices
+            self.timestamp = time.time()
+        return prices
+
+    def is_fresh(self):
+        return time.time() - self.timestamp < self.max_age
+
+    def get(self):
+        # Un seul rafraîchissement à la fois : les appelants concurrents réutilisent la même photo
+        if not self.is_fresh():
+            with self.refresh_lock:
+                if not self.is_fresh():
+                    self.refresh()
+        with self.lock:
+            return self.timestamp, dict(self.prices)
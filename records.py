@@ -0,0 +1,119 @@
+# records.py
+import numpy as np
+
+from storage import TRADE_DTYPE, array_to_trades, trades_to_array
+
+
+# Positions ouvertes indexées par Position_ID (ordre d'ouverture conservé) et comptées par symbole :
+# ajout, retrait et contrôle de doublon en O(1) quel que soit le nombre de positions
+class PositionBook:
+    def __init__(self, positions=()):
+        self.by_id = {}
+        self.by_symbol = {}
+        for position in positions:
+            self.add(position)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __contains__(self, position_id):
+        return position_id in self.by_id
+
+    def get(self, position_id):
+        return self.by_id.get(position_id)
+
+    def add(self, position):
+        self.by_id[position["Position_ID"]] = position
+        symbol = position["Symbole"]
+        self.by_symbol[symbol] = self.by_symbol.get(symbol, 0) + 1
+
+    def remove(self, position_id):
+        position = self.by_id.pop(position_id, None)
+        if position is None:
+            return None
+        symbol = position["Symbole"]
+        self.by_symbol[symbol] -= 1
+        if not self.by_symbol[symbol]:
+            del self.by_symbol[symbol]
+        return position
+
+    def has_symbol(self, symbol):
+        return symbol in self.by_symbol
+
+    def symbols(self):
+        return set(self.by_symbol)
+
+    def reset(self, positions):
+        self.clear()
+        for position in positions:
+            self.add(position)
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_symbol.clear()
+
+    def list(self):
+        return list(self.by_id.values())
+
+
+# Trades fermés pendant la session en mémoire dans un tableau structuré (storage.TRADE_DTYPE, ~0,5 Ko par trade au lieu d'un dict de 15 objets),
+# agrandi par doublement, avec un index Position_ID -> ligne
+class TradeHistory:
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.rows = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self.size = 0
+        self.index = {}
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, position_id):
+        return position_id in self.index
+
+    def reserve(self, count):
+        if self.size + count > len(self.rows):
+            rows = np.zeros(max(2 * len(self.rows), self.size + count), dtype=TRADE_DTYPE)
+            rows[:self.size] = self.rows[:self.size]
+            self.rows = rows
+
+    def append(self, trade):
+        # Renvoie la ligne typée, réutilisée telle quelle par le stockage en colonnes
+        row = trades_to_array([trade])
+        self.reserve(1)
+        self.rows[self.size] = row[0]
+        self.index[trade["Position_ID"]] = self.size
+        self.size += 1
+        return row
+
+    def extend(self, trades):
+        array = trades_to_array(trades)
+        self.reserve(len(array))
+        self.rows[self.size:self.size + len(array)] = array
+        for offset, trade in enumerate(trades):
+            self.index[trade["Position_ID"]] = self.size + offset
+        self.size += len(array)
+
+    def array(self):
+        return self.rows[:self.size]
+
+    def get(self, position_id, tz=None):
+        row = self.index.get(position_id)
+        if row is None:
+            return None
+        return array_to_trades(self.rows[row:row + 1], tz)[0]
+
+    def to_dicts(self, tz=None):
+        return array_to_trades(self.array(), tz)
+
+    def reset(self, trades):
+        self.clear()
+        self.extend(trades)
+
+    def clear(self):
+        self.rows = np.zeros(self.capacity, dtype=TRADE_DTYPE)
+        self.size = 0
+        self.index = {}
@@ -0,0 +1,103 @@
+# scheduler.py
+import time
+
+import numpy as np
+
+import signals
+from candles import TIMEFRAME_MS
+
+# Délai après la clôture d'une bougie avant de la demander à l'exchange (publication côté exchange)
+CLOSE_DELAY = 2.0
+# Entre deux clôtures, seuls les symboles proches d'une entrée sont réévalués, toutes les HOT_INTERVAL secondes
+HOT_INTERVAL = 30
+# Proche d'une entrée : au plus HOT_MAX_REASONS conditions non remplies d'un côté, ou une de plus
+# avec un prix à moins de HOT_DISTANCE (relatif) de la zone Fibonacci ou du breaker block
+HOT_MAX_REASONS = 1
+HOT_DISTANCE = 0.01
+
+LONG_MASK = (signals.LONG_STRUCTURE | signals.LONG_BREAKER | signals.LONG_BREAKER_DISTANCE | signals.LONG_FIBONACCI
+             | signals.LONG_ATR | signals.LONG_VOLUME)
+SHORT_MASK = LONG_MASK << 6
+
+
+def popcount(values):
+    values = np.asarray(values, dtype=np.int64)
+    return sum((values >> bit) & 1 for bit in range(12))
+
+
+def entry_priority(result):
+    # (conditions manquantes du meilleur côté, distance relative à la zone d'entrée la plus proche) par symbole
+    reasons = result["reasons"]
+    missing = np.minimum(popcount(reasons & LONG_MASK), popcount(reasons & SHORT_MASK))
+    price = result["price"]
+    low = np.minimum(result["fib_0_5"], result["fib_0_9"])
+    high = np.maximum(result["fib_0_5"], result["fib_0_9"])
+    fib_distance = np.maximum(np.maximum(low - price, price - high), 0) / price
+    breaker_distance = np.abs(price - np.nan_to_num(result["bb_price"], nan=np.inf)) / price
+    return missing, np.minimum(fib_distance, breaker_distance)
+
+
+def input_key(ohlcv_1h, ohlcv_15m):
+    # Entrées de signals.evaluate qui changent d'un appel à l'autre : dernière bougie de chaque timeframe
+    return tuple(ohlcv_1h[-1].tolist()) + tuple(ohlcv_15m[-1].tolist())
+
+
+# Planification des scans : tous les symboles à chaque clôture de bougie (la plus courte des timeframes),
+# les plus proches d'une entrée en premier ; entre deux clôtures, uniquement les symboles proches d'une entrée
+class ScanScheduler:
+    def __init__(self, symbols, timeframes=("1h", "15m"), close_delay=CLOSE_DELAY, hot_interval=HOT_INTERVAL,
+                 clock=time.time, sleep=time.sleep):
+        self.symbols = list(symbols)
+        self.step = min(TIMEFRAME_MS[timeframe] for timeframe in timeframes) / 1000
+        self.close_delay = close_delay
+        self.hot_interval = hot_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.priority = {}
+        self.hot = set()
+        self.inputs = {}
+        # Premier appel : scan complet immédiat
+        self.next_close = None
+        self.last_hot = self.clock()
+
+    def ordered(self, symbols):
+        return sorted(symbols, key=lambda symbol: self.priority.get(symbol, (0, 0.0)))
+
+    def next_batch(self):
+        # Attend la prochaine échéance -> (heure de clôture ou None, lots de symboles dans l'ordre de traitement)
+        now = self.clock()
+        close_at = now if self.next_close is None else self.next_close + self.close_delay
+        hot_at = self.last_hot + self.hot_interval
+        if min(close_at, hot_at) > now:
+            self.sleep(min(close_at, hot_at) - now)
+            now = self.clock()
+        self.last_hot = now
+        if now >= close_at:
+            closed_at = self.next_close
+            self.next_close = (now // self.step + 1) * self.step
+            hot = self.ordered(symbol for symbol in self.symbols if symbol in self.hot)
+            cold = self.ordered(symbol for symbol in self.symbols if symbol not in self.hot)
+            return closed_at, [batch for batch in (hot, cold) if batch]
+        hot = self.ordered(symbol for symbol in self.symbols if symbol in self.hot)
+        return None, [hot] if hot else []
+
+    def changed(self, symbol, ohlcv_1h, ohlcv_15m):
+        # Entrées identiques à la dernière évaluation (aucune nouvelle bougie ni nouveau tick) : évaluation inutile
+        key = input_key(ohlcv_1h, ohlcv_15m)
+        if self.inputs.get(symbol) == key:
+            return False
+        self.inputs[symbol] = key
+        return True
+
+    def update(self, symbols, result):
+        missing, distance = entry_priority(result)
+        signaled = result["long"] | result["short"]
+        for symbol, symbol_missing, symbol_distance, signal in zip(symbols, missing.tolist(), distance.tolist(), signaled.tolist()):
+            self.priority[symbol] = (symbol_missing, symbol_distance)
+            if signal:
+                # Entrée refusée (plafond de positions...) : réévaluée au prochain passage même sans changement
+                self.inputs.pop(symbol, None)
+            if symbol_missing <= HOT_MAX_REASONS or (symbol_missing <= HOT_MAX_REASONS + 1 and symbol_distance <= HOT_DISTANCE):
+                self.hot.add(symbol)
+            else:
+                self.hot.discard(symbol)
@@ -0,0 +1,430 @@
+# shard.py
+import argparse
+import csv
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytz
+
+from analytics import Analytics
+from config import MAX_POSITIONS, SYMBOLS, positions_columns, stats_columns, trades_columns
+from journal import append_csv, fsync_path, read_csv, to_json, write_csv_atomic, write_json_atomic
+
+COORDINATOR_PORT = 8764
+# Fusion des fichiers des workers (trades, positions, stats) dans le répertoire du coordinateur
+COLLECT_INTERVAL = 5
+RESTART_DELAY = 10
+REQUEST_TIMEOUT = 2
+SHARDS_DIR = "shards"
+STATE_FILE = "coordinator.json"
+
+positions_file = "positions.csv"
+trades_file = "trades.csv"
+stats_file = "stats.csv"
+missed_trades_file = "missed_trades.txt"
+analytics_file = "analytics.json"
+
+POSITION_NUMERIC_COLUMNS = ["Prix_Entree", "Quantite", "TP", "SL", "RSI", "EMA_30", "ATR", "ADX", "Fib_1618", "Marge", "Levier"]
+
+
+def split_symbols(symbols, shards):
+    # Répartition alternée : chaque worker reçoit un nombre de symboles à une unité près
+    return [symbols[index::shards] for index in range(shards) if symbols[index::shards]]
+
+
+# Emplacements de positions de tous les workers : MAX_POSITIONS et l'unicité par symbole sont globaux
+# Chaque requête d'un worker porte une séquence croissante : une synchronisation plus ancienne que la dernière
+# réservation ou libération du worker est ignorée (photo prise avant ce changement)
+class SlotTable:
+    def __init__(self, max_positions=MAX_POSITIONS):
+        self.max_positions = max_positions
+        self.slots = {}
+        self.sequences = {}
+        self.lock = threading.Lock()
+
+    def advance(self, worker, sequence):
+        if sequence is not None:
+            self.sequences[worker] = max(self.sequences.get(worker, 0), sequence)
+
+    def acquire(self, worker, position_id, symbol, sequence=None):
+        with self.lock:
+            self.advance(worker, sequence)
+            if position_id in self.slots:
+                return True
+            if len(self.slots) >= self.max_positions:
+                return False
+            if any(slot["symbol"] == symbol for slot in self.slots.values()):
+                return False
+            self.slots[position_id] = {"worker": worker, "symbol": symbol}
+            return True
+
+    def release(self, position_id, worker=None, sequence=None):
+        with self.lock:
+            if worker is not None:
+                self.advance(worker, sequence)
+            self.slots.pop(position_id, None)
+
+    def sync(self, worker, positions, pending=(), sequence=None):
+        # Positions ouvertes déclarées par un worker (redémarrage, reprise après erreur) ; pending : réservations
+        # en cours côté worker, conservées si accordées mais jamais créées ici. Les positions inconnues ne sont
+        # reprises que dans la limite de max_positions -> False si la photo est périmée
+        with self.lock:
+            if sequence is not None and sequence < self.sequences.get(worker, 0):
+                return False
+            self.advance(worker, sequence)
+            keep = {position["Position_ID"] for position in positions} | set(pending)
+            self.slots = {
+                position_id: slot for position_id, slot in self.slots.items()
+                if slot["worker"] != worker or position_id in keep
+            }
+            for position in positions:
+                if position["Position_ID"] not in self.slots and len(self.slots) < self.max_positions:
+                    self.slots[position["Position_ID"]] = {"worker": worker, "symbol": position["Symbole"]}
+            return True
+
+    def state(self):
+        with self.lock:
+            return {"max_positions": self.max_positions, "slots": dict(self.slots)}
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload, default=to_json).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/state":
+            self.send_error(404)
+            return
+        self.send_json(self.server.slots.state())
+
+    def do_POST(self):
+        slots = self.server.slots
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if self.path == "/acquire":
+                self.send_json({"granted": slots.acquire(
+                    request["worker"], request["position_id"], request["symbol"], request.get("sequence"),
+                )})
+            elif self.path == "/release":
+                slots.release(request["position_id"], request.get("worker"), request.get("sequence"))
+                self.send_json({"released": True})
+            elif self.path == "/sync":
+                synced = slots.sync(request["worker"], request["positions"], request.get("pending", []), request.get("sequence"))
+                self.send_json({"synced": synced})
+            else:
+                self.send_error(404)
+        except (KeyError, TypeError, ValueError):
+            self.send_error(400)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serveur HTTP local du coordinateur : POST /acquire, /release, /sync ; GET /state
+class CoordinatorServer:
+    def __init__(self, slots, host="127.0.0.1", port=COORDINATOR_PORT):
+        self.server = ThreadingHTTPServer((host, port), CoordinatorHandler)
+        self.server.daemon_threads = True
+        self.server.slots = slots
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="coordinator", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Client du coordinateur côté worker (bot.py) ; coordinateur injoignable : ouverture refusée
+class CoordinatorClient:
+    def __init__(self, url, worker, timeout=REQUEST_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.worker = worker
+        self.timeout = timeout
+        self.sequence = 0
+        self.sequence_lock = threading.Lock()
+
+    def next_sequence(self):
+        # Croissante y compris d'un redémarrage du worker à l'autre (horloge en ns)
+        with self.sequence_lock:
+            self.sequence = max(self.sequence + 1, time.time_ns())
+            return self.sequence
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload, default=to_json).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def acquire(self, position):
+        return self.post("/acquire", {
+            "worker": self.worker, "position_id": position["Position_ID"], "symbol": position["Symbole"],
+            "sequence": self.next_sequence(),
+        })["granted"]
+
+    def release(self, position_id):
+        self.post("/release", {"worker": self.worker, "position_id": position_id, "sequence": self.next_sequence()})
+
+    def sync(self, positions, pending, sequence):
+        # sequence : prise avec la photo des positions, sous le verrou du worker
+        return self.post("/sync", {"worker": self.worker, "sequence": sequence, "pending": list(pending), "positions": [
+            {"Position_ID": position["Position_ID"], "Symbole": position["Symbole"]} for position in positions
+        ]})["synced"]
+
+
+def read_new_rows(path, offset):
+    # Lignes complètes ajoutées à un CSV en ajout seul depuis l'octet offset -> (lignes, nouvel offset)
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, "rb") as f:
+        header = f.readline()
+        if offset > os.fstat(f.fileno()).st_size:
+            # Fichier remplacé ou tronqué : relu depuis le début
+            offset = 0
+        offset = max(offset, f.tell())
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if not end:
+        return [], offset
+    rows = list(csv.DictReader(io.StringIO((header + data[:end]).decode("utf-8"), newline="")))
+    return rows, offset + end
+
+
+def read_missed_trades(path):
+    missed_trades = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith("- "):
+                    reason, count = line[2:].rstrip("\n").rsplit(": ", 1)
+                    missed_trades[reason] = int(count)
+    return missed_trades
+
+
+def analytics_stats(analytics):
+    # stats.csv global déduit des agrégats par symbole (chaque trade fusionné y est compté une fois)
+    total_trades = sum(values["Total_Trades"] for values in analytics.per_symbol.values())
+    wins = sum(values["Wins"] for values in analytics.per_symbol.values())
+    return {
+        "Total_Trades": total_trades,
+        "Wins": wins,
+        "Losses": total_trades - wins,
+        "Winrate": wins / total_trades if total_trades > 0 else 0.0,
+        "Total_PNL": analytics.equity,
+        **analytics.values(),
+        "Update_Time": str(datetime.now(pytz.timezone("Europe/Paris"))),
+    }
+
+
+# Fusion des sorties des workers dans les fichiers habituels du bot : le cockpit lancé dans ce répertoire
+# voit l'ensemble des shards. Les trades sont lus par offset (ajout seul), les stats mises à jour en O(1) par trade
+class Collector:
+    def __init__(self, worker_dirs, root="."):
+        self.worker_dirs = worker_dirs
+        self.root = root
+        self.state_path = os.path.join(root, STATE_FILE)
+        self.offsets = {}
+        self.analytics = Analytics()
+        self.positions = None
+        self.missed_trades = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            self.offsets = state["offsets"]
+            self.analytics = Analytics.from_state(state["analytics"])
+            self.rollback_trades(state.get("trades_size"))
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def rollback_trades(self, size):
+        # Lignes fusionnées après la dernière écriture de STATE_FILE (arrêt entre les deux) : retirées,
+        # elles sont relues depuis les offsets enregistrés et ne sont ni dupliquées ni comptées deux fois
+        path = self.path(trades_file)
+        if size is not None and os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+    def open_positions(self):
+        positions = []
+        for directory in self.worker_dirs:
+            path = os.path.join(directory, positions_file)
+            if os.path.exists(path):
+                positions.extend(read_csv(path, POSITION_NUMERIC_COLUMNS))
+        return positions
+
+    def collect(self):
+        added = 0
+        for directory in self.worker_dirs:
+            rows, offset = read_new_rows(os.path.join(directory, trades_file), self.offsets.get(directory, 0))
+            for row in rows:
+                append_csv(self.path(trades_file), trades_columns, row)
+                self.analytics.update(float(row["PNL"]), row["Symbole"], row["Temps_Sortie"])
+            self.offsets[directory] = offset
+            added += len(rows)
+        if added or not os.path.exists(self.path(stats_file)):
+            write_csv_atomic(self.path(stats_file), stats_columns, [analytics_stats(self.analytics)])
+            write_json_atomic(self.path(analytics_file), self.analytics.snapshot())
+            # Offsets, agrégats et taille du trades.csv fusionné enregistrés ensemble : point de reprise cohérent
+            trades_size = 0
+            if os.path.exists(self.path(trades_file)):
+                fsync_path(self.path(trades_file))
+                trades_size = os.path.getsize(self.path(trades_file))
+            write_json_atomic(self.state_path, {
+                "offsets": self.offsets, "analytics": self.analytics.state(), "trades_size": trades_size,
+            })
+        positions = self.open_positions()
+        if positions != self.positions:
+            write_csv_atomic(self.path(positions_file), positions_columns, positions)
+            self.positions = positions
+        missed_trades = {}
+        for directory in self.worker_dirs:
+            for reason, count in read_missed_trades(os.path.join(directory, missed_trades_file)).items():
+                missed_trades[reason] = missed_trades.get(reason, 0) + count
+        if missed_trades == self.missed_trades:
+            return added
+        self.missed_trades = missed_trades
+        with open(self.path(missed_trades_file) + ".tmp", "w") as f:
+            f.write("Trades manqués par raison:\n")
+            for reason, count in missed_trades.items():
+                f.write(f"- {reason}: {count}\n")
+        os.replace(self.path(missed_trades_file) + ".tmp", self.path(missed_trades_file))
+        return added
+
+
+# Processus bot.py d'un shard, lancé dans son propre répertoire (fichiers, journal, cache de bougies, rate limit)
+class Worker:
+    def __init__(self, name, directory, env):
+        self.name = name
+        self.directory = directory
+        self.env = env
+        self.process = None
+        self.stderr = None
+        self.exited_at = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        bot = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+        if self.stderr is not None:
+            self.stderr.close()
+        # Les logs du bot vont dans console_log.txt du shard ; stderr garde les erreurs fatales
+        self.stderr = open(os.path.join(self.directory, "stderr.txt"), "a")
+        self.process = subprocess.Popen(
+            [sys.executable, bot], cwd=self.directory, env={**os.environ, **self.env},
+            stdout=subprocess.DEVNULL, stderr=self.stderr,
+        )
+        self.exited_at = None
+
+    def check(self):
+        # Redémarrage après RESTART_DELAY si le processus s'est arrêté
+        if self.process.poll() is None:
+            return None
+        if self.exited_at is None:
+            self.exited_at = time.monotonic()
+            return self.process.returncode
+        if time.monotonic() - self.exited_at >= RESTART_DELAY:
+            self.start()
+        return None
+
+    def stop(self):
+        # SIGINT : le bot sauvegarde positions, stats et journal avant de quitter
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+
+    def wait(self, timeout):
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def build_workers(symbols, shards, exchanges, port, events_port=0, shards_dir=SHARDS_DIR):
+    optimized_params = os.path.abspath("optimized_params.json")
+    workers = []
+    for index, shard_symbols in enumerate(split_symbols(symbols, shards)):
+        exchange_id = exchanges[index % len(exchanges)]
+        name = f"{exchange_id}-{index}"
+        env = {
+            "EQUINOX_WORKER": name,
+            "EQUINOX_SYMBOLS": ",".join(shard_symbols),
+            "EQUINOX_EXCHANGE": exchange_id,
+            "EQUINOX_COORDINATOR": f"http://127.0.0.1:{port}",
+            "EQUINOX_EVENTS_PORT": str(events_port + index if events_port else 0),
+            "EQUINOX_OPTIMIZED_PARAMS": optimized_params,
+        }
+        workers.append(Worker(name, os.path.abspath(os.path.join(shards_dir, name)), env))
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot réparti en processus workers par groupes de symboles")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="nombre de shards (processus bot.py)")
+    parser.add_argument("--symbols", nargs="*", default=SYMBOLS)
+    parser.add_argument("--symbols-file", help="un symbole par ligne (remplace --symbols)")
+    parser.add_argument("--exchanges", nargs="*", default=["mexc"], help="exchanges ccxt attribués aux shards à tour de rôle")
+    parser.add_argument("--max-positions", type=int, default=MAX_POSITIONS, help="plafond global de positions ouvertes")
+    parser.add_argument("--port", type=int, default=COORDINATOR_PORT)
+    parser.add_argument("--events-port", type=int, default=0, help="premier port des flux d'événements des workers (0 : désactivés)")
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if args.symbols_file:
+        with open(args.symbols_file, "r") as f:
+            symbols = [line.strip() for line in f if line.strip()]
+    workers = build_workers(symbols, args.workers, args.exchanges, args.port, args.events_port)
+    collector = Collector([worker.directory for worker in workers])
+
+    # Positions déjà ouvertes dans les shards : réservées avant le démarrage des workers
+    slots = SlotTable(args.max_positions)
+    for worker in workers:
+        path = os.path.join(worker.directory, positions_file)
+        if os.path.exists(path):
+            slots.sync(worker.name, read_csv(path))
+    server = CoordinatorServer(slots, port=args.port).start()
+    print(f"Coordinateur sur http://127.0.0.1:{server.port} : {len(symbols)} symboles, {len(workers)} workers, "
+          f"{args.max_positions} positions max")
+    for worker in workers:
+        worker.start()
+        print(f"{worker.name} : {worker.env['EQUINOX_SYMBOLS'].count(',') + 1} symboles ({worker.directory})")
+
+    try:
+        while True:
+            time.sleep(COLLECT_INTERVAL)
+            for worker in workers:
+                returncode = worker.check()
+                if returncode is not None:
+                    print(f"{worker.name} arrêté (code {returncode}), redémarrage dans {RESTART_DELAY}s")
+            try:
+                collector.collect()
+            except (OSError, ValueError) as e:
+                print(f"Erreur fusion des shards: {e}")
+    except KeyboardInterrupt:
+        print("Arrêt des workers...")
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.wait(30)
+        collector.collect()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
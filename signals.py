@@ -0,0 +1,164 @@
+# signals.py
+import numpy as np
+
+# Raisons de rejet (bitmask), dans l'ordre des conditions long puis short de la stratégie
+LONG_STRUCTURE = 1 << 0
+LONG_BREAKER = 1 << 1
+LONG_BREAKER_DISTANCE = 1 << 2
+LONG_FIBONACCI = 1 << 3
+LONG_ATR = 1 << 4
+LONG_VOLUME = 1 << 5
+SHORT_STRUCTURE = 1 << 6
+SHORT_BREAKER = 1 << 7
+SHORT_BREAKER_DISTANCE = 1 << 8
+SHORT_FIBONACCI = 1 << 9
+SHORT_ATR = 1 << 10
+SHORT_VOLUME = 1 << 11
+
+# Noms courts des raisons, pour les métriques
+REASON_NAMES = {
+    LONG_STRUCTURE: "long_structure",
+    LONG_BREAKER: "long_breaker",
+    LONG_BREAKER_DISTANCE: "long_breaker_distance",
+    LONG_FIBONACCI: "long_fibonacci",
+    LONG_ATR: "long_atr",
+    LONG_VOLUME: "long_volume",
+    SHORT_STRUCTURE: "short_structure",
+    SHORT_BREAKER: "short_breaker",
+    SHORT_BREAKER_DISTANCE: "short_breaker_distance",
+    SHORT_FIBONACCI: "short_fibonacci",
+    SHORT_ATR: "short_atr",
+    SHORT_VOLUME: "short_volume",
+}
+
+BULLISH = 1
+BEARISH = -1
+
+ATR_PERIOD = 14
+VOLUME_PERIOD = 20
+FIBONACCI_PERIOD = 50
+BREAKER_MAX_DISTANCE = 0.07
+
+
+def calculate_atr(highs, lows, closes, period=ATR_PERIOD):
+    # True range max(high - low, |high - clôture précédente|), moyenne des period derniers, sur le dernier axe :
+    # (symboles x bougies) -> (symboles,)
+    tr = np.maximum(highs[..., 1:] - lows[..., 1:], np.abs(highs[..., 1:] - closes[..., :-1]))
+    return np.mean(tr[..., -period:], axis=-1)
+
+
+def detect_market_structure(ohlcv_1h):
+    highs, lows = ohlcv_1h[:, :, 2], ohlcv_1h[:, :, 3]
+    bullish = (highs[:, -1] > highs[:, -2]) & (lows[:, -1] > lows[:, -2])
+    bearish = (highs[:, -1] < highs[:, -2]) & (lows[:, -1] < lows[:, -2])
+    return np.where(bullish, BULLISH, np.where(bearish, BEARISH, 0))
+
+
+def detect_breaker_block(ohlcv_15m):
+    highs, lows, closes = ohlcv_15m[:, :, 2], ohlcv_15m[:, :, 3], ohlcv_15m[:, :, 4]
+    count = ohlcv_15m.shape[0]
+    bb_price = np.full(count, np.nan)
+    bb_type = np.zeros(count, dtype=np.int8)
+    # Ordre de priorité de la stratégie : i=-3 (bullish puis bearish), puis i=-2
+    for i in (-2, -3):
+        bullish = (closes[:, i] < lows[:, i - 1]) & (closes[:, i - 1] > highs[:, i - 2])
+        bearish = (closes[:, i] > highs[:, i - 1]) & (closes[:, i - 1] < lows[:, i - 2])
+        # Parcours à rebours : les conditions prioritaires écrasent les autres
+        bb_price = np.where(bearish, highs[:, i - 1], bb_price)
+        bb_type = np.where(bearish, BEARISH, bb_type)
+        bb_price = np.where(bullish, lows[:, i - 1], bb_price)
+        bb_type = np.where(bullish, BULLISH, bb_type)
+    return bb_price, bb_type
+
+
+def calculate_fibonacci(high, low):
+    diff = high - low
+    return {
+        "fib_0_5": high - 0.5 * diff,
+        "fib_0_618": high - 0.618 * diff,
+        "fib_0_705": high - 0.705 * diff,
+        "fib_0_79": high - 0.79 * diff,
+        "fib_0_9": high - 0.9 * diff,
+        "fib_1618": high + 0.618 * diff,
+    }
+
+
+def evaluate(ohlcv_1h, ohlcv_15m, min_atr):
+    # ohlcv_1h, ohlcv_15m : (symboles x bougies x OHLCV) ; min_atr : (symboles,)
+    ohlcv_1h = np.asarray(ohlcv_1h, dtype=np.float64)
+    ohlcv_15m = np.asarray(ohlcv_15m, dtype=np.float64)
+    min_atr = np.asarray(min_atr, dtype=np.float64)
+    closes_15m, volumes_15m = ohlcv_15m[:, :, 4], ohlcv_15m[:, :, 5]
+
+    price = np.round(closes_15m[:, -1], 8)
+    atr = calculate_atr(ohlcv_15m[:, :, 2], ohlcv_15m[:, :, 3], closes_15m)
+    volume = volumes_15m[:, -1]
+    mean_volume = np.mean(volumes_15m[:, -VOLUME_PERIOD:], axis=1)
+    structure = detect_market_structure(ohlcv_1h)
+    bb_price, bb_type = detect_breaker_block(ohlcv_15m)
+    fib = calculate_fibonacci(
+        np.max(ohlcv_1h[:, -FIBONACCI_PERIOD:, 2], axis=1),
+        np.min(ohlcv_1h[:, -FIBONACCI_PERIOD:, 3], axis=1),
+    )
+
+    breaker_far = ~np.isnan(bb_price) & (np.abs(price - np.nan_to_num(bb_price)) / price >= BREAKER_MAX_DISTANCE)
+    outside_fib = ~((fib["fib_0_5"] <= price) & (price <= fib["fib_0_9"]))
+    low_atr = atr < min_atr * 0.25
+    low_volume = volume <= mean_volume * 0.5
+
+    reasons = np.zeros(len(price), dtype=np.int64)
+    for flag, mask in [
+        (LONG_STRUCTURE, structure != BULLISH),
+        (LONG_BREAKER, bb_type != BULLISH),
+        (LONG_BREAKER_DISTANCE, breaker_far),
+        (LONG_FIBONACCI, outside_fib),
+        (LONG_ATR, low_atr),
+        (LONG_VOLUME, low_volume),
+        (SHORT_STRUCTURE, structure != BEARISH),
+        (SHORT_BREAKER, bb_type != BEARISH),
+        (SHORT_BREAKER_DISTANCE, breaker_far),
+        (SHORT_FIBONACCI, outside_fib),
+        (SHORT_ATR, low_atr),
+        (SHORT_VOLUME, low_volume),
+    ]:
+        reasons |= np.where(mask, flag, 0)
+
+    long_mask = (reasons & (LONG_STRUCTURE | LONG_BREAKER | LONG_BREAKER_DISTANCE | LONG_FIBONACCI | LONG_ATR | LONG_VOLUME)) == 0
+    short_mask = (reasons & (SHORT_STRUCTURE | SHORT_BREAKER | SHORT_BREAKER_DISTANCE | SHORT_FIBONACCI | SHORT_ATR | SHORT_VOLUME)) == 0
+    return {
+        "price": price,
+        "atr": atr,
+        "volume": volume,
+        "mean_volume": mean_volume,
+        "min_atr": min_atr,
+        "structure": structure,
+        "bb_price": bb_price,
+        "bb_type": bb_type,
+        **fib,
+        "long": long_mask,
+        "short": short_mask,
+        "reasons": reasons,
+    }
+
+
+def reason_labels(result, index):
+    # Libellés des raisons de rejet d'un symbole, identiques à ceux de missed_trades.txt
+    mask = int(result["reasons"][index])
+    atr, min_atr = result["atr"][index], result["min_atr"][index]
+    volume, mean_volume = result["volume"][index], result["mean_volume"][index]
+    labels = []
+    for side in ("Bullish", "Bearish"):
+        shift = 0 if side == "Bullish" else 6
+        if mask & (LONG_STRUCTURE << shift):
+            labels.append(f"Market Structure pas {side}")
+        if mask & (LONG_BREAKER << shift):
+            labels.append(f"Pas de Breaker Block {side}")
+        if mask & (LONG_BREAKER_DISTANCE << shift):
+            labels.append("Prix trop éloigné du Breaker Block")
+        if mask & (LONG_FIBONACCI << shift):
+            labels.append("Prix hors de la zone Fibonacci [0.5-0.9]")
+        if mask & (LONG_ATR << shift):
+            labels.append(f"ATR trop faible ({atr:.8f} < {min_atr * 0.25:.8f})")
+        if mask & (LONG_VOLUME << shift):
+            labels.append(f"Volume trop faible ({volume:.2f} < {mean_volume * 0.5:.2f})")
+    return labels
@@ -0,0 +1,280 @@
+# storage.py
+import argparse
+import csv
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pytz
+
+from config import trades_columns
+
+DAY_MS = 24 * 3600 * 1000
+
+# Historique des trades en colonnes typées (tableau structuré NumPy) : horodatages en ms epoch, prix en float64
+TRADE_DTYPE = np.dtype([
+    ("Symbole", "U24"), ("Type", "U5"), ("Prix_Entree", "f8"), ("Prix_Sortie", "f8"), ("Quantite", "f8"),
+    ("PNL", "f8"), ("Raison_Sortie", "U24"), ("RSI_Sortie", "f8"), ("EMA_30_Sortie", "f8"), ("ATR_Sortie", "f8"),
+    ("Temps_Entree", "i8"), ("Temps_Sortie", "i8"), ("Position_ID", "U64"), ("Marge", "f8"), ("Levier", "f8"),
+])
+TIME_COLUMNS = ("Temps_Entree", "Temps_Sortie")
+# Horodatage illisible ou absent
+NO_TIME = np.iinfo(np.int64).min
+
+
+def symbol_dir(symbol):
+    return symbol.replace("/", "-")
+
+
+def parse_time(value):
+    # str(datetime) du bot et du backtest ("2025-01-01 12:00:00.123+01:00") ou ms epoch -> ms epoch
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value) if value == value else NO_TIME
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return NO_TIME
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def format_time(timestamp_ms, tz=None):
+    if timestamp_ms == NO_TIME:
+        return ""
+    return str(datetime.fromtimestamp(timestamp_ms / 1000, tz or timezone.utc))
+
+
+def to_float(value):
+    return float(value) if value not in ("", None) else np.nan
+
+
+def trades_to_array(trades):
+    array = np.zeros(len(trades), dtype=TRADE_DTYPE)
+    for column in TRADE_DTYPE.names:
+        kind = TRADE_DTYPE[column].kind
+        values = [trade.get(column) for trade in trades]
+        if column in TIME_COLUMNS:
+            array[column] = [parse_time(value) for value in values]
+        elif kind == "f":
+            array[column] = [to_float(value) for value in values]
+        else:
+            array[column] = ["" if value is None else str(value) for value in values]
+    return array
+
+
+def array_to_trades(array, tz=None):
+    # Lignes au format de trades.csv (horodatages remis en texte)
+    trades = []
+    for row in array.tolist():
+        trade = {column: None if value != value else value for column, value in zip(TRADE_DTYPE.names, row)}
+        for column in TIME_COLUMNS:
+            trade[column] = format_time(trade[column], tz)
+        trades.append(trade)
+    return trades
+
+
+def save_npy_atomic(path, array):
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def day_name(timestamp_ms):
+    if timestamp_ms == NO_TIME:
+        return "inconnu"
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).strftime("%Y-%m-%d")
+
+
+def day_bounds(name):
+    # [début, fin[ en ms epoch d'une partition journalière (None pour la partition des horodatages illisibles)
+    try:
+        start = int(datetime.strptime(name, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+    except ValueError:
+        return None
+    return start, start + DAY_MS
+
+
+# Historique des trades partitionné par symbole et par jour (UTC de sortie) : {root}/{SYMBOLE}/{AAAA-MM-JJ}.npy
+# Une lecture filtrée n'ouvre que les partitions du symbole et de la période demandés, en mmap
+class TradeStore:
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def partition_path(self, symbol, day):
+        return os.path.join(self.root, symbol_dir(symbol), day + ".npy")
+
+    def append(self, trades):
+        # Réécriture des seules partitions touchées : coût proportionnel aux trades du jour, pas à l'historique
+        # trades : lignes au format de trades.csv ou tableau TRADE_DTYPE déjà converti
+        array = trades if isinstance(trades, np.ndarray) else trades_to_array(trades)
+        groups = {}
+        for row in array:
+            groups.setdefault((row["Symbole"], day_name(row["Temps_Sortie"])), []).append(row)
+        with self.lock:
+            for (symbol, day), rows in groups.items():
+                path = self.partition_path(symbol, day)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                rows = np.array(rows, dtype=TRADE_DTYPE)
+                if os.path.exists(path):
+                    rows = np.concatenate([np.load(path), rows])
+                rows = rows[np.argsort(rows["Temps_Sortie"], kind="stable")]
+                save_npy_atomic(path, rows)
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name.replace("-", "/") for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def partitions(self, symbols=None, start=None, end=None):
+        # Élagage par chemin : symbole puis plage de dates, sans ouvrir les fichiers
+        paths = []
+        for symbol in symbols if symbols is not None else self.symbols():
+            directory = os.path.join(self.root, symbol_dir(symbol))
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".npy") or name.endswith(".tmp.npy"):
+                    continue
+                bounds = day_bounds(name[:-len(".npy")])
+                if bounds is not None and ((start is not None and bounds[1] <= start) or (end is not None and bounds[0] >= end)):
+                    continue
+                paths.append(os.path.join(directory, name))
+        return paths
+
+    def read(self, symbols=None, start=None, end=None, mmap=True):
+        # Trades fermés dans [start, end[ (ms epoch), triés par heure de sortie
+        parts = []
+        for path in self.partitions(symbols, start, end):
+            array = np.load(path, mmap_mode="r" if mmap else None)
+            times = array["Temps_Sortie"]
+            first = np.searchsorted(times, start) if start is not None else 0
+            last = np.searchsorted(times, end) if end is not None else len(array)
+            if last > first:
+                parts.append(array[first:last])
+        if not parts:
+            return np.zeros(0, dtype=TRADE_DTYPE)
+        array = np.concatenate(parts)
+        return array[np.argsort(array["Temps_Sortie"], kind="stable")]
+
+    def import_csv(self, path, batch=100000):
+        count = 0
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            rows = []
+            for row in csv.DictReader(f):
+                rows.append(row)
+                if len(rows) >= batch:
+                    self.append(rows)
+                    count, rows = count + len(rows), []
+            if rows:
+                self.append(rows)
+                count += len(rows)
+        return count
+
+    def export_csv(self, path, symbols=None, start=None, end=None, tz=None):
+        # Export au format de trades.csv, pour les outils qui ne lisent que le CSV
+        array = self.read(symbols, start, end)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=trades_columns, extrasaction="ignore", lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(array_to_trades(array, tz))
+        return len(array)
+
+
+def month_bounds(name):
+    start = datetime.strptime(name, "%Y-%m").replace(tzinfo=timezone.utc)
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+# Archive de bougies partitionnée par symbole, timeframe et mois : {root}/{SYMBOLE}/{timeframe}/{AAAA-MM}.npy
+# Même format de ligne que le cache du bot (timestamp ms, open, high, low, close, volume en float64)
+class CandleArchive:
+    def __init__(self, root):
+        self.root = root
+
+    def directory(self, symbol, timeframe):
+        return os.path.join(self.root, symbol_dir(symbol), timeframe)
+
+    def has(self, symbol, timeframe):
+        return os.path.isdir(self.directory(symbol, timeframe))
+
+    def write(self, symbol, timeframe, ohlcv):
+        # Fusion avec les mois déjà archivés (une bougie par timestamp, la plus récente l'emporte)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        if not len(ohlcv):
+            return
+        directory = self.directory(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+        months = ohlcv[:, 0].astype("int64").astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+        for month in np.unique(months):
+            path = os.path.join(directory, month + ".npy")
+            rows = ohlcv[months == month]
+            if os.path.exists(path):
+                rows = np.concatenate([np.load(path), rows])
+            # np.unique garde la première occurrence : ordre inversé pour conserver les dernières bougies écrites
+            _, index = np.unique(rows[::-1, 0], return_index=True)
+            save_npy_atomic(path, rows[::-1][index])
+
+    def read(self, symbol, timeframe, start=None, end=None, mmap=True):
+        directory = self.directory(symbol, timeframe)
+        if not os.path.isdir(directory):
+            return None
+        parts = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".npy") or name.endswith(".tmp.npy"):
+                continue
+            month_start, month_end = month_bounds(name[:-len(".npy")])
+            if (start is not None and month_end <= start) or (end is not None and month_start >= end):
+                continue
+            array = np.load(os.path.join(directory, name), mmap_mode="r" if mmap else None)
+            first = np.searchsorted(array[:, 0], start) if start is not None else 0
+            last = np.searchsorted(array[:, 0], end) if end is not None else len(array)
+            parts.append(array[first:last])
+        if not parts:
+            return np.zeros((0, 6))
+        # Un seul mois : vue mmap sans copie
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stockage en colonnes de l'historique des trades et des bougies")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_trades = commands.add_parser("import-trades", help="importe un trades.csv dans le stockage en colonnes")
+    import_trades.add_argument("csv")
+    import_trades.add_argument("--root", default="history/trades")
+    export_trades = commands.add_parser("export-trades", help="exporte l'historique au format trades.csv")
+    export_trades.add_argument("csv")
+    export_trades.add_argument("--root", default="history/trades")
+    export_trades.add_argument("--symbols", nargs="*")
+    export_trades.add_argument("--start", help="date de début (ex: 2024-01-01)")
+    export_trades.add_argument("--end", help="date de fin (exclue)")
+    import_candles = commands.add_parser("import-candles", help="archive les bougies {SYMBOLE}_{timeframe}.npy d'un dossier")
+    import_candles.add_argument("data")
+    import_candles.add_argument("--root", default="history/candles")
+    args = parser.parse_args()
+
+    if args.command == "import-trades":
+        print(f"{TradeStore(args.root).import_csv(args.csv)} trades importés dans {args.root}")
+    elif args.command == "export-trades":
+        start = parse_time(args.start) if args.start else None
+        end = parse_time(args.end) if args.end else None
+        count = TradeStore(args.root).export_csv(args.csv, args.symbols, start, end, tz=pytz.timezone("Europe/Paris"))
+        print(f"{count} trades exportés dans {args.csv}")
+    elif args.command == "import-candles":
+        from candles import CandleCache
+
+        archive = CandleArchive(args.root)
+        for name in sorted(os.listdir(args.data)):
+            if not name.endswith(".npy") or name.endswith(".tmp.npy"):
+                continue
+            symbol, timeframe = CandleCache.parse_filename(name)
+            ohlcv = np.load(os.path.join(args.data, name))
+            archive.write(symbol, timeframe, ohlcv)
+            print(f"{symbol} {timeframe} : {len(ohlcv)} bougies archivées")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# stream.py
+import asyncio
+import json
+import threading
+import time
+
+
+# État de marché en mémoire alimenté par le flux (WebSocket ou rejeu) : bougies et derniers prix
+# on_price(symbol, price) et on_candle(symbol, timeframe, candle) reçoivent chaque donnée dès son arrivée
+# Un prix reçu il y a plus de max_price_age secondes (flux figé sans erreur) n'est plus renvoyé par get_prices
+class MarketState:
+    def __init__(self, max_candles=200, on_price=None, on_candle=None, max_price_age=None, clock=time.monotonic):
+        self.max_candles = max_candles
+        self.on_price = on_price
+        self.on_candle = on_candle
+        self.max_price_age = max_price_age
+        self.clock = clock
+        self.candles = {}
+        self.prices = {}
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def seed(self, symbol, timeframe, ohlcv):
+        with self.condition:
+            self.candles[(symbol, timeframe)] = [list(c) for c in ohlcv[-self.max_candles:]]
+
+    def update_candle(self, symbol, timeframe, candle):
+        with self.condition:
+            rows = self.candles.setdefault((symbol, timeframe), [])
+            # Même timestamp : bougie en cours mise à jour ; sinon nouvelle bougie
+            if rows and rows[-1][0] == candle[0]:
+                rows[-1] = list(candle)
+            elif not rows or candle[0] > rows[-1][0]:
+                rows.append(list(candle))
+                if len(rows) > self.max_candles:
+                    del rows[0]
+            self.version += 1
+            self.condition.notify_all()
+        if self.on_candle is not None:
+            self.on_candle(symbol, timeframe, candle)
+
+    def update_price(self, symbol, price, timestamp=None):
+        with self.condition:
+            # Heure de l'exchange (ms) et heure de réception locale, seule utilisée pour l'âge du prix
+            timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+            self.prices[symbol] = (price, timestamp, self.clock())
+            self.version += 1
+            self.condition.notify_all()
+        if self.on_price is not None:
+            self.on_price(symbol, price)
+
+    def get_ohlcv(self, symbol, timeframe):
+        with self.condition:
+            return [list(c) for c in self.candles.get((symbol, timeframe), [])]
+
+    def get_prices(self):
+        with self.condition:
+            if self.max_price_age is None:
+                return {symbol: price for symbol, (price, _, _) in self.prices.items()}
+            oldest = self.clock() - self.max_price_age
+            return {symbol: price for symbol, (price, _, received) in self.prices.items() if received >= oldest}
+
+    def wait_for_update(self, version, timeout=None):
+        # Bloque jusqu'à une nouvelle donnée : la surveillance des sorties réagit dès le tick reçu
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+
+def ticker_price(ticker):
+    # Dernier prix traité, à défaut la clôture : certains tickers (marché sans transaction récente) n'ont pas de last
+    price = ticker.get("last")
+    return price if price is not None else ticker.get("close")
+
+
+# Flux WebSocket via ccxt.pro : un abonnement ticker et un abonnement bougies par symbole et timeframe
+class ExchangeStream:
+    def __init__(self, exchange_id, symbols, timeframes, state, on_error=None):
+        self.exchange_id = exchange_id
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.state = state
+        self.on_error = on_error
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        self.thread.start()
+
+    async def run(self):
+        import ccxt.pro
+
+        exchange = getattr(ccxt.pro, self.exchange_id)({"enableRateLimit": True})
+        tasks = [self.watch_ticker(exchange, symbol) for symbol in self.symbols]
+        tasks += [self.watch_ohlcv(exchange, symbol, tf) for symbol in self.symbols for tf in self.timeframes]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await exchange.close()
+
+    async def watch_ticker(self, exchange, symbol):
+        while True:
+            try:
+                ticker = await exchange.watch_ticker(symbol)
+                price = ticker_price(ticker)
+                # Sans prix, le tick est ignoré : un None atteindrait les contrôles TP/SL
+                if price is not None:
+                    self.state.update_price(symbol, price, ticker.get("timestamp"))
+            except Exception as e:
+                self.report(symbol, e)
+                await asyncio.sleep(1)
+
+    async def watch_ohlcv(self, exchange, symbol, timeframe):
+        while True:
+            try:
+                for candle in await exchange.watch_ohlcv(symbol, timeframe):
+                    self.state.update_candle(symbol, timeframe, candle)
+            except Exception as e:
+                self.report(symbol, e)
+                await asyncio.sleep(1)
+
+    def report(self, symbol, error):
+        if self.on_error is not None:
+            self.on_error(symbol, error)
+
+
+# Rejeu local d'un flux enregistré (une ligne JSON par événement), utilisé à la place de l'exchange (tests, mise au point)
+# {"type": "ticker", "symbol": "BTC/USDT", "timestamp": 1700000000000, "last": 35000.0}
+# {"type": "ohlcv", "symbol": "BTC/USDT", "timeframe": "15m", "candle": [ts, o, h, l, c, v]}
+class ReplayFeed:
+    def __init__(self, events, state, speed=0.0):
+        self.events = events
+        self.state = state
+        # speed=0 : rejeu aussi vite que possible ; speed=1 : temps réel
+        self.speed = speed
+        self.thread = None
+
+    @classmethod
+    def from_file(cls, path, state, speed=0.0):
+        with open(path, "r") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        return cls(events, state, speed)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        previous = None
+        for event in self.events:
+            timestamp = event.get("timestamp") or event.get("candle", [None])[0]
+            if self.speed and previous is not None and timestamp is not None:
+                time.sleep(max(0.0, (timestamp - previous) / 1000 / self.speed))
+            previous = timestamp if timestamp is not None else previous
+            self.apply(event)
+
+    def apply(self, event):
+        if event["type"] == "ticker":
+            price = ticker_price(event)
+            if price is not None:
+                self.state.update_price(event["symbol"], price, event.get("timestamp"))
+        elif event["type"] == "ohlcv":
+            self.state.update_candle(event["symbol"], event["timeframe"], event["candle"])
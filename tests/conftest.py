@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# Modules du bot à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,25 @@
+# test_candles.py
+import os
+import threading
+
+import numpy as np
+
+from candles import CandleCache
+
+MINUTE = 60000
+
+
+def test_save_waits_for_a_merge_in_progress(tmp_path):
+    cache = CandleCache(fetch=None, capacity=10, cache_dir=str(tmp_path))
+    store, key_lock = cache.store("BTC/USDT", "1m")
+    store.reset([[0, 100, 101, 99, 100, 1]])
+    # Verrou du symbole tenu comme pendant un get() : save() attend la fin de la mise à jour
+    with key_lock:
+        saver = threading.Thread(target=cache.save)
+        saver.start()
+        saver.join(0.2)
+        assert saver.is_alive()
+        store.merge([[0, 100, 102, 99, 101, 2], [MINUTE, 101, 103, 100, 102, 3]])
+    saver.join()
+    saved = np.load(os.path.join(str(tmp_path), CandleCache.filename("BTC/USDT", "1m")))
+    assert saved.tolist() == [[0, 100, 102, 99, 101, 2], [MINUTE, 101, 103, 100, 102, 3]]
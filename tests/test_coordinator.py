@@ -0,0 +1,85 @@
+# test_coordinator.py
+import random
+
+from shard import SlotTable
+
+
+def test_stale_sync_does_not_drop_a_newer_slot():
+    table = SlotTable(max_positions=1)
+    # Photo du worker A prise avant sa réservation, envoyée après
+    table.acquire("a", "BTC_1", "BTC/USDT", sequence=2)
+    assert table.sync("a", [], sequence=1) is False
+    assert table.acquire("b", "ETH_1", "ETH/USDT", sequence=3) is False
+    assert len(table.slots) <= table.max_positions
+
+
+def test_stale_sync_does_not_restore_a_released_slot():
+    table = SlotTable(max_positions=1)
+    table.acquire("a", "BTC_1", "BTC/USDT", sequence=1)
+    table.release("BTC_1", "a", sequence=3)
+    assert table.sync("a", [{"Position_ID": "BTC_1", "Symbole": "BTC/USDT"}], sequence=2) is False
+    assert table.slots == {}
+
+
+def test_pending_reservation_survives_sync():
+    table = SlotTable(max_positions=1)
+    table.acquire("a", "BTC_1", "BTC/USDT", sequence=1)
+    # Réservation accordée, position pas encore créée au moment de la photo
+    assert table.sync("a", [], pending=["BTC_1"], sequence=2) is True
+    assert "BTC_1" in table.slots
+    assert table.acquire("b", "ETH_1", "ETH/USDT", sequence=3) is False
+
+
+def test_sync_respects_the_cap():
+    table = SlotTable(max_positions=1)
+    table.acquire("b", "ETH_1", "ETH/USDT", sequence=1)
+    table.sync("a", [{"Position_ID": "BTC_1", "Symbole": "BTC/USDT"}], sequence=2)
+    assert len(table.slots) <= table.max_positions
+
+
+class Worker:
+    # Modèle du bot : positions, réservations en cours et requêtes livrées dans un ordre quelconque
+    def __init__(self, name):
+        self.name = name
+        self.sequence = 0
+        self.positions = set()
+        self.pending = set()
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+
+def test_interleaved_acquire_release_and_sync_keep_the_global_cap():
+    rng = random.Random(0)
+    table = SlotTable(max_positions=3)
+    workers = [Worker("a"), Worker("b")]
+    in_flight = []
+    symbols = [f"S{index}/USDT" for index in range(6)]
+    for step in range(5000):
+        worker = rng.choice(workers)
+        action = rng.random()
+        if action < 0.3:
+            position_id = f"{worker.name}_{step}"
+            worker.pending.add(position_id)
+            in_flight.append(("acquire", worker, position_id, rng.choice(symbols), worker.next_sequence()))
+        elif action < 0.5 and worker.positions:
+            position_id = rng.choice(sorted(worker.positions))
+            worker.positions.discard(position_id)
+            in_flight.append(("release", worker, position_id, None, worker.next_sequence()))
+        elif action < 0.7:
+            snapshot = [{"Position_ID": position_id, "Symbole": "?"} for position_id in worker.positions]
+            in_flight.append(("sync", worker, snapshot, list(worker.pending), worker.next_sequence()))
+        elif in_flight:
+            kind, worker, first, second, sequence = in_flight.pop(rng.randrange(len(in_flight)))
+            if kind == "acquire":
+                granted = table.acquire(worker.name, first, second, sequence)
+                worker.pending.discard(first)
+                if granted:
+                    worker.positions.add(first)
+            elif kind == "release":
+                table.release(first, worker.name, sequence)
+            else:
+                table.sync(worker.name, first, second, sequence)
+        assert len(table.slots) <= table.max_positions
+        assert sum(len(worker.positions) for worker in workers) <= table.max_positions
@@ -0,0 +1,53 @@
+# test_exits.py
+from exits import ExitEngine
+from storage import format_time
+
+MINUTE = 60000
+ENTRY = 1_700_000_000_000 // MINUTE * MINUTE + 30000
+
+
+def long_position(entry=ENTRY):
+    return {"Symbole": "BTC/USDT", "Type": "Long", "TP": 102.0, "SL": 99.0, "Position_ID": "BTC/USDT_1",
+            "Temps_Entree": format_time(entry)}
+
+
+def candle(start, high, low, open_=100.0):
+    return [start, open_, high, low, 100.0, 1.0]
+
+
+def test_pre_entry_wick_is_ignored():
+    engine = ExitEngine()
+    engine.add(long_position())
+    entry_candle = ENTRY // MINUTE * MINUTE
+    # Bougies 1m récentes (limit=5) : les plus anciennes précèdent l'entrée, dont une mèche à 98 sous le SL
+    for start, high, low in [(entry_candle - 3 * MINUTE, 100.5, 99.5), (entry_candle - 2 * MINUTE, 100.5, 98.0),
+                             (entry_candle - MINUTE, 100.5, 99.5), (entry_candle, 100.5, 99.5)]:
+        engine.observe_candle("BTC/USDT", "1m", candle(start, high, low))
+    assert engine.collect() == []
+
+
+def test_refetched_candles_are_not_counted_again():
+    engine = ExitEngine()
+    engine.add(long_position())
+    entry_candle = ENTRY // MINUTE * MINUTE
+    fetched = [candle(entry_candle, 100.5, 99.5), candle(entry_candle + MINUTE, 101.0, 99.5)]
+    for row in fetched:
+        engine.observe_candle("BTC/USDT", "1m", row)
+    assert engine.collect() == []
+    # Même fenêtre relue 15 s plus tard, précédée d'une bougie plus ancienne : rien de nouveau
+    for row in [candle(entry_candle - MINUTE, 100.5, 98.0)] + fetched:
+        engine.observe_candle("BTC/USDT", "1m", row)
+    assert engine.collect() == []
+
+
+def test_post_entry_wick_triggers_stop():
+    engine = ExitEngine()
+    position = long_position()
+    engine.add(position)
+    entry_candle = ENTRY // MINUTE * MINUTE
+    engine.observe_candle("BTC/USDT", "1m", candle(entry_candle, 100.5, 99.5))
+    engine.observe_candle("BTC/USDT", "1m", candle(entry_candle + MINUTE, 100.5, 98.5))
+    [(closed, price, reason)] = engine.collect()
+    assert closed is position
+    assert reason == "SL Hit"
+    assert price < 99.0
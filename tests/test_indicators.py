@@ -0,0 +1,87 @@
+# test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorEngine, IndicatorState, compute_series
+
+ta = pytest.importorskip("ta")
+
+TOLERANCE = 1e-6
+BARS = 500
+WINDOW = 200
+ADX_START = 2 * 14 - 1
+
+
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(42)
+    closes = 100 + np.cumsum(rng.normal(0, 1, BARS))
+    highs = closes + rng.uniform(0, 2, BARS)
+    lows = closes - rng.uniform(0, 2, BARS)
+    return np.column_stack([np.arange(BARS) * 900000, closes, highs, lows, closes, rng.uniform(50, 150, BARS)])
+
+
+@pytest.fixture(scope="module")
+def reference(candles):
+    highs, lows, closes = pd.Series(candles[:, 2]), pd.Series(candles[:, 3]), pd.Series(candles[:, 4])
+    adx = ta.trend.ADXIndicator(highs, lows, closes)
+    # ATR de référence : celui de signals.calculate_atr (moyenne simple des 14 derniers true ranges), que le moteur reproduit
+    ranges = np.maximum(candles[1:, 2] - candles[1:, 3], np.abs(candles[1:, 2] - candles[:-1, 4]))
+    atr = np.concatenate([np.full(14, np.nan), np.convolve(ranges, np.ones(14) / 14, mode="valid")])
+    return {
+        "rsi": ta.momentum.RSIIndicator(closes).rsi().to_numpy(),
+        "ema": ta.trend.EMAIndicator(closes, window=30).ema_indicator().to_numpy(),
+        "adx": adx.adx().to_numpy(),
+        "adx_pos": adx.adx_pos().to_numpy(),
+        "adx_neg": adx.adx_neg().to_numpy(),
+        "atr": atr,
+    }
+
+
+def assert_close(name, index, value, expected):
+    # ta met l'ADX et les DI à 0 pendant leur amorçage, là où le moteur renvoie None
+    if value is None or np.isnan(expected) or (name.startswith("adx") and index < ADX_START):
+        return
+    assert value == pytest.approx(expected, abs=TOLERANCE), f"{name} bougie {index}"
+
+
+def test_incremental_state_matches_ta(candles, reference):
+    state = IndicatorState()
+    checked = set()
+    for index, row in enumerate(candles):
+        state.update(row[2], row[3], row[4])
+        values = state.values()
+        for name, series in reference.items():
+            assert_close(name, index, values[name], series[index])
+            if values[name] is not None and index >= ADX_START:
+                checked.add(name)
+    assert checked == set(reference)
+
+
+def test_engine_sliding_window_matches_ta(candles, reference):
+    # Régime du bot : fenêtre de 200 bougies décalée d'une bougie par appel, la dernière étant en cours
+    engine = IndicatorEngine()
+    for end in range(WINDOW, BARS + 1):
+        values = engine.sync("BTC/USDT", "15m", candles[end - WINDOW:end])
+        for name, series in reference.items():
+            assert_close(name, end - 1, values[name], series[end - 1])
+
+
+def test_engine_restarts_after_gap(candles):
+    engine = IndicatorEngine()
+    engine.sync("BTC/USDT", "15m", candles[:WINDOW])
+    # Trou dans l'historique : le moteur repart de la fenêtre fournie, comme un état neuf
+    values = engine.sync("BTC/USDT", "15m", candles[WINDOW + 50:2 * WINDOW + 50])
+    expected = IndicatorEngine().sync("ETH/USDT", "15m", candles[WINDOW + 50:2 * WINDOW + 50])
+    assert values == expected
+
+
+def test_vectorized_series_matches_ta(candles, reference):
+    series = compute_series(candles)
+    for name in ("rsi", "ema", "adx", "atr"):
+        start = ADX_START if name == "adx" else 0
+        expected = reference[name][start:]
+        valid = ~np.isnan(series[name][start:]) & ~np.isnan(expected)
+        assert valid.any()
+        np.testing.assert_allclose(series[name][start:][valid], expected[valid], atol=TOLERANCE, err_msg=name)
@@ -0,0 +1,31 @@
+# test_logs.py
+import logs
+from logs import LogWriter, parse_line
+
+
+def test_failed_rotation_does_not_stop_the_writer(tmp_path, monkeypatch):
+    path = str(tmp_path / "console_log.txt")
+    writer = LogWriter(path, max_bytes=1, console=False)
+    failures = []
+
+    def failing_replace(source, target):
+        # Renommage toujours en échec (fichier verrouillé, disque en lecture seule...)
+        failures.append(source)
+        raise OSError("renommage impossible")
+
+    monkeypatch.setattr(logs.os, "replace", failing_replace)
+    for message in ("avant", "pendant", "après"):
+        writer.write(writer.format((0.0, "INFO", message, {})))
+    writer.close()
+
+    assert failures
+    messages = []
+    for name in sorted(p.name for p in tmp_path.iterdir()):
+        with open(tmp_path / name, encoding="utf-8") as f:
+            messages.extend(parse_line(line)["message"] for line in f)
+    # Le lot qui a déclenché la rotation manquée est écrit, et la rotation n'est pas retentée à chaque lot
+    assert messages.count("avant") == 1
+    assert messages.count("pendant") == 1
+    assert messages.count("après") == 1
+    assert len(failures) == 1
+    assert not (tmp_path / "console_log.txt.1").exists()
@@ -0,0 +1,46 @@
+# test_shard.py
+import os
+
+import pytest
+
+import shard
+from config import trades_columns
+from journal import append_csv, read_csv
+
+
+def trade(index, pnl):
+    return {
+        "Symbole": "BTC/USDT", "Type": "Long", "Prix_Entree": 100.0, "Prix_Sortie": 101.0, "Quantite": 1.0,
+        "PNL": pnl, "Raison_Sortie": "TP Hit", "RSI_Sortie": 50.0, "EMA_30_Sortie": 100.0, "ATR_Sortie": 1.0,
+        "Temps_Entree": "2025-01-01 10:00:00+01:00", "Temps_Sortie": f"2025-01-01 1{index}:00:00+01:00",
+        "Position_ID": f"BTC/USDT_{index}", "Marge": 100.0, "Levier": 10.0,
+    }
+
+
+def test_collector_crash_before_state_write_does_not_duplicate_trades(tmp_path, monkeypatch):
+    worker = tmp_path / "shards" / "mexc-0"
+    worker.mkdir(parents=True)
+    worker_trades = str(worker / "trades.csv")
+    append_csv(worker_trades, trades_columns, trade(1, 5.0))
+    shard.Collector([str(worker)], str(tmp_path)).collect()
+
+    # Arrêt entre l'ajout au trades.csv fusionné et l'écriture de coordinator.json
+    append_csv(worker_trades, trades_columns, trade(2, -2.0))
+    write_json_atomic = shard.write_json_atomic
+
+    def crash(path, value):
+        if path.endswith(shard.STATE_FILE):
+            raise OSError("arrêt simulé")
+        write_json_atomic(path, value)
+
+    monkeypatch.setattr(shard, "write_json_atomic", crash)
+    with pytest.raises(OSError):
+        shard.Collector([str(worker)], str(tmp_path)).collect()
+    monkeypatch.setattr(shard, "write_json_atomic", write_json_atomic)
+
+    collector = shard.Collector([str(worker)], str(tmp_path))
+    collector.collect()
+    merged = read_csv(os.path.join(str(tmp_path), "trades.csv"), ["PNL"])
+    assert [row["Position_ID"] for row in merged] == ["BTC/USDT_1", "BTC/USDT_2"]
+    assert shard.analytics_stats(collector.analytics)["Total_Trades"] == 2
+    assert collector.analytics.equity == pytest.approx(3.0)
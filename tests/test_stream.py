@@ -0,0 +1,83 @@
+# test_stream.py
+import asyncio
+
+import pytest
+
+from exits import ExitEngine
+from storage import format_time
+from stream import ExchangeStream, MarketState, ReplayFeed
+
+MINUTE = 60000
+ENTRY = 1_700_000_000_000 // MINUTE * MINUTE
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stale_prices_are_dropped():
+    clock = Clock()
+    state = MarketState(max_price_age=5, clock=clock)
+    state.update_price("BTC/USDT", 100.0)
+    clock.now += 3
+    state.update_price("ETH/USDT", 2000.0)
+    assert state.get_prices() == {"BTC/USDT": 100.0, "ETH/USDT": 2000.0}
+    # Flux figé : BTC n'a rien reçu depuis 6 s, check_positions repassera par la photo REST
+    clock.now += 3
+    assert state.get_prices() == {"ETH/USDT": 2000.0}
+
+
+def test_replayed_ticks_and_candles_reach_the_exit_engine():
+    engine = ExitEngine(sl_slippage=0.0)
+    state = MarketState(on_price=lambda symbol, price: engine.observe(symbol, price, price), on_candle=engine.observe_candle)
+    long = {"Symbole": "BTC/USDT", "Type": "Long", "TP": 102.0, "SL": 99.0, "Position_ID": "BTC/USDT_1",
+            "Temps_Entree": format_time(ENTRY)}
+    short = {"Symbole": "ETH/USDT", "Type": "Short", "TP": 1900.0, "SL": 2100.0, "Position_ID": "ETH/USDT_1",
+             "Temps_Entree": format_time(ENTRY)}
+    engine.add(long)
+    engine.add(short)
+    ReplayFeed([
+        # Bougie antérieure à l'entrée : ignorée malgré sa mèche sous le SL
+        {"type": "ohlcv", "symbol": "BTC/USDT", "timeframe": "1m", "candle": [ENTRY - MINUTE, 100, 100.5, 98, 100, 1]},
+        {"type": "ohlcv", "symbol": "BTC/USDT", "timeframe": "1m", "candle": [ENTRY, 100, 100.5, 99.5, 100, 1]},
+        {"type": "ticker", "symbol": "ETH/USDT", "timestamp": ENTRY + 1000, "last": 2000.0},
+    ], state).run()
+    assert engine.collect() == []
+    ReplayFeed([
+        # Mèche de la bougie en cours jusqu'au TP, puis tick ETH au-delà du TP du short
+        {"type": "ohlcv", "symbol": "BTC/USDT", "timeframe": "1m", "candle": [ENTRY, 100, 102.5, 99.5, 101, 2]},
+        {"type": "ticker", "symbol": "ETH/USDT", "timestamp": ENTRY + 2000, "last": 1890.0},
+    ], state).run()
+    exits = {position["Position_ID"]: (price, reason) for position, price, reason in engine.collect()}
+    assert exits == {"BTC/USDT_1": (102.0, "TP Hit"), "ETH/USDT_1": (1900.0, "TP Hit")}
+    assert state.get_prices() == {"ETH/USDT": 1890.0}
+    assert state.get_ohlcv("BTC/USDT", "1m")[-1] == [ENTRY, 100, 102.5, 99.5, 101, 2]
+
+
+def test_tickers_without_last_price_are_skipped():
+    class Exchange:
+        def __init__(self, tickers):
+            self.tickers = list(tickers)
+
+        async def watch_ticker(self, symbol):
+            if not self.tickers:
+                raise asyncio.CancelledError
+            return self.tickers.pop(0)
+
+    prices = []
+    state = MarketState(on_price=lambda symbol, price: prices.append(price))
+    stream = ExchangeStream("binance", ["BTC/USDT"], [], state)
+    exchange = Exchange([
+        {"symbol": "BTC/USDT", "last": 100.0, "close": 100.0},
+        # Pas de last : repli sur la clôture, puis tick sans aucun prix ignoré
+        {"symbol": "BTC/USDT", "last": None, "close": 101.0},
+        {"symbol": "BTC/USDT", "last": None, "close": None},
+    ])
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(stream.watch_ticker(exchange, "BTC/USDT"))
+    assert prices == [100.0, 101.0]
+    assert state.get_prices() == {"BTC/USDT": 101.0}